@@ -0,0 +1,128 @@
+import fnmatch
+import os
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+
+from compile_cache import DEFAULT_MAX_BYTES, CompileCache, summarize
+from scanner.dfa import get_compiled_dfa
+from parser.compilation import OK, SYNTAX_ERRORS, SEMANTIC_ERRORS, FAILED, STATUSES
+from parser.parser import Parser
+
+# Compiles many C-minus sources on a pool of worker processes. Each worker
+# builds the scanner DFA and loads the parse table once, when it starts, and
+# keeps them for every input it is handed; each input is compiled into its own
+# output directory, and the driver gets back one CompileResult per input, in
+# the order the inputs were given.
+
+INPUT_NAME = 'input.txt'
+
+# `instructions` is 0 when the parser gave up before generating any code, `message` is set only when the compile failed
+CompileResult = namedtuple('CompileResult', ['input_file', 'output_dir', 'status', 'errors', 'instructions', 'seconds',
+                                             'message', 'cached'], defaults=[None, False])
+
+# the CompileCache of this worker process, if the outputs are cached
+cache = None
+
+
+def collect_inputs(paths, output_root, pattern=INPUT_NAME):
+    """
+    Pairs every source file named in ``paths``, or matching ``pattern`` under a
+    directory named there, with its own directory under ``output_root``. The
+    output directories mirror the inputs' paths below the directory they all
+    share, so inputs with the same name never write to the same place.
+    """
+    files, roots = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            roots.append(path)
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                files.extend(os.path.join(directory, name) for name in sorted(fnmatch.filter(names, pattern)))
+        else:
+            roots.append(os.path.dirname(path) or '.')
+            files.append(path)
+    if not files:
+        return []
+    root = os.path.commonpath([os.path.abspath(root) for root in roots])
+    inputs = {}
+    for input_file in files:
+        inputs.setdefault(os.path.abspath(input_file), input_file)
+    return [(input_file, output_directory(input_file, root, output_root)) for input_file in inputs.values()]
+
+
+def output_directory(input_file, root, output_root):
+    relative = os.path.relpath(input_file, root)
+    # a test case is a directory holding its source as input.txt, and its outputs get a directory of the same name
+    if os.path.basename(relative) == INPUT_NAME:
+        relative = os.path.dirname(relative)
+    else:
+        relative = os.path.splitext(relative)[0]
+    return os.path.normpath(os.path.join(output_root, relative))
+
+
+def start_worker(cache_directory=None, cache_size=DEFAULT_MAX_BYTES):
+    global cache
+    # the parse table was loaded when the parser module was imported
+    get_compiled_dfa()
+    cache = CompileCache(cache_directory, cache_size) if cache_directory is not None else None
+
+
+def compile_input(task):
+    input_file, output_dir, optimization_level, build_tree = task
+    start = time.perf_counter()
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        if cache is None:
+            parser = Parser(input_file, build_tree, optimization_level, output_dir)
+            summary, cached = summarize(parser, parser.parse(echo=False)), False
+        else:
+            summary, cached = cache.compile(input_file, output_dir, optimization_level, build_tree)
+    except Exception as error:
+        return CompileResult(input_file, output_dir, FAILED, 0, 0, time.perf_counter() - start,
+                             f'{type(error).__name__}: {error}')
+    return CompileResult(input_file, output_dir, summary['status'], summary['errors'], summary['instructions'],
+                         time.perf_counter() - start, cached=cached)
+
+
+def compile_all(inputs, jobs=None, optimization_level=0, build_tree=True, cache_directory=None,
+                cache_size=DEFAULT_MAX_BYTES):
+    """
+    Yields the CompileResult of every ``(input_file, output_dir)`` pair of
+    ``inputs`` in order, compiling them on ``jobs`` worker processes, one per
+    CPU by default. A single job compiles in this process. With a
+    ``cache_directory`` the outputs go through a CompileCache there.
+    """
+    tasks = [(input_file, output_dir, optimization_level, build_tree) for input_file, output_dir in inputs]
+    jobs = min(jobs or os.cpu_count() or 1, max(len(tasks), 1))
+    if jobs == 1:
+        start_worker(cache_directory, cache_size)
+        yield from map(compile_input, tasks)
+        return
+    # several inputs go to a worker at a time, so that sending them costs little next to compiling them
+    chunk_size = max(1, len(tasks) // (4 * jobs))
+    with Pool(jobs, initializer=start_worker, initargs=(cache_directory, cache_size)) as pool:
+        yield from pool.imap(compile_input, tasks, chunk_size)
+
+
+def report(results, out):
+    """Writes a line to ``out`` as each result arrives and a summary at the end, and returns the results."""
+    start = time.perf_counter()
+    counts = {status: 0 for status in STATUSES}
+    reported, cached = [], 0
+    for result in results:
+        detail = result.message or (f'{result.errors} errors' if result.errors else f'{result.instructions} lines')
+        if result.cached:
+            detail += ', cached'
+        out.write(f'{result.status:<15} {result.seconds * 1000:8.1f} ms  {result.input_file} -> {result.output_dir}'
+                  f'  ({detail})\n')
+        counts[result.status] += 1
+        cached += result.cached
+        reported.append(result)
+    elapsed = time.perf_counter() - start
+    summary = ', '.join(f'{count} {status}' for status, count in counts.items() if count) or 'nothing compiled'
+    if cached:
+        summary += f' ({cached} from the cache)'
+    out.write(f'{len(reported)} inputs in {elapsed:.2f} s ({len(reported) / max(elapsed, 1e-9):,.1f} inputs/s): '
+              f'{summary}\n')
+    return reported
@@ -0,0 +1,63 @@
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from batch_compiler import collect_inputs, compile_all
+
+# Inputs/sec the batch compiler gets through on the test corpora copied
+# `copies` times, with 1, 2, 4, ... workers up to the CPU count, next to
+# starting one compiler.py process per input as was done before.
+# Run from `src`:  python -m benchmark.batch_compiler_benchmark [copies]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEST_DIR = os.path.join(HERE, '..', '..', 'test')
+COMPILER = os.path.join(HERE, '..', 'compiler.py')
+
+
+def make_corpus(directory, copies):
+    sources = sorted(glob.glob(os.path.join(TEST_DIR, '*', 'T*', 'input.txt')))
+    for copy in range(copies):
+        for number, source in enumerate(sources):
+            case = os.path.join(directory, f'{copy}', f'T{number}')
+            os.makedirs(case)
+            with open(source) as file, open(os.path.join(case, 'input.txt'), 'w') as out:
+                out.write(file.read())
+    return directory
+
+
+def per_process(inputs):
+    start = time.perf_counter()
+    for input_file, output_dir in inputs:
+        # compiler.py compiles input.txt in its working directory
+        os.makedirs(output_dir)
+        os.link(input_file, os.path.join(output_dir, 'input.txt'))
+        subprocess.run([sys.executable, COMPILER], cwd=output_dir, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        sources = make_corpus(os.path.join(directory, 'sources'), copies)
+        jobs = 1
+        while True:
+            inputs = collect_inputs([sources], os.path.join(directory, f'build{jobs}'))
+            start = time.perf_counter()
+            for _ in compile_all(inputs, jobs):
+                pass
+            elapsed = time.perf_counter() - start
+            print(f'{jobs:>3} workers: {len(inputs)} inputs in {elapsed:.2f} s, {len(inputs) / elapsed:,.1f} inputs/s')
+            if jobs >= (os.cpu_count() or 1):
+                break
+            jobs = min(jobs * 2, os.cpu_count())
+        # one process per input, on the first copy of the corpus only
+        inputs = collect_inputs([os.path.join(sources, '0')], os.path.join(directory, 'processes'))
+        elapsed = per_process(inputs)
+        print(f'process per input: {len(inputs)} inputs in {elapsed:.2f} s, {len(inputs) / elapsed:,.1f} inputs/s')
+
+
+if __name__ == '__main__':
+    main()
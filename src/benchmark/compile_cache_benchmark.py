@@ -0,0 +1,47 @@
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from compile_cache import CompileCache
+from parser.parser import Parser
+
+# Time to produce the output files of every test input by compiling it, and
+# by going through a CompileCache that misses and then hits; and what the
+# size limit costs when every store evicts.
+# Run from `src`:  python -m benchmark.compile_cache_benchmark [repeat]
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test')
+
+
+def timed(paths, output_dir, repeat, compile_one):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            compile_one(path, output_dir)
+    return (time.perf_counter() - start) / (repeat * len(paths))
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    paths = sorted(glob.glob(os.path.join(TEST_DIR, '*', 'T*', 'input.txt')))
+    with tempfile.TemporaryDirectory() as directory:
+        output_dir = os.path.join(directory, 'out')
+        os.makedirs(output_dir)
+        compiled = timed(paths, output_dir, repeat, lambda path, out: Parser(path, output_dir=out).parse(echo=False))
+        cache = CompileCache(os.path.join(directory, 'cache'))
+        missed = timed(paths, output_dir, 1, cache.compile)
+        hit = timed(paths, output_dir, repeat, cache.compile)
+        shutil.rmtree(cache.directory)
+        # a limit below one entry makes every store evict
+        small = CompileCache(os.path.join(directory, 'small'), max_bytes=1)
+        evicting = timed(paths, output_dir, 1, small.compile)
+        print(f'{len(paths)} inputs, per input: compiled {compiled * 1000:.2f} ms, cache miss {missed * 1000:.2f} ms, '
+              f'cache hit {hit * 1000:.2f} ms ({compiled / hit:.1f}x), miss with eviction {evicting * 1000:.2f} ms')
+        print(f'counts: {cache.counts}, evicting cache: {small.counts}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Latency of a compile request to `compiler.py --serve` over stdin/stdout,
+# against running `compiler.py` on the same source from a cold start, for
+# every test input. The server is started once, before the requests are
+# timed; the time it takes to start is shown separately.
+# Run from `src`:  python -m benchmark.compile_server_benchmark [repeat]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEST_DIR = os.path.join(HERE, '..', '..', 'test')
+COMPILER = os.path.join(HERE, '..', 'compiler.py')
+
+
+def cold_times(sources, repeat):
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        for source in sources:
+            shutil.copy(source, os.path.join(directory, 'input.txt'))
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, COMPILER], cwd=directory, stdout=subprocess.DEVNULL, check=True)
+                times.append(time.perf_counter() - start)
+    return times
+
+
+def served_times(sources, repeat):
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, COMPILER, '--serve'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              text=True, bufsize=1)
+    # the first answer shows the server has loaded
+    server.stdin.write(json.dumps({'source': ''}) + '\n')
+    server.stdout.readline()
+    startup = time.perf_counter() - start
+    times = []
+    try:
+        for path in sources:
+            with open(path) as file:
+                request = json.dumps({'source': file.read(),
+                                      'artifacts': ['code', 'syntax_errors', 'semantic_errors', 'parse_tree']}) + '\n'
+            for _ in range(repeat):
+                start = time.perf_counter()
+                server.stdin.write(request)
+                server.stdout.readline()
+                times.append(time.perf_counter() - start)
+    finally:
+        server.stdin.close()
+        server.wait()
+    return startup, times
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    sources = sorted(glob.glob(os.path.join(TEST_DIR, '*', 'T*', 'input.txt')))
+    cold = cold_times(sources, repeat)
+    startup, served = served_times(sources, repeat)
+    for name, times in (('cold CLI', cold), ('server', served)):
+        print(f'{name:>9}: median {statistics.median(times) * 1000:8.2f} ms, '
+              f'max {max(times) * 1000:8.2f} ms over {len(times)} compiles')
+    print(f'server startup {startup * 1000:.1f} ms, median speedup '
+          f'{statistics.median(cold) / statistics.median(served):.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import sys
+import time
+import tracemalloc
+
+from parser.incremental import IncrementalCompiler
+from parser.parser import Parser
+
+# Time to recompile a large program after an edit near its start, in its
+# middle and near its end, from scratch and with an IncrementalCompiler; with
+# the tokens scanned again, the token parsing resumed from and the one it
+# converged on, and the memory the checkpoints take. One edit changes a
+# constant, which leaves the code after it where it was, and one adds a
+# statement, which moves it and is parsed on to the end.
+# Run from `src`:  python -m benchmark.incremental_benchmark [functions] [repeat]
+
+FUNCTION = '''int f{0}(int a) {{
+    int b[4];
+    b[0] = a + {0};
+    if (a < {0}) {{ b[1] = f{1}(a + 1); }} else {{ b[1] = 0; }} endif
+    return b[0] * 2 + b[1];
+}}
+'''
+MAIN = 'void main(void) {\n    output(f0(1));\n}\n'
+
+
+def program(functions):
+    # each function calls the one before it, and f0 calls nothing
+    return FUNCTION.format(0, 0).replace('b[1] = f0(a + 1)', 'b[1] = 1') + \
+        ''.join(FUNCTION.format(number, number - 1) for number in range(1, functions)) + MAIN
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    source = program(functions)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Parser(source=source, build_tree=False).compile()
+    full = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    compiler = IncrementalCompiler(source)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'{len(source)} characters, {len(compiler.tokens)} tokens, {len(compiler.checkpoints)} checkpoints '
+          f'taking {memory / 2 ** 20:.1f} MiB')
+    print(f'full compile: {full * 1000:.1f} ms')
+    for edit, text in (('constant', '7'), ('statement', '7; b[2] = 1')):
+        for where in ('start', 'middle', 'end'):
+            # the constant added in a function near there, changed and changed back
+            position = {'start': source.index('a + 2;'), 'middle': source.index(f'a + {functions // 2};'),
+                        'end': source.index(f'a + {functions - 1};')}[where] + len('a + ')
+            start = time.perf_counter()
+            for _ in range(repeat):
+                compiler.edit(position, position + 1, text)
+                converged_at = compiler.converged_at
+                compiler.edit(position, position + len(text), source[position])
+            seconds = (time.perf_counter() - start) / (2 * repeat)
+            print(f'{edit} edit near the {where}: {seconds * 1000:.1f} ms, {compiler.scanned} tokens scanned, '
+                  f'resumed at token {compiler.resumed_at}, converged on token {converged_at}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from parser.parse_table import ParseTable, load_parse_table, TABLE_PATH
+
+# Cold-start cost of the parse table: json.load of table.json against the
+# binary cache. Run from `src`:  python -m benchmark.parse_table_benchmark
+
+
+def best_of(function, repeat=50):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_json():
+    with open(TABLE_PATH, 'r') as f:
+        return json.load(f)
+
+
+def process_time(code, repeat=10):
+    src = os.path.join(os.path.dirname(__file__), '..')
+    # let the interpreter keep bytecode so module compilation is not timed
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+    return best_of(lambda: subprocess.run([sys.executable, '-c', code], cwd=src, env=env, check=True), repeat)
+
+
+def main():
+    load_parse_table()
+    print('in process:')
+    print(f'    json.load(table.json): {best_of(load_json) * 1000:.3f} ms')
+    print(f'   ParseTable.from_json(): {best_of(ParseTable.from_json) * 1000:.3f} ms')
+    print(f'  load_parse_table() hit: {best_of(load_parse_table) * 1000:.3f} ms')
+
+    # the scanner imports re and enum either way, so they count as startup
+    bare = process_time('import re, enum')
+    json_path = process_time(f'import re, enum, json; json.load(open({TABLE_PATH!r}))')
+    cache_path = process_time('import re, enum; from parser.parse_table import load_parse_table; load_parse_table()')
+    print('fresh interpreter, above startup with re and enum:')
+    print(f'    json.load(table.json): {(json_path - bare) * 1000:.2f} ms')
+    print(f'  load_parse_table() hit: {(cache_path - bare) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
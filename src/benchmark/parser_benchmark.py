@@ -0,0 +1,59 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from parser.parser import Parser
+
+# Reductions/sec and peak memory of the LR driver on the test corpora, with and
+# without a parse tree and without writing any output.
+# Run from `src`:  python -m benchmark.parser_benchmark [repeat]
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test')
+
+
+def run_corpus(paths, repeat, build_tree):
+    reductions, elapsed = 0, 0.0
+    for _ in range(repeat):
+        for path in paths:
+            parser = Parser(path, build_tree)
+            start = time.perf_counter()
+            parser.drive()
+            elapsed += time.perf_counter() - start
+            reductions += parser.reduction_count
+    return reductions, elapsed
+
+
+def peak_memory(paths, build_tree):
+    peak = 0
+    for path in paths:
+        parser = Parser(path, build_tree)
+        tracemalloc.start()
+        parser.drive()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_dir:
+        # the parser opens its output files in the working directory
+        os.chdir(output_dir)
+        try:
+            for corpus in ('parser', 'code_generator'):
+                paths = sorted(glob.glob(os.path.join(TEST_DIR, corpus, 'T*', 'input.txt')))
+                for mode, build_tree in (('tree', True), ('no tree', False)):
+                    reductions, elapsed = run_corpus(paths, repeat, build_tree)
+                    print(f'{corpus:>15}, {mode:>7}: {reductions} reductions in {elapsed:.3f} s, '
+                          f'{reductions / elapsed:,.0f} reductions/s, '
+                          f'peak {peak_memory(paths, build_tree) / 1024:,.1f} KB')
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
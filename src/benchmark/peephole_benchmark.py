@@ -0,0 +1,66 @@
+import glob
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+
+from parser.parser import Parser
+
+# Instructions in each test/code_generator program at -O0, -O1 (the peephole
+# pass) and -O2 (with dead code elimination), and on Linux how many of them
+# the tester runs.
+# Run from `src`:  python -m benchmark.peephole_benchmark
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CASES = os.path.join(HERE, '..', '..', 'test', 'code_generator')
+TESTER = os.path.join(HERE, '..', 'interpreter', 'tester_linux.out')
+LEVELS = (0, 1, 2)
+
+
+def compile_case(input_file, level):
+    parser = Parser(input_file, build_tree=False, optimization_level=level)
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            parser.parse()
+        finally:
+            sys.stdout = stdout
+    return parser.code_generator.program_block.last_index
+
+
+def executed(tester):
+    # the tester traces every instruction it runs on a line starting with '--->'
+    result = subprocess.run([tester], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            timeout=60)
+    return sum(line.startswith(b'--->') for line in result.stdout.splitlines())
+
+
+def main():
+    cwd = os.getcwd()
+    cases = sorted(glob.glob(os.path.join(CASES, 'T*')), key=lambda case: int(os.path.basename(case)[1:]))
+    totals = [0] * (2 * len(LEVELS))
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        tester = None
+        if sys.platform.startswith('linux'):
+            tester = shutil.copy(TESTER, os.path.join(output_dir, 'tester'))
+            os.chmod(tester, os.stat(tester).st_mode | stat.S_IXUSR)
+        try:
+            for case in cases:
+                shutil.copy(os.path.join(case, 'input.txt'), 'input.txt')
+                counts = []
+                for level in LEVELS:
+                    counts.append(compile_case('input.txt', level))
+                    counts.append(executed(tester) if tester else 0)
+                totals = [total + count for total, count in zip(totals, counts)]
+                print(f'{os.path.basename(case):>4}: {" -> ".join(f"{count:3}" for count in counts[::2])} instructions, '
+                      f'{" -> ".join(f"{count:5}" for count in counts[1::2])} run')
+        finally:
+            os.chdir(cwd)
+    print(f'total: {" -> ".join(map(str, totals[::2]))} instructions, {" -> ".join(map(str, totals[1::2]))} run')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+
+from code_generator.operand import NO_OPERAND, direct, immediate
+from code_generator.program_block import ProgramBlock, Instruction
+from parser.parser import Parser
+
+# Building and writing 100k-instruction programs: the column-wise ProgramBlock
+# against a list of Instruction objects joined into one string, then a whole
+# compile of a program that generates over 100k instructions.
+# Run from `src`:  python -m benchmark.program_block_benchmark
+
+INSTRUCTIONS = 100_000
+
+
+class ObjectListProgramBlock:
+    """The old layout, without its 2000-line cap."""
+
+    def __init__(self):
+        self.instructions = []
+        self.last_index = 0
+
+    def add_instruction(self, instruction):
+        self.set_instruction(self.last_index, instruction)
+        self.last_index += 1
+
+    def set_instruction(self, index, instruction):
+        if index >= len(self.instructions):
+            self.instructions.extend([None] * (index + 1 - len(self.instructions)))
+        self.instructions[index] = instruction
+
+    def increase_index(self):
+        self.last_index += 1
+
+    def __str__(self):
+        return '\n'.join([f'{i}\t({inst})' for i, inst in enumerate(self.instructions) if inst is not None])
+
+
+def fill(program_block):
+    # every tenth line is reserved and backpatched, like a loop's JPF
+    for i in range(INSTRUCTIONS):
+        if i % 10 == 0:
+            program_block.increase_index()
+        else:
+            program_block.add_instruction(Instruction('ADD', direct(3000 + i), immediate(i), direct(3004 + i)))
+    for i in range(0, INSTRUCTIONS, 10):
+        program_block.set_instruction(i, Instruction('JPF', direct(3000 + i), direct(i + 10), NO_OPERAND))
+    return program_block
+
+
+def measure(make, write, path):
+    start = time.perf_counter()
+    program_block = fill(make())
+    built = time.perf_counter()
+    with open(path, 'w') as f:
+        write(program_block, f)
+    written = time.perf_counter()
+
+    tracemalloc.start()
+    with open(path, 'w') as f:
+        write(fill(make()), f)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return built - start, written - built, peak
+
+
+def stream(program_block, f):
+    from writer.writer import stream_lines
+    stream_lines(f, program_block.lines())
+
+
+def compile_program(path, statements):
+    with open(path, 'w') as f:
+        f.write('void main(void) {\n    int a;\n    int i;\n    a = 0;\n')
+        for i in range(statements):
+            f.write(f'    if (a < {i}) a = a + {i} * 2; else a = a - 1; endif\n')
+        f.write('    output(a);\n}\n')
+    parser = Parser(path, build_tree=False)
+    start = time.perf_counter()
+    # parse() also prints the program block
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        parser.parse()
+    return parser.code_generator.program_block, time.perf_counter() - start
+
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        try:
+            for name, make, write in (('object list', ObjectListProgramBlock, lambda block, f: f.write(str(block))),
+                                      ('columns', ProgramBlock, stream)):
+                build, output, peak = measure(make, write, 'output.txt')
+                print(f'{name:>12}: build {build * 1000:.1f} ms, write {output * 1000:.1f} ms, '
+                      f'peak {peak / 1024 / 1024:.1f} MB')
+            program_block, elapsed = compile_program('input.txt', 12_000)
+            print(f'compile: {program_block.last_index} instructions in {elapsed:.2f} s')
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
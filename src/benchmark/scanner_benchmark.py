@@ -0,0 +1,122 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+
+from scanner.config import *
+from scanner.dfa import DFA
+from scanner.scanner import Scanner
+
+# Tokens/sec of the scanner on the test corpora and on a source made of long
+# comments and identifiers.
+# Run from `src`:  python -m benchmark.scanner_benchmark [size_in_kb]
+
+
+class ObjectGraphScanner(Scanner):
+    """The scanner loop as it ran on the ``State`` object graph."""
+
+    graph = None
+
+    def __init__(self, input_file, binary=False):
+        super(ObjectGraphScanner, self).__init__(input_file, binary)
+        if ObjectGraphScanner.graph is None:
+            ObjectGraphScanner.graph = DFA().states
+        self.start_state = ObjectGraphScanner.graph[0]
+
+    def get_next_token(self):
+        current_state = self.start_state
+        token_name = ""
+
+        while True:
+            if current_state.id == 0 or (not current_state.is_star_state and not current_state.is_final_state):
+                self.current_char = self.reader.read_char()
+                next_state = current_state.get_dest_state_by_character(self.current_char)
+                current_state = next_state if next_state else self.start_state
+                if current_state.type == ERROR:
+                    error = (token_name + self.current_char, current_state.error_message)
+                    self.lexical_errors.setdefault(self.find_start_line(self.reader.current_line_number, error[0].count('\n')), []).append(error)
+                    token_name = ""
+                    continue
+                if not self.current_char:
+                    return EOF, '$', self.reader.current_line_number
+                if current_state == self.start_state:
+                    self.reader.position -= 1
+                    token_name = ""
+                    continue
+                if current_state.is_star_state:
+                    self.reader.position -= 1
+                    if current_state.type == ID:
+                        self.symbol_table.add_lexeme(token_name)
+                    if token_name in keywords:
+                        return KEYWORD, token_name, self.reader.current_line_number
+                    return current_state.type, token_name, self.reader.current_line_number
+                elif current_state.is_final_state:
+                    token_name += self.current_char
+                    return current_state.type, token_name, self.reader.current_line_number
+                token_name += self.current_char
+
+
+def build_source(size):
+    test_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'test')
+    samples = [open(path).read() for path in sorted(glob.glob(os.path.join(test_dir, '*', 'T*', 'input.txt')))]
+    parts, length = [], 0
+    while length < size:
+        for sample in samples:
+            parts.append(sample + '\n')
+            length += len(sample) + 1
+    return ''.join(parts)
+
+
+def build_long_runs(size):
+    block = '/* ' + 'generated comment line\n' * 2000 + '*/\n'
+    line = 'int ' + 'identifier' * 50 + ';\n' + '// ' + 'x' * 500 + '\n' + ' ' * 200 + '\n'
+    parts, length = [], 0
+    while length < size:
+        parts.append(block + line * 20)
+        length += len(block) + 20 * len(line)
+    return ''.join(parts)
+
+
+def run(scanner_class, path, binary, repeat=3, **kwargs):
+    best, count = None, 0
+    for _ in range(repeat):
+        scanner = scanner_class(path, binary)
+        count = 0
+        start = time.perf_counter()
+        if 'trivia' in kwargs:
+            for _ in scanner.tokens(**kwargs):
+                count += 1
+            count -= 1
+        else:
+            while scanner.get_next_token(**kwargs)[0] != EOF:
+                count += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 if len(sys.argv) > 1 else 256 * 1024
+    start = time.perf_counter()
+    DFA()
+    print(f'DFA() object graph build: {(time.perf_counter() - start) * 1000:.2f} ms')
+    for corpus, source in (('test corpora', build_source(size)), ('long runs', build_long_runs(size))):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write(source)
+            path = f.name
+        print(f'{corpus} ({len(source) // 1024} KB):')
+        try:
+            for name, scanner_class, binary, kwargs in (('object graph', ObjectGraphScanner, False, {}),
+                                                        ('all tokens', Scanner, False, {'trivia': True}),
+                                                        ('trivia skipped', Scanner, False, {'trivia': False}),
+                                                        ('binary, skipped', Scanner, True, {'trivia': False})):
+                count, elapsed = run(scanner_class, path, binary, **kwargs)
+                print(f'{name:>16}: {count} tokens in {elapsed:.3f} s, {count / elapsed:,.0f} tokens/s, '
+                      f'{len(source) / elapsed / 1024:,.0f} KB/s')
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from parser.grammar.parse_table_generator import Grammar, build_table, GRAMMAR_DIR
+
+# Table generation time against grammar size. The C-minus grammar is copied
+# k times with renamed non-terminals, each copy behind its own keyword, so
+# every copy keeps its states. When bison is installed, the `bison
+# --report=all` run the old generator needed is timed alongside. Run from `src`:
+#   python -m benchmark.table_generator_benchmark
+
+
+def scaled_grammar(copies):
+    with open(f'{GRAMMAR_DIR}/grammar.y', 'r') as f:
+        declarations, rules, _ = f.read().split('%%')
+    non_terminals = set(re.findall(r'^(\w+):', rules, re.MULTILINE))
+
+    def rename(copy):
+        return re.sub(r'\b\w+\b', lambda m: f'{m.group(0)}_{copy}' if m.group(0) in non_terminals else m.group(0),
+                      rules)
+
+    start = 'start: ' + '\n| '.join(f'"unit{copy}" program_{copy}' for copy in range(copies)) + '\n;\n'
+    return declarations.replace('%start program', '%start start') + '%%\n' + start + ''.join(
+        rename(copy) for copy in range(copies)) + '%%\n'
+
+
+def best_of(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bison_time(text, directory):
+    path = os.path.join(directory, 'grammar.y')
+    with open(path, 'w') as f:
+        f.write(text)
+    command = ['bison', '--report=all', '-o', os.path.join(directory, 'grammar.tab.c'), path]
+    return best_of(lambda: subprocess.run(command, check=True, capture_output=True), 3)
+
+
+def main():
+    bison = shutil.which('bison')
+    directory = tempfile.mkdtemp()
+    print(f'{"copies":>6} {"rules":>6} {"states":>7} {"parse":>10} {"generate":>10}' + (f' {"bison":>10}' if bison else ''))
+    for copies in (1, 2, 4, 8, 16, 32):
+        text = scaled_grammar(copies)
+        grammar = Grammar.from_bison(text)
+        table, conflicts = build_table(grammar)
+        assert conflicts == 0
+        repeat = max(3, 32 // copies)
+        parse = best_of(lambda: Grammar.from_bison(text), repeat)
+        generate = best_of(lambda: build_table(grammar), repeat)
+        print(f'{copies:>6} {len(grammar.rules):>6} {len(table["parse_table"]):>7} '
+              f'{parse * 1000:>8.2f}ms {generate * 1000:>8.2f}ms' +
+              (f' {bison_time(text, directory) * 1000:>8.2f}ms' if bison else ''))
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+from parser.parser import Parser
+
+# Temporary addresses used by each test/code_generator program before and
+# after the linear-scan recycling pass, and the time the pass takes on them.
+# Run from `src`:  python -m benchmark.temporaries_benchmark
+
+CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test', 'code_generator')
+
+
+def recycle(input_file):
+    parser = Parser(input_file, build_tree=False)
+    if parser.drive() is None:
+        return None
+    start = time.perf_counter()
+    counts = parser.code_generator.recycle_temporaries()
+    return counts, time.perf_counter() - start
+
+
+def main():
+    cwd = os.getcwd()
+    cases = sorted(glob.glob(os.path.join(CASES, 'T*')), key=lambda case: int(os.path.basename(case)[1:]))
+    total_before = total_after = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        try:
+            for case in cases:
+                shutil.copy(os.path.join(case, 'input.txt'), 'input.txt')
+                result = recycle('input.txt')
+                if result is None or result[0] is None:
+                    print(f'{os.path.basename(case):>4}: skipped')
+                    continue
+                (before, after), elapsed = result
+                total_before += before
+                total_after += after
+                print(f'{os.path.basename(case):>4}: {before:4} -> {after:3} temporaries  ({elapsed * 1000:.2f} ms)')
+        finally:
+            os.chdir(cwd)
+    print(f'total: {total_before} -> {total_after}')
+
+
+if __name__ == '__main__':
+    main()
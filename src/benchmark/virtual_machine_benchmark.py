@@ -0,0 +1,109 @@
+import glob
+import io
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from parser.parser import Parser
+from interpreter.translator import TranslatedProgram, compile_program
+from interpreter.virtual_machine import VirtualMachine
+from writer.code_generator_writer import CodeGeneratorWriter
+
+# Instructions per second the virtual machine and the translated program run
+# on each test/code_generator program and on a loop-heavy one, and on Linux
+# the time the tester takes to run the same output.txt. The first translated
+# run includes translating and compiling the program; the cached translation
+# is used by the second, which the speedup is taken from.
+# Run from `src`:  python -m benchmark.virtual_machine_benchmark
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CASES = os.path.join(HERE, '..', '..', 'test', 'code_generator')
+TESTER = os.path.join(HERE, '..', 'interpreter', 'tester_linux.out')
+LOOP = '''
+int a[10];
+int sum(int n) {
+    int i; int s;
+    i = 0; s = 0;
+    while (i < n) { s = s + a[i] * 3 - i / 2; i = i + 1; }
+    return s;
+}
+void main(void) {
+    int i; int s;
+    i = 0;
+    while (i < 10) { a[i] = i * i; i = i + 1; }
+    i = 0; s = 0;
+    while (i < 20000) { s = s + sum(10); if (s < 0) { s = 0 - s; } endif i = i + 1; }
+    output(s);
+}
+'''
+
+
+def compile_case(input_file):
+    parser = Parser(input_file, build_tree=False)
+    if parser.drive() is None:
+        return None
+    parser.code_generator.recycle_temporaries()
+    return parser.code_generator.program_block
+
+
+def run(program_block, machine_class=VirtualMachine):
+    machine = machine_class.from_program_block(program_block)
+    start = time.perf_counter()
+    executed = machine.run(io.StringIO())
+    return executed, time.perf_counter() - start
+
+
+def run_tester(tester, program_block):
+    CodeGeneratorWriter('output.txt').write(program_block)
+    start = time.perf_counter()
+    subprocess.run([tester], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   timeout=600)
+    return time.perf_counter() - start
+
+
+def main():
+    cwd = os.getcwd()
+    cases = sorted(glob.glob(os.path.join(CASES, 'T*')), key=lambda case: int(os.path.basename(case)[1:]))
+    total_executed = total_elapsed = total_translated = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        tester = None
+        if sys.platform.startswith('linux'):
+            tester = shutil.copy(TESTER, os.path.join(output_dir, 'tester'))
+            os.chmod(tester, os.stat(tester).st_mode | stat.S_IXUSR)
+        try:
+            with open('loop.txt', 'w') as file:
+                file.write(LOOP)
+            for name, input_file in [(os.path.basename(case), os.path.join(case, 'input.txt')) for case in cases] + \
+                                    [('loop', 'loop.txt')]:
+                program_block = compile_case(input_file)
+                if program_block is None:
+                    print(f'{name:>4}: skipped')
+                    continue
+                executed, elapsed = run(program_block)
+                compile_program.cache_clear()
+                _, first = run(program_block, TranslatedProgram)
+                _, translated = run(program_block, TranslatedProgram)
+                total_executed += executed
+                total_elapsed += elapsed
+                total_translated += translated
+                line = f'{name:>4}: {executed:8} run in {elapsed * 1000:8.2f} ms, ' \
+                       f'{executed / max(elapsed, 1e-9) / 1e6:6.2f}M instructions/s, ' \
+                       f'translated {first * 1000:8.2f} ms then {translated * 1000:8.2f} ms, ' \
+                       f'{elapsed / max(translated, 1e-9):5.2f}x'
+                if tester:
+                    line += f', tester {run_tester(tester, program_block) * 1000:8.2f} ms'
+                print(line)
+        finally:
+            os.chdir(cwd)
+    print(f'total: {total_executed} run in {total_elapsed * 1000:.2f} ms, '
+          f'{total_executed / max(total_elapsed, 1e-9) / 1e6:.2f}M instructions/s, '
+          f'translated {total_translated * 1000:.2f} ms, {total_elapsed / max(total_translated, 1e-9):.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+from code_generator.operand import IMMEDIATE, immediate, mode, value
+
+# What ADD, SUB, MULT, DIV, LT and EQ compute: the tester works on 32-bit
+# words, wrapping on overflow, and divides truncating toward zero like C.
+# Dividing by zero, or the one quotient that overflows, gives WORD_MIN.
+
+WORD_BITS = 32
+WORD_MIN = -(1 << (WORD_BITS - 1))
+WORD_MAX = (1 << (WORD_BITS - 1)) - 1
+
+
+def word(number: int) -> int:
+    return (number - WORD_MIN) % (1 << WORD_BITS) + WORD_MIN
+
+
+def divide(dividend: int, divisor: int) -> int:
+    if divisor == 0:
+        return WORD_MIN
+    quotient = abs(dividend) // abs(divisor)
+    return word(quotient if (dividend < 0) == (divisor < 0) else -quotient)
+
+
+OPERATIONS = {
+    'ADD': lambda a, b: word(a + b),
+    'SUB': lambda a, b: word(a - b),
+    'MULT': lambda a, b: word(a * b),
+    'DIV': divide,
+    'LT': lambda a, b: int(a < b),
+    'EQ': lambda a, b: int(a == b),
+}
+
+
+def fold(opcode, operand_1, operand_2):
+    """
+    Returns the immediate result of an instruction whose operands are both
+    immediates, or None when it has to run: either operand is not a constant,
+    a constant does not fit in a word, or it divides by zero.
+    """
+    if mode(operand_1) != IMMEDIATE or mode(operand_2) != IMMEDIATE or opcode not in OPERATIONS:
+        return None
+    a, b = value(operand_1), value(operand_2)
+    if not (WORD_MIN <= a <= WORD_MAX and WORD_MIN <= b <= WORD_MAX) or opcode == 'DIV' and b == 0:
+        return None
+    return immediate(OPERATIONS[opcode](a, b))
@@ -1,7 +1,15 @@
+from collections import namedtuple
+
 from code_generator.semantic_stack import SemanticStack
 from code_generator.program_block import ProgramBlock, Instruction
 from code_generator.data_block import DataBlock
 from code_generator.temporaries_block import TemporariesBlock
+from code_generator import control_flow, peephole
+from code_generator.arithmetic import fold
+from code_generator.operand import DIRECT, IMMEDIATE, NO_OPERAND, direct, immediate, indirect, mode, value
+
+Snapshot = namedtuple('Snapshot', ['semantic_stack', 'program_block', 'data_block', 'temporaries', 'break_list', 'args',
+                                   'current_call_func', 'current_return_value_addr', 'current_func', 'ra'])
 
 
 class CodeGenerator:
@@ -55,21 +63,47 @@ class CodeGenerator:
             84: self.end_func_dec
         }
 
+    def keep_history(self):
+        """Makes the blocks keep what rolling back to a ``snapshot`` of this generator takes."""
+        self.program_block.history = []
+        self.data_block.history, self.data_block.functions = [], []
+
+    def snapshot(self):
+        # the rows held by the snapshot, current_func among them, are copied before they change
+        return Snapshot(self.semantic_stack.copy(), self.program_block.snapshot(), self.data_block.snapshot(),
+                        self.temporaries.copy(), self.break_list.copy(), self.args.copy(), self.current_call_func,
+                        self.current_return_value_addr, self.current_func, self.ra)
+
+    def rolled_back(self, snapshot):
+        """A code generator in the state of ``snapshot``, taken from this one or from one it went on from."""
+        generator = CodeGenerator()
+        generator.semantic_stack = snapshot.semantic_stack.copy()
+        generator.program_block = self.program_block.rolled_back(snapshot.program_block)
+        generator.data_block = self.data_block.rolled_back(snapshot.data_block)
+        generator.temporaries = snapshot.temporaries.copy()
+        generator.break_list = snapshot.break_list.copy()
+        generator.args = snapshot.args.copy()
+        generator.current_call_func = snapshot.current_call_func
+        generator.current_return_value_addr = snapshot.current_return_value_addr
+        generator.current_func = snapshot.current_func
+        generator.ra = snapshot.ra
+        return generator
+
     def pid(self, lexeme):
         data, error = self.data_block.get_data(lexeme)
-        self.semantic_stack.push(data.address)
+        self.semantic_stack.push(direct(data.address))
         if error:
             raise Exception(error)
 
     def pid_dec(self, lexeme):
         typ = self.semantic_stack.pop()
         data = self.data_block.create_data(lexeme, typ)
-        self.semantic_stack.push(data.address)
+        self.semantic_stack.push(direct(data.address))
 
     def assign(self):
         value = self.semantic_stack.pop()
         address = self.semantic_stack.pop()
-        instruction = Instruction('ASSIGN', value, address, ' ')
+        instruction = Instruction('ASSIGN', value, address, NO_OPERAND)
         self.semantic_stack.push(value)
         self.program_block.add_instruction(instruction)
 
@@ -78,24 +112,24 @@ class CodeGenerator:
 
     def variable_declaration(self):
         address = self.semantic_stack.pop()
-        instruction = Instruction('ASSIGN', '#0', address, ' ')
+        instruction = Instruction('ASSIGN', immediate(0), address, NO_OPERAND)
         self.program_block.add_instruction(instruction)
-        data = self.data_block.get_data_from_address(address)
+        data = self.data_block.get_data_to_change(value(address))
         data.set_keyword('var')
 
     def array_declaration(self):
-        size = self.semantic_stack.pop()
+        size = value(self.semantic_stack.pop())
         address = self.semantic_stack.pop()
-        instruction = Instruction('ASSIGN', '#0', address, ' ')
+        instruction = Instruction('ASSIGN', immediate(0), address, NO_OPERAND)
         self.program_block.add_instruction(instruction)
         self.data_block.increase_index(size)
-        data = self.data_block.get_data_from_address(address)
+        data = self.data_block.get_data_to_change(value(address))
         data.add_type('array')
         data.set_num_args(size)
         data.set_keyword('array')
 
     def save(self):
-        self.semantic_stack.push(self.program_block.last_index)
+        self.semantic_stack.push(direct(self.program_block.last_index))
         self.program_block.increase_index()
 
     def push(self, lexeme):
@@ -105,11 +139,8 @@ class CodeGenerator:
         self.semantic_stack.push('void')
 
     def push_num(self, lexeme):
-        temp = self.temporaries.get_temp()
-        self.temporaries.set_type(temp, 'int')
-        instruction = Instruction('ASSIGN', f'#{lexeme}', temp, ' ')
-        self.program_block.add_instruction(instruction)
-        self.semantic_stack.push(temp)
+        # literals stay on the stack as immediates so expressions of them fold at compile time
+        self.semantic_stack.push(immediate(int(lexeme)))
 
     def push_size(self, size):
         self.semantic_stack.push(size)
@@ -121,13 +152,7 @@ class CodeGenerator:
         error = None
         if self.get_type(op_1)[0] == 'array' or self.get_type(op_2)[0] == 'array':
             error = 'Type mismatch in operands, Got array instead of int.'
-        temp = self.temporaries.get_temp()
-        if operator == '+':
-            instruction = Instruction('ADD', op_2, op_1, temp)
-        else:
-            instruction = Instruction('SUB', op_2, op_1, temp)
-        self.program_block.add_instruction(instruction)
-        self.semantic_stack.push(temp)
+        self.semantic_stack.push(self.operation('ADD' if operator == '+' else 'SUB', op_2, op_1))
         if error:
             raise Exception(error)
 
@@ -135,20 +160,39 @@ class CodeGenerator:
         op_1 = self.semantic_stack.pop()
         operator = self.semantic_stack.pop()
         op_2 = self.semantic_stack.pop()
-        temp = self.temporaries.get_temp()
-        instruction = None
-        if operator == '*':
-            instruction = Instruction('MULT', op_2, op_1, temp)
-        elif operator == '/':
-            instruction = Instruction('DIV', op_2, op_1, temp)
-        self.program_block.add_instruction(instruction)
-        self.semantic_stack.push(temp)
+        self.semantic_stack.push(self.operation({'*': 'MULT', '/': 'DIV'}.get(operator), op_2, op_1))
+
+    def operation(self, opcode, op_1, op_2):
+        # returns the operand holding the result, an immediate when both operands are constants
+        result = fold(opcode, op_1, op_2)
+        if result is not None:
+            return result
+        temp = direct(self.temporaries.get_temp())
+        self.program_block.add_instruction(Instruction(opcode, op_1, op_2, temp) if opcode else None)
+        return temp
+
+    @staticmethod
+    def saved_line(operand):
+        # a line reserved by save goes on the stack as a direct operand; a literal popped in its place by a
+        # stack left inconsistent by an earlier error must fail like the temporary the literal used to be in
+        if mode(operand) != DIRECT:
+            raise IndexError('list assignment index out of range')
+        return value(operand)
+
+    def branch(self, line, condition, target):
+        # a condition known at compile time always jumps, or never does and the line falls through
+        if mode(condition) == IMMEDIATE:
+            target = target if value(condition) == 0 else direct(line + 1)
+            instruction = Instruction('JP', direct(value(target)), NO_OPERAND, NO_OPERAND)
+        else:
+            instruction = Instruction('JPF', condition, target, NO_OPERAND)
+        self.program_block.set_instruction(line, instruction)
 
     def func(self):
         address = self.semantic_stack.get_top()
-        data = self.data_block.get_data_from_address(address)
+        data = self.data_block.get_data_to_change(value(address))
         self.data_block.add_virtual_row()
-        data.set_keyword('func')
+        self.data_block.set_function(data)
         data.set_line(self.program_block.last_index)
         temp = self.temporaries.get_temp()
         data.set_return_value_addr(temp)
@@ -157,62 +201,52 @@ class CodeGenerator:
         data.set_return_addr(temp)
         self.current_func = data
         if data.lexeme == 'main':
-            instruction = Instruction('JP', f'#{self.program_block.last_index}', ' ', ' ')
+            instruction = Instruction('JP', immediate(self.program_block.last_index), NO_OPERAND, NO_OPERAND)
             self.program_block.set_instruction(0, instruction)
 
     def jp(self):
         address = self.semantic_stack.pop()
-        instruction = Instruction('JP', self.program_block.last_index, ' ', ' ')
-        self.program_block.set_instruction(address, instruction)
+        instruction = Instruction('JP', direct(self.program_block.last_index), NO_OPERAND, NO_OPERAND)
+        self.program_block.set_instruction(self.saved_line(address), instruction)
 
     def jpf(self):
         address = self.semantic_stack.pop()
         condition = self.semantic_stack.pop()
-        instruction = Instruction('JPF', condition, self.program_block.last_index, ' ')
-        self.program_block.set_instruction(address, instruction)
+        self.branch(self.saved_line(address), condition, direct(self.program_block.last_index))
 
     def relop(self):
         op_1 = self.semantic_stack.pop()
         operator = self.semantic_stack.pop()
         op_2 = self.semantic_stack.pop()
-        temp = self.temporaries.get_temp()
-        instruction = None
-        if operator == '<':
-            instruction = Instruction('LT', op_2, op_1, temp)
-        elif operator == '==':
-            instruction = Instruction('EQ', op_2, op_1, temp)
-        self.program_block.add_instruction(instruction)
-        self.semantic_stack.push(temp)
+        self.semantic_stack.push(self.operation({'<': 'LT', '==': 'EQ'}.get(operator), op_2, op_1))
 
     def jpf_save(self):
-        instruction_address = self.semantic_stack.pop()
-        instruction = Instruction('JPF', self.semantic_stack.pop(), self.program_block.last_index + 1, ' ')
-        self.program_block.set_instruction(instruction_address, instruction)
-        self.semantic_stack.push(self.program_block.last_index)
+        instruction_address = self.saved_line(self.semantic_stack.pop())
+        self.branch(instruction_address, self.semantic_stack.pop(), direct(self.program_block.last_index + 1))
+        self.semantic_stack.push(direct(self.program_block.last_index))
         self.program_block.increase_index()
 
     def label_while(self):
         self.break_list.insert(0, -1)
-        self.semantic_stack.push(self.program_block.last_index)
+        self.semantic_stack.push(direct(self.program_block.last_index))
         self.program_block.increase_index()
         temp = self.temporaries.get_temp()
-        self.semantic_stack.push(temp)
-        self.semantic_stack.push(self.program_block.last_index)
+        self.semantic_stack.push(direct(temp))
+        self.semantic_stack.push(direct(self.program_block.last_index))
 
     def while_end(self):
         address_to_jpf = self.semantic_stack.pop()
         expression = self.semantic_stack.pop()
         end_of_while_address = self.program_block.last_index + 1
-        instruction = Instruction('JPF', expression, f'#{end_of_while_address}', ' ')
-        self.program_block.set_instruction(address_to_jpf, instruction)
+        self.branch(self.saved_line(address_to_jpf), expression, immediate(end_of_while_address))
 
         address_to_jp = self.semantic_stack.pop()
-        instruction = Instruction('JP', address_to_jp, ' ', ' ')
+        instruction = Instruction('JP', address_to_jp, NO_OPERAND, NO_OPERAND)
         self.program_block.add_instruction(instruction)
 
         temp_address = self.semantic_stack.pop()
-        instruction = Instruction('ASSIGN', f'#{end_of_while_address}', temp_address, ' ')
-        self.program_block.set_instruction(self.semantic_stack.pop(), instruction)
+        instruction = Instruction('ASSIGN', immediate(end_of_while_address), temp_address, NO_OPERAND)
+        self.program_block.set_instruction(self.saved_line(self.semantic_stack.pop()), instruction)
         self.fill_breaks(self.program_block.last_index)
 
     def fill_breaks(self, end_address):
@@ -224,7 +258,7 @@ class CodeGenerator:
         if end_index <= -1:
             raise Exception('Error in break list')
         for address in self.break_list[:end_index]:
-            instruction = Instruction('JP', end_address, ' ', ' ')
+            instruction = Instruction('JP', direct(end_address), NO_OPERAND, NO_OPERAND)
             self.program_block.set_instruction(address, instruction)
         self.break_list = self.break_list[end_index + 1:]
 
@@ -238,15 +272,20 @@ class CodeGenerator:
         index = self.semantic_stack.pop()
         address = self.semantic_stack.pop()
         temp = self.temporaries.get_temp()
-        instruction = Instruction('MULT', index, '#4', temp)
-        self.program_block.add_instruction(instruction)
-        instruction = Instruction('ADD', f'#{address}', temp, temp)
+        # a constant index still goes through a temporary, the cell is not a row of the data block
+        cell = fold('ADD', immediate(value(address)), fold('MULT', index, immediate(4)))
+        if cell is not None:
+            instruction = Instruction('ASSIGN', cell, direct(temp), NO_OPERAND)
+        else:
+            instruction = Instruction('MULT', index, immediate(4), direct(temp))
+            self.program_block.add_instruction(instruction)
+            instruction = Instruction('ADD', immediate(value(address)), direct(temp), direct(temp))
         self.program_block.add_instruction(instruction)
-        self.semantic_stack.push(f'@{temp}')
+        self.semantic_stack.push(indirect(temp))
 
     def output(self):
         arg_result = self.semantic_stack.get_top()
-        instruction = Instruction('PRINT', arg_result, ' ', ' ')
+        instruction = Instruction('PRINT', arg_result, NO_OPERAND, NO_OPERAND)
         self.program_block.add_instruction(instruction)
         self.current_call_func = None
         self.args = []
@@ -260,11 +299,11 @@ class CodeGenerator:
         case_value = self.semantic_stack.pop()
         switch_value = self.semantic_stack.get_top()
 
-        temp = self.temporaries.get_temp()
+        temp = direct(self.temporaries.get_temp())
         instruction = Instruction('EQ', switch_value, case_value, temp)
-        self.program_block.set_instruction(equal_condition_line, instruction)
-        instruction = Instruction('JPF', temp, self.program_block.last_index, ' ')
-        self.program_block.set_instruction(jump_line, instruction)
+        self.program_block.set_instruction(self.saved_line(equal_condition_line), instruction)
+        instruction = Instruction('JPF', temp, direct(self.program_block.last_index), NO_OPERAND)
+        self.program_block.set_instruction(self.saved_line(jump_line), instruction)
 
     def end_switch(self):
         self.semantic_stack.pop()
@@ -275,10 +314,10 @@ class CodeGenerator:
 
     def add_param(self, typ='int'):
         param_address = self.semantic_stack.pop()
-        param_data = self.data_block.get_data_from_address(param_address)
+        param_data = self.data_block.get_data_to_change(value(param_address))
         param_data.add_type(typ)
         func_address = self.semantic_stack.get_top()
-        func_data = self.data_block.get_data_from_address(func_address)
+        func_data = self.data_block.get_data_to_change(value(func_address))
         func_data.add_param(len(self.data_block.all_data) - 1)
         param_data.set_keyword('param')
         # TODO: get index of param from its data
@@ -303,15 +342,16 @@ class CodeGenerator:
         params = func_data.params
         for i, param in enumerate(params):
             param_data = self.data_block.get_data_from_index(param)
-            instruction = Instruction('ASSIGN', self.args[i], param_data.address, ' ')
+            instruction = Instruction('ASSIGN', self.args[i], direct(param_data.address), NO_OPERAND)
             self.program_block.add_instruction(instruction)
 
-        instruction = Instruction('ASSIGN', f'#{self.program_block.last_index + 2}', func_data.return_address, ' ')
+        instruction = Instruction('ASSIGN', immediate(self.program_block.last_index + 2),
+                                  direct(func_data.return_address), NO_OPERAND)
         self.program_block.add_instruction(instruction)
-        instruction = Instruction('JP', f'#{func_data.line}', ' ', ' ')
+        instruction = Instruction('JP', immediate(func_data.line), NO_OPERAND, NO_OPERAND)
         self.program_block.add_instruction(instruction)
-        temp = self.temporaries.get_temp()
-        instruction = Instruction('ASSIGN', func_data.return_value_address, temp, ' ')
+        temp = direct(self.temporaries.get_temp())
+        instruction = Instruction('ASSIGN', direct(func_data.return_value_address), temp, NO_OPERAND)
         self.program_block.add_instruction(instruction)
         for i in self.args:
             self.semantic_stack.pop()
@@ -321,12 +361,13 @@ class CodeGenerator:
 
     def save_func(self):
         func_addr = self.semantic_stack.pop()
-        self.current_call_func = func_addr
+        self.current_call_func = value(func_addr)
 
-    def get_type(self, address):
-        if str(address).startswith('@') or str(address).startswith('#'):
+    def get_type(self, operand):
+        if mode(operand) != DIRECT:
             return 'var', 'int'
-        elif address >= 3000:
+        address = value(operand)
+        if address >= 3000:
             return self.temporaries.get_type(address)
         else:
             data = self.data_block.get_data_from_address(address)
@@ -344,11 +385,39 @@ class CodeGenerator:
 
     def return_function(self):
         return_value = self.semantic_stack.pop()
-        instruction = Instruction('ASSIGN', return_value, self.current_return_value_addr, ' ')
+        instruction = Instruction('ASSIGN', return_value, direct(self.current_return_value_addr), NO_OPERAND)
         self.program_block.add_instruction(instruction)
-        instruction = Instruction('JP', f'@{self.current_func.return_address}', ' ', ' ')
+        instruction = Instruction('JP', indirect(self.current_func.return_address), NO_OPERAND, NO_OPERAND)
         self.program_block.add_instruction(instruction)
 
+    def return_addresses(self):
+        return {data.return_address for data in self.data_block.all_data if data.keyword == 'func'}
+
+    def pinned_temporaries(self):
+        pinned = self.return_addresses()
+        pinned.update(data.return_value_address for data in self.data_block.all_data if data.keyword == 'func')
+        return pinned
+
+    def optimize(self, level):
+        # constant expressions and branches are folded and temporaries recycled at every level; -O1 adds the
+        # peephole pass, and -O2 alternates it with dead code elimination until neither removes anything
+        if level < 1:
+            return 0
+        pinned, return_addresses = self.pinned_temporaries(), self.return_addresses()
+        removed = peephole.optimize(self.program_block, self.temporaries, pinned, return_addresses)
+        while level >= 2:
+            count = control_flow.eliminate_dead_code(self.program_block, return_addresses)
+            if count == 0:
+                break
+            removed += count + peephole.optimize(self.program_block, self.temporaries, pinned, return_addresses)
+        return removed
+
+    def recycle_temporaries(self):
+        # temporaries must stay clear of the data addresses to be moved around
+        if self.data_block.last_index > self.temporaries.first_index:
+            return None
+        return self.temporaries.recycle(self.program_block, self.pinned_temporaries())
+
     def end_func(self):
         # self.semantic_stack.pop()
         self.data_block.end_scope()
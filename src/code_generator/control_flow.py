@@ -0,0 +1,211 @@
+from code_generator.operand import DIRECT, IMMEDIATE, INDIRECT, direct, immediate, mode, value
+from code_generator.temporaries_block import JUMP_TARGETS
+
+# Basic blocks of a finished program block, the edges between them, and the
+# compaction that removing lines from the block takes. Calls are `JP #f` after
+# `ASSIGN #r, ra`, and a function returns with `JP @ra`, so a return edge goes
+# from the block ending in `JP @ra` to every return point r assigned to ra.
+
+
+def jump_target(opcode, columns, line):
+    """Returns the field holding the jump target of a line, if it jumps to a known line."""
+    field = JUMP_TARGETS.get(opcode)
+    if field is None:
+        return None
+    target = columns[field][line]
+    if type(target) is not int or mode(target) not in (DIRECT, IMMEDIATE):
+        return None
+    return field
+
+
+def return_point(opcode, columns, line, return_addresses):
+    """Returns the return address temporary and the line a call returns to, if the line sets one up."""
+    if opcode != 'ASSIGN' or type(columns[0][line]) is not int or mode(columns[0][line]) != IMMEDIATE:
+        return None
+    destination = columns[1][line]
+    if type(destination) is not int or mode(destination) != DIRECT or value(destination) not in return_addresses:
+        return None
+    return value(destination), value(columns[0][line])
+
+
+class ControlFlowGraph:
+    """
+    Splits a program block into basic blocks at jumps and jump targets. Blocks
+    are numbered in program order; block_of maps each line to its block and
+    successors lists the blocks control can pass to from the end of each one.
+    """
+
+    def __init__(self, program_block, return_addresses=frozenset()):
+        self.program_block = program_block
+        self.return_addresses = return_addresses
+        opcodes = program_block.opcodes
+        columns = self.columns = (program_block.operands_1, program_block.operands_2, program_block.operands_3)
+        size = self.size = len(opcodes)
+
+        self.leaders = leaders = [False] * (size + 1)
+        leaders[0] = leaders[size] = True
+        # the return points set up for each return address
+        self.return_points = {}
+        self.unknown_jumps = False
+        for line in range(size):
+            opcode = opcodes[line]
+            if opcode in JUMP_TARGETS:
+                leaders[line + 1] = True
+                target = jump_target(opcode, columns, line)
+                if target is not None:
+                    leaders[min(value(columns[target][line]), size)] = True
+            else:
+                point = return_point(opcode, columns, line, return_addresses)
+                if point is not None:
+                    self.return_points.setdefault(point[0], []).append(min(point[1], size))
+                    leaders[min(point[1], size)] = True
+
+        self.starts = [line for line in range(size) if leaders[line]]
+        self.block_of = block_of = []
+        for block, start in enumerate(self.starts):
+            end = self.starts[block + 1] if block + 1 < len(self.starts) else size
+            block_of.extend([block] * (end - start))
+        block_of.append(len(self.starts))
+
+        self.successors = [self.block_successors(block) for block in range(len(self.starts))]
+
+    def end(self, block):
+        return self.starts[block + 1] if block + 1 < len(self.starts) else self.size
+
+    def returns_through(self, block):
+        """Returns the return address temporary a block's closing `JP @ra` returns through, if it does."""
+        last = self.end(block) - 1
+        operand = self.columns[0][last]
+        if self.program_block.opcodes[last] == 'JP' and type(operand) is int and mode(operand) == INDIRECT:
+            return value(operand)
+        return None
+
+    def block_successors(self, block):
+        opcodes, columns, block_of = self.program_block.opcodes, self.columns, self.block_of
+        last = self.end(block) - 1
+        opcode = opcodes[last]
+        successors = []
+        if opcode != 'JP':
+            successors.append(block_of[last + 1])
+        target = jump_target(opcode, columns, last)
+        if target is not None:
+            successors.append(block_of[min(value(columns[target][last]), self.size)])
+        elif opcode == 'JP':
+            address = self.returns_through(block)
+            if address in self.return_addresses:
+                successors.extend(block_of[point] for point in self.return_points.get(address, ()))
+            else:
+                self.unknown_jumps = True
+        # the end of the program is a block of its own with no lines
+        return [successor for successor in successors if successor < len(self.starts)]
+
+    def reachable(self):
+        """
+        Returns the set of blocks control can reach from line 0. A return only
+        leads back to the calls already found reachable, so functions called
+        from dead code alone, or never called, are left out.
+        """
+        if self.unknown_jumps:
+            return set(range(len(self.starts)))
+        opcodes, columns = self.program_block.opcodes, self.columns
+        reached, returning, points = set(), set(), {}
+        work = [0] if self.starts else []
+        while work:
+            block = work.pop()
+            # the end of the program is past the last block
+            if block in reached or block == len(self.starts):
+                continue
+            reached.add(block)
+            for line in range(self.starts[block], self.end(block)):
+                point = return_point(opcodes[line], columns, line, self.return_addresses)
+                if point is not None:
+                    address, target = point
+                    points.setdefault(address, []).append(self.block_of[min(target, self.size)])
+                    if address in returning:
+                        work.append(points[address][-1])
+            address = self.returns_through(block)
+            if address is not None:
+                returning.add(address)
+                work.extend(points.get(address, ()))
+            else:
+                work.extend(self.successors[block])
+        return reached
+
+
+def eliminate_dead_code(program_block, return_addresses=frozenset()):
+    """
+    Removes the blocks control never reaches: code after a return or a break,
+    the bodies of functions never called, and branches never taken.
+    Returns the number of instructions removed.
+    """
+    # a block with reserved lines never filled comes from a program with errors and is left alone
+    if program_block.last_index != len(program_block.opcodes) or None in program_block.opcodes:
+        return 0
+    graph = ControlFlowGraph(program_block, return_addresses)
+    reachable = graph.reachable()
+    removed = [graph.block_of[line] not in reachable for line in range(graph.size)]
+    return compact(program_block, removed, return_addresses)
+
+
+def landing(removed, target):
+    """Returns the line a jump to target lands on once removed lines are gone."""
+    size = len(removed)
+    target = min(target, size)
+    while target < size and removed[target]:
+        target += 1
+    return target
+
+
+def resolve(program_block, removed, target):
+    """Like landing, but goes on through any chain of jumps it lands on."""
+    opcodes, columns = program_block.opcodes, (program_block.operands_1,)
+    size = len(removed)
+    seen = set()
+    target = landing(removed, target)
+    while target < size and target not in seen and opcodes[target] == 'JP' and \
+            jump_target('JP', columns, target) is not None:
+        seen.add(target)
+        target = landing(removed, value(columns[0][target]))
+    return target
+
+
+def compact(program_block, removed, return_addresses=frozenset(), thread=False):
+    """
+    Drops the removed lines of a program block, pointing every jump and return
+    address at the line that takes the place of its target, or with thread set
+    at the end of the chain of jumps it leads to.
+    Returns the number of lines dropped.
+    """
+    opcodes = program_block.opcodes
+    columns = (program_block.operands_1, program_block.operands_2, program_block.operands_3)
+    size = len(opcodes)
+    new_index = []
+    kept = 0
+    for line in range(size):
+        new_index.append(kept)
+        kept += not removed[line]
+    new_index.append(kept)
+
+    # targets are all resolved before any is rewritten, as resolving reads the jumps on the way
+    relocations = []
+    for line in range(size):
+        if removed[line]:
+            continue
+        target = jump_target(opcodes[line], columns, line)
+        if target is not None:
+            old = value(columns[target][line])
+            relocations.append((target, line, resolve(program_block, removed, old) if thread else
+                                landing(removed, old)))
+        elif return_point(opcodes[line], columns, line, return_addresses) is not None:
+            relocations.append((0, line, landing(removed, value(columns[0][line]))))
+    for field, line, target in relocations:
+        operand = columns[field][line]
+        columns[field][line] = immediate(new_index[target]) if mode(operand) == IMMEDIATE else direct(new_index[target])
+
+    count = sum(removed)
+    if count:
+        program_block.opcodes = [opcode for line, opcode in enumerate(opcodes) if not removed[line]]
+        for index, name in enumerate(('operands_1', 'operands_2', 'operands_3')):
+            setattr(program_block, name, [operand for line, operand in enumerate(columns[index]) if not removed[line]])
+        program_block.last_index = kept
+    return count
@@ -1,3 +1,8 @@
+from collections import namedtuple
+
+Snapshot = namedtuple('Snapshot', ['rows', 'changes', 'functions', 'last_index', 'scope_stack', 'max_scope'])
+
+
 class Data:
     def __init__(self, lexeme, typ, address, scope):
         self.num_args = None
@@ -35,6 +40,12 @@ class Data:
     def set_return_addr(self, address):
         self.return_address = address
 
+    def copy(self):
+        data = Data.__new__(Data)
+        data.__dict__.update(self.__dict__)
+        data.params = self.params.copy()
+        return data
+
     def __str__(self):
         return f'lexeme: {self.lexeme},\t address: {self.address},\t keyword: {self.keyword},\t type: {self.type},\t num_args: {self.num_args},\t scope: {self.scope},\t params: {self.params}'
 
@@ -42,35 +53,73 @@ class Data:
 class DataBlock:
     def __init__(self):
         initial_data = Data('output', 'int', 0, 0)
-        self.all_data = [initial_data]
+        self.all_data = []
+        # rows are never removed, so each index keeps the first matching row index:
+        # per (lexeme, scope), per function lexeme (every row made a function) and per address
+        self.scope_index = {}
+        self.function_index = {}
+        self.address_index = {}
         self.last_index = 2000
         self.scope_stack = [0]
         self.max_scope = 0
+        # when lists, a row changed after a snapshot is copied first and the index and the row it replaced added to
+        # history, and the lexeme and index of each row made a function are added to functions, so that the block
+        # can be rolled back to a snapshot; rows below shared are held by one, and those in copied no longer are
+        self.history = None
+        self.functions = None
+        self.shared = 0
+        self.copied = set()
+        self.add_data(initial_data)
+
+    def add_data(self, data: Data):
+        index = len(self.all_data)
+        self.all_data.append(data)
+        self.scope_index.setdefault((data.lexeme, data.scope), index)
+        self.address_index.setdefault(data.address, index)
+        return data
 
     def get_data(self, lexeme: str):
+        # the earliest row declared in the current scope, globally, or as a function wins
         scope = self.all_data[self.scope_stack[-1]].scope
-        for data in self.all_data:
-            if data.lexeme == lexeme and (data.scope == scope or data.keyword == 'func' or data.scope == 0 or
-                                          (data.keyword == 'param' and data.scope == 0)):
-                return data, None
+        found = [index for index in (self.scope_index.get((lexeme, scope)), self.scope_index.get((lexeme, 0)))
+                 if index is not None]
+        found += [index for index in self.function_index.get(lexeme, ()) if self.all_data[index].keyword == 'func']
+        if found:
+            return self.all_data[min(found)], None
 
         # print(f'Variable {lexeme} not declared')
         return self.all_data[0], f"'{lexeme}' is not defined."
 
     def create_data(self, lexeme: str, typ: str):
         scope = self.all_data[self.scope_stack[-1]].scope
-        data = Data(lexeme, typ, self.last_index, scope)
-        self.all_data.append(data)
+        data = self.add_data(Data(lexeme, typ, self.last_index, scope))
         self.last_index += 4
         return data
 
+    def set_function(self, data: Data):
+        data.set_keyword('func')
+        index = self.address_index[data.address]
+        self.function_index.setdefault(data.lexeme, []).append(index)
+        if self.functions is not None:
+            self.functions.append((data.lexeme, index))
+
     def increase_index(self, size: int):
         self.last_index += 4 * int(size)
 
     def get_data_from_address(self, address: int):
-        for data in self.all_data:
-            if data.address == address:
-                return data
+        index = self.address_index.get(address)
+        if index is not None:
+            return self.all_data[index]
+
+    def get_data_to_change(self, address: int):
+        index = self.address_index.get(address)
+        if index is None:
+            return None
+        if index < self.shared and index not in self.copied:
+            self.history.append((index, self.all_data[index]))
+            self.all_data[index] = self.all_data[index].copy()
+            self.copied.add(index)
+        return self.all_data[index]
 
     def get_data_from_index(self, index: int):
         return self.all_data[index]
@@ -79,10 +128,38 @@ class DataBlock:
         data = Data('virtual', '', None, self.max_scope + 1)
         self.max_scope += 1
         self.scope_stack.append(len(self.all_data))
-        self.all_data.append(data)
+        self.add_data(data)
 
     def end_scope(self):
+        # scope numbers are never reused, so the closed scope's rows just stop matching
         self.scope_stack.pop()
 
+    def snapshot(self):
+        self.shared, self.copied = len(self.all_data), set()
+        return Snapshot(len(self.all_data), len(self.history), len(self.functions), self.last_index,
+                        tuple(self.scope_stack), self.max_scope)
+
+    def rolled_back(self, snapshot: Snapshot):
+        """The block as it was at ``snapshot``, sharing the rows it held then and keeping a history of its own."""
+        block = DataBlock()
+        rows = snapshot.rows
+        block.all_data = self.all_data[:rows]
+        for index, data in reversed(self.history[snapshot.changes:]):
+            if index < rows:
+                block.all_data[index] = data
+        # each index keeps the first matching row, added along with it
+        block.scope_index = {key: index for key, index in self.scope_index.items() if index < rows}
+        block.address_index = {address: index for address, index in self.address_index.items() if index < rows}
+        block.functions = self.functions[:snapshot.functions]
+        block.function_index = {}
+        for lexeme, index in block.functions:
+            block.function_index.setdefault(lexeme, []).append(index)
+        block.last_index = snapshot.last_index
+        block.scope_stack = list(snapshot.scope_stack)
+        block.max_scope = snapshot.max_scope
+        block.history = self.history[:snapshot.changes]
+        block.shared = rows
+        return block
+
     def __str__(self):
         return ''.join('\n'.join(f'{it}: {str(data)}' for it, data in enumerate(self.all_data)))
@@ -0,0 +1,48 @@
+# Instruction operands are ints carrying their addressing mode in the two low
+# bits and the address or constant above them. They are only turned into the
+# `12`, `#12` and `@12` text of output.txt when the program is written out.
+# Program lines and declared addresses go on the semantic stack as direct
+# operands too. NO_OPERAND fills the unused operand fields and prints as a blank.
+
+DIRECT = 0
+IMMEDIATE = 1
+INDIRECT = 2
+UNUSED = 3
+
+MODE_BITS = 2
+MODE_MASK = (1 << MODE_BITS) - 1
+PREFIXES = ('', '#', '@')
+NO_OPERAND = UNUSED
+
+# Anything that is not an int, like a None or a lexeme popped off a semantic
+# stack left inconsistent by an earlier error, passes through these unchanged
+# so it fails, or prints, the way it did before operands were encoded.
+
+
+def direct(address: int) -> int:
+    return address << MODE_BITS if type(address) is int else address
+
+
+def immediate(constant: int) -> int:
+    return constant << MODE_BITS | IMMEDIATE if type(constant) is int else constant
+
+
+def indirect(address: int) -> int:
+    return address << MODE_BITS | INDIRECT if type(address) is int else address
+
+
+def mode(operand: int) -> int:
+    return operand & MODE_MASK if type(operand) is int else DIRECT
+
+
+def value(operand: int) -> int:
+    return operand >> MODE_BITS if type(operand) is int else operand
+
+
+def format_operand(operand) -> str:
+    if type(operand) is not int:
+        return str(operand)
+    operand_mode = operand & MODE_MASK
+    if operand_mode == UNUSED:
+        return ' '
+    return PREFIXES[operand_mode] + str(operand >> MODE_BITS)
@@ -0,0 +1,105 @@
+from code_generator.control_flow import ControlFlowGraph, compact, jump_target, landing, resolve
+from code_generator.operand import DIRECT, IMMEDIATE, mode, value
+from code_generator.temporaries_block import DESTINATIONS
+
+# Peephole pass over a finished program block, run before it is written out.
+# Each round folds `ASSIGN #n, t` into the uses of t in the same basic block,
+# drops writes to temporaries nobody reads, writes an expression straight into
+# the variable it is copied to, drops self-assigns, threads jumps to jumps,
+# drops jumps to the line they would fall through to anyway, like branches on
+# conditions known at compile time, and then compacts the block, remapping
+# jump targets and return addresses.
+
+ARITHMETIC = ('ADD', 'SUB', 'MULT', 'DIV', 'LT', 'EQ')
+# operand fields that are plain reads, where an immediate can stand in for a temporary
+READS = {**{opcode: (0, 1) for opcode in ARITHMETIC}, 'ASSIGN': (0,), 'PRINT': (0,), 'JPF': (0,)}
+
+
+def optimize(program_block, temporaries, pinned=frozenset(), return_addresses=frozenset()):
+    """
+    Runs rounds of the peephole pass until one removes nothing.
+    Returns the number of instructions removed.
+    """
+    # a block with reserved lines never filled comes from a program with errors and is left alone
+    if program_block.last_index != len(program_block.opcodes) or None in program_block.opcodes:
+        return 0
+    removed = 0
+    while True:
+        count = optimize_round(program_block, temporaries, pinned, return_addresses)
+        if count == 0:
+            return removed
+        removed += count
+
+
+def optimize_round(program_block, temporaries, pinned, return_addresses):
+    opcodes = program_block.opcodes
+    columns = [program_block.operands_1, program_block.operands_2, program_block.operands_3]
+    size = len(opcodes)
+    first_temp, last_temp = temporaries.first_index, temporaries.last_index
+
+    def temp_of(operand):
+        if type(operand) is not int or mode(operand) == IMMEDIATE:
+            return None
+        address = value(operand)
+        return address if first_temp <= address <= last_temp and address not in pinned else None
+
+    # basic blocks, and where every temporary is written and read
+    graph = ControlFlowGraph(program_block, return_addresses)
+    block, leader = graph.block_of, graph.leaders
+    defs, uses = {}, {}
+    for line in range(size):
+        opcode = opcodes[line]
+        target = jump_target(opcode, columns, line)
+        destination = DESTINATIONS.get(opcode)
+        for field in range(3):
+            operand = columns[field][line]
+            if field == target:
+                continue
+            temp = temp_of(operand)
+            if temp is None:
+                continue
+            if field == destination and mode(operand) == DIRECT:
+                defs.setdefault(temp, []).append(line)
+            else:
+                uses.setdefault(temp, []).append((line, field))
+
+    removed = [False] * size
+    # fold immediates, then drop the writes left without readers
+    for temp, lines in defs.items():
+        if len(lines) != 1:
+            continue
+        line = lines[0]
+        if opcodes[line] == 'ASSIGN' and mode(columns[0][line]) == IMMEDIATE:
+            reads = uses.get(temp, ())
+            if all(use > line and block[use] == block[line] and field in READS.get(opcodes[use], ())
+                   and mode(columns[field][use]) == DIRECT for use, field in reads):
+                for use, field in reads:
+                    columns[field][use] = columns[0][line]
+                uses[temp] = []
+    for temp, lines in defs.items():
+        if not uses.get(temp):
+            for line in lines:
+                removed[line] = True
+
+    # `OP a, b, t` then `ASSIGN t, x` as the only read of t becomes `OP a, b, x`
+    for temp, lines in defs.items():
+        reads = uses.get(temp)
+        if len(lines) != 1 or not reads or len(reads) != 1:
+            continue
+        line, (use, field) = lines[0], reads[0]
+        if (use == line + 1 and field == 0 and not leader[use] and opcodes[use] == 'ASSIGN'
+                and mode(columns[0][use]) == DIRECT and not removed[line]):
+            columns[DESTINATIONS[opcodes[line]]][line] = columns[1][use]
+            removed[use] = True
+
+    for line in range(size):
+        if opcodes[line] == 'ASSIGN' and columns[0][line] == columns[1][line] and mode(columns[0][line]) != IMMEDIATE:
+            removed[line] = True
+
+    # a jump to the line control would fall through to anyway
+    for line in range(size):
+        if opcodes[line] == 'JP' and not removed[line] and mode(columns[0][line]) == DIRECT and \
+                resolve(program_block, removed, value(columns[0][line])) == landing(removed, line + 1):
+            removed[line] = True
+
+    return compact(program_block, removed, return_addresses, thread=True)
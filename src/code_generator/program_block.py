@@ -1,3 +1,10 @@
+from collections import namedtuple
+
+from code_generator.operand import format_operand
+
+Snapshot = namedtuple('Snapshot', ['last_index', 'length', 'backpatches'])
+
+
 class Instruction:
     def __init__(self, opcode, operand_1, operand_2, operand_3):
         self.opcode = opcode
@@ -6,23 +13,105 @@ class Instruction:
         self.operand_3 = operand_3
 
     def __str__(self):
-        return f'{self.opcode}, {self.operand_1}, {self.operand_2}, {self.operand_3}'
+        return (f'{self.opcode}, {format_operand(self.operand_1)}, {format_operand(self.operand_2)}, '
+                f'{format_operand(self.operand_3)}')
 
 
 class ProgramBlock:
+    """
+    Instructions stored column-wise in parallel lists indexed by line, the
+    operands in the tagged form of ``operand``. The lists grow as lines are
+    added or reserved, and only lines below ``last_index`` can be
+    backpatched; a line whose opcode is None was reserved and never filled,
+    and is left out of the output. When ``history`` is a list, each
+    backpatch first adds the line and what it held to it, so that the block
+    can be rolled back to a ``snapshot``.
+    """
+
     def __init__(self):
-        self.instructions = 2000 * [None]
+        self.opcodes = []
+        self.operands_1 = []
+        self.operands_2 = []
+        self.operands_3 = []
         self.last_index = 0
+        self.history = None
+
+    def grow(self, index: int):
+        missing = index + 1 - len(self.opcodes)
+        if missing > 0:
+            filler = [None] * missing
+            for column in (self.opcodes, self.operands_1, self.operands_2, self.operands_3):
+                column.extend(filler)
 
     def add_instruction(self, instruction: Instruction):
-        self.instructions[self.last_index] = instruction
-        self.last_index += 1
+        if self.last_index == len(self.opcodes) and instruction is not None:
+            self.opcodes.append(instruction.opcode)
+            self.operands_1.append(instruction.operand_1)
+            self.operands_2.append(instruction.operand_2)
+            self.operands_3.append(instruction.operand_3)
+            self.last_index += 1
+        else:
+            self.last_index += 1
+            self.set_instruction(self.last_index - 1, instruction)
 
     def set_instruction(self, index: int, instruction: Instruction):
-        self.instructions[index] = instruction
+        # a jump backpatched into a line never reserved is a bug, not a reason to grow
+        if not 0 <= index < self.last_index:
+            raise IndexError('list assignment index out of range')
+        self.grow(index)
+        if self.history is not None:
+            self.history.append((index, self.opcodes[index], self.operands_1[index], self.operands_2[index],
+                                 self.operands_3[index]))
+        if instruction is None:
+            self.opcodes[index] = self.operands_1[index] = self.operands_2[index] = self.operands_3[index] = None
+            return
+        self.opcodes[index] = instruction.opcode
+        self.operands_1[index] = instruction.operand_1
+        self.operands_2[index] = instruction.operand_2
+        self.operands_3[index] = instruction.operand_3
+
+    def get_instruction(self, index: int):
+        if index >= len(self.opcodes) or self.opcodes[index] is None:
+            return None
+        return Instruction(self.opcodes[index], self.operands_1[index], self.operands_2[index], self.operands_3[index])
 
     def increase_index(self):
         self.last_index += 1
 
+    def lines(self):
+        operands_1, operands_2, operands_3 = self.operands_1, self.operands_2, self.operands_3
+        for i, opcode in enumerate(self.opcodes):
+            if opcode is not None:
+                yield (f'{i}\t({opcode}, {format_operand(operands_1[i])}, {format_operand(operands_2[i])}, '
+                       f'{format_operand(operands_3[i])})')
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def copy(self):
+        block = ProgramBlock()
+        block.opcodes, block.operands_1 = self.opcodes.copy(), self.operands_1.copy()
+        block.operands_2, block.operands_3 = self.operands_2.copy(), self.operands_3.copy()
+        block.last_index = self.last_index
+        return block
+
+    def snapshot(self):
+        return Snapshot(self.last_index, len(self.opcodes), len(self.history))
+
+    def rolled_back(self, snapshot: Snapshot):
+        """The block as it was at ``snapshot``, keeping a history of its own from there."""
+        block = ProgramBlock()
+        length = snapshot.length
+        block.opcodes, block.operands_1 = self.opcodes[:length], self.operands_1[:length]
+        block.operands_2, block.operands_3 = self.operands_2[:length], self.operands_3[:length]
+        for index, opcode, operand_1, operand_2, operand_3 in reversed(self.history[snapshot.backpatches:]):
+            # lines past the snapshot's length were only added after it
+            if index < length:
+                block.opcodes[index], block.operands_1[index] = opcode, operand_1
+                block.operands_2[index], block.operands_3[index] = operand_2, operand_3
+        block.last_index = snapshot.last_index
+        block.history = self.history[:snapshot.backpatches]
+        return block
+
     def __str__(self) -> str:
-        return '\n'.join([f'{i}\t({inst})' for i, inst in enumerate(self.instructions) if inst is not None])
+        return '\n'.join(self.lines())
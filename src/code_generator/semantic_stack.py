@@ -11,6 +11,11 @@ class SemanticStack:
         self.top -= 1
         return self.stack.pop()
 
+    def copy(self):
+        stack = SemanticStack()
+        stack.stack, stack.top = self.stack.copy(), self.top
+        return stack
+
     def get_top(self, index=0):
         if self.top - index < 0:
             return None
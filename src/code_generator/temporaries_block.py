@@ -1,8 +1,26 @@
+import heapq
+from bisect import bisect_right
+
+from code_generator.operand import DIRECT, IMMEDIATE, INDIRECT, direct, indirect, mode, value
+
+# operand field written by each opcode, and the field holding a jump target rather than an address
+DESTINATIONS = {'ASSIGN': 1, 'ADD': 2, 'SUB': 2, 'MULT': 2, 'DIV': 2, 'LT': 2, 'EQ': 2}
+JUMP_TARGETS = {'JP': 0, 'JPF': 1}
+FOREVER = float('inf')
+
+
 class TemporariesBlock:
     def __init__(self):
         self.temporaries = {}
+        self.first_index = 3002
         self.last_index = 3001
 
+    def copy(self):
+        block = TemporariesBlock()
+        block.temporaries = self.temporaries.copy()
+        block.first_index, block.last_index = self.first_index, self.last_index
+        return block
+
     def get_temp(self):
         self.last_index += 1
         return self.last_index
@@ -12,3 +30,81 @@ class TemporariesBlock:
 
     def get_type(self, address):
         return 'var', 'int'
+
+    def recycle(self, program_block, pinned=()):
+        """
+        Reassigns the temporaries of a finished program by linear scan over their live ranges,
+        so temporaries that are never live at the same time share an address.
+        Returns the number of temporary addresses used before and after.
+
+        Live ranges are taken over instruction indexes and stretched to the back edge of any
+        loop they reach into. A temporary gets an address of its own when it is pinned (the
+        return value and return address of functions), read before it is first written, or
+        live across a call, since the callee may run code anywhere in the program.
+        """
+        before = self.last_index - self.first_index + 1
+        columns = (program_block.operands_1, program_block.operands_2, program_block.operands_3)
+        first, last, uses = {}, {}, []
+        own = set(pinned)
+        calls, loops = [], []
+        for line, opcode in enumerate(program_block.opcodes):
+            if opcode is None:
+                continue
+            target = JUMP_TARGETS.get(opcode)
+            if opcode == 'JP' and type(columns[0][line]) is int:
+                jump = columns[0][line]
+                if mode(jump) == IMMEDIATE:
+                    calls.append(line)
+                elif mode(jump) == DIRECT and value(jump) <= line:
+                    loops.append((value(jump), line))
+            for field, column in enumerate(columns):
+                operand = column[line]
+                if type(operand) is not int or field == target and mode(operand) != INDIRECT:
+                    continue
+                operand_mode = mode(operand)
+                address = value(operand)
+                if operand_mode == IMMEDIATE or not self.first_index <= address <= self.last_index:
+                    continue
+                if address not in first:
+                    first[address] = line
+                    if operand_mode != DIRECT or field != DESTINATIONS.get(opcode):
+                        own.add(address)
+                last[address] = line
+                uses.append((column, line, operand_mode, address))
+
+        # loops are properly nested, so the outermost loop entered after the definition decides
+        loops.sort()
+        headers = [header for header, _ in loops]
+        intervals = []
+        for address, start in first.items():
+            end = last[address]
+            index = bisect_right(headers, start)
+            while index < len(loops) and loops[index][0] <= end:
+                end = max(end, loops[index][1])
+                index += 1
+            call = bisect_right(calls, start)
+            if call < len(calls) and calls[call] < end:
+                own.add(address)
+            if address in own:
+                start, end = -1, FOREVER
+            intervals.append((start, end, address))
+
+        # an interval may reuse an address released on the line it is first written at
+        intervals.sort()
+        mapping, active, free = {}, [], []
+        top = self.first_index
+        for start, end, address in intervals:
+            while active and active[0][0] <= start:
+                heapq.heappush(free, heapq.heappop(active)[1])
+            if free:
+                new_address = heapq.heappop(free)
+            else:
+                new_address, top = top, top + 1
+            mapping[address] = new_address
+            heapq.heappush(active, (end, new_address))
+
+        for column, line, operand_mode, address in uses:
+            column[line] = indirect(mapping[address]) if operand_mode == INDIRECT else direct(mapping[address])
+        self.temporaries = {mapping.get(address, address): typ for address, typ in self.temporaries.items()}
+        self.last_index = top - 1
+        return before, top - self.first_index
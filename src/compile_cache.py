@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+from parser.parse_table import TABLE_PATH
+from parser.parser import Parser
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# An on-disk cache of compiler outputs, addressed by a hash of the source
+# text, the options and the compiler itself: the sources of the packages that
+# make up the compiler and the contents of table.json. An entry holds the
+# four output files of one compile, in a single file written elsewhere in the
+# cache and renamed into place, so concurrent compilers only ever see whole
+# entries. Hits refresh the entry's modification time, and once the entries
+# outgrow the size limit the least recently used are removed until they fill
+# EVICT_TO of it. Hit, miss, store and eviction counts are added to
+# stats.json after each compile, under a lock where fcntl is available.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMPILER_PACKAGES = ('scanner', 'parser', 'code_generator', 'writer')
+OUTPUT_FILES = ('output.txt', 'syntax_errors.txt', 'semantic_errors.txt', 'parse_tree.txt')
+DEFAULT_DIRECTORY = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                 'c-minus-compiler')
+DEFAULT_MAX_BYTES = 256 << 20
+EVICT_TO = 0.8
+ENTRY_SUFFIX = '.json'
+STATISTICS = ('hits', 'misses', 'stores', 'evictions')
+
+
+@lru_cache(None)
+def compiler_version():
+    """A hash of the compiler's Python sources and of table.json."""
+    digest = hashlib.sha256()
+    paths = []
+    for package in COMPILER_PACKAGES:
+        for directory, subdirectories, names in os.walk(os.path.join(HERE, package)):
+            subdirectories.sort()
+            paths.extend(os.path.join(directory, name) for name in sorted(names) if name.endswith('.py'))
+    for path in paths + [TABLE_PATH]:
+        with open(path, 'rb') as file:
+            digest.update(os.path.relpath(path, HERE).encode() + b'\0' + file.read() + b'\0')
+    return digest.hexdigest()
+
+
+def summarize(parser, program_block):
+    """What a compile that returned ``program_block`` came to, as a cache entry holds it."""
+    compilation = parser.compilation
+    return {'status': compilation.status, 'errors': len(compilation.syntax_errors) or len(compilation.semantic_errors),
+            'instructions': 0 if program_block is None else len(program_block), 'generated': program_block is not None}
+
+
+class CompileCache:
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        # this process's counts, those not yet added to stats.json, and the bytes of entries as last counted plus
+        # those stored since
+        self.counts = dict.fromkeys(STATISTICS, 0)
+        self.pending = dict.fromkeys(STATISTICS, 0)
+        self.size = None
+
+    def key(self, source: bytes, optimization_level=0, build_tree=True):
+        digest = hashlib.sha256(compiler_version().encode())
+        digest.update(f'\0{optimization_level}\0{int(build_tree)}\0'.encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + ENTRY_SUFFIX)
+
+    def load(self, key):
+        """The entry stored under ``key``, or None."""
+        path = self.entry_path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.count('misses')
+            return None
+        self.count('hits')
+        return entry
+
+    def store(self, key, entry):
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry).encode()
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.entry.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self.count('stores')
+        if self.size is None:
+            self.size = self.total_size()
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """``(modification time, size, path)`` of every entry."""
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def total_size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Removes the least recently used entries until they fill EVICT_TO of the size limit."""
+        entries = sorted(self.entries())
+        size = sum(size for _, size, _ in entries)
+        evictions = 0
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+                evictions += 1
+            except OSError:
+                pass
+            size -= entry_size
+        self.size = size
+        if evictions:
+            self.count('evictions', evictions)
+
+    def count(self, statistic, amount=1):
+        self.counts[statistic] += amount
+        self.pending[statistic] += amount
+
+    def flush_statistics(self):
+        """Adds the counts since the last flush to stats.json."""
+        if not any(self.pending.values()):
+            return
+        try:
+            with open(os.path.join(self.directory, 'stats.json'), 'a+') as file:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_EX)
+                file.seek(0)
+                statistics = self.read_statistics(file)
+                for statistic, amount in self.pending.items():
+                    statistics[statistic] += amount
+                file.seek(0)
+                file.truncate()
+                json.dump(statistics, file)
+        except OSError:
+            # the counts are kept for information only, and a compile never fails over them
+            return
+        self.pending = dict.fromkeys(STATISTICS, 0)
+
+    def statistics(self):
+        """The counts flushed by every process that used this cache directory."""
+        try:
+            with open(os.path.join(self.directory, 'stats.json')) as file:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_SH)
+                return self.read_statistics(file)
+        except OSError:
+            return dict.fromkeys(STATISTICS, 0)
+
+    @staticmethod
+    def read_statistics(file):
+        statistics = dict.fromkeys(STATISTICS, 0)
+        try:
+            statistics.update(json.load(file))
+        except ValueError:
+            pass
+        return statistics
+
+    def compile(self, input_file, output_dir='.', optimization_level=0, build_tree=True, echo=False):
+        """
+        Writes the outputs of compiling ``input_file`` to ``output_dir`` as
+        Parser.parse does, from the cache when they are there. Returns the
+        entry and whether it came from the cache.
+        """
+        with open(input_file, 'rb') as file:
+            key = self.key(file.read(), optimization_level, build_tree)
+        entry = self.load(key)
+        if entry is not None:
+            for name, text in entry['files'].items():
+                with open(os.path.join(output_dir, name), 'w') as file:
+                    file.write(text)
+            if echo and entry['generated']:
+                print(entry['files']['output.txt'])
+            self.flush_statistics()
+            return entry, True
+        parser = Parser(input_file, build_tree, optimization_level, output_dir)
+        entry = summarize(parser, parser.parse(echo))
+        files = entry['files'] = {}
+        for name in OUTPUT_FILES:
+            path = os.path.join(output_dir, name)
+            if name != 'parse_tree.txt' or build_tree:
+                with open(path) as file:
+                    files[name] = file.read()
+        self.store(key, entry)
+        self.flush_statistics()
+        return entry, False
@@ -0,0 +1,133 @@
+import errno
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import time
+
+from scanner.dfa import get_compiled_dfa
+from parser.compilation import FAILED
+from parser.parser import Parser
+
+# A compiler that stays loaded between requests. Each request is one line of
+# JSON, read from stdin or from a connection to a UNIX socket, like
+#   {"id": 1, "source": "void main(void) { ... }", "artifacts": ["code", "semantic_errors"],
+#    "optimization_level": 1}
+# and is answered with one line holding the id, the status of the compile,
+# the artifacts asked for and the seconds the compile took:
+#   {"id": 1, "status": "ok", "code": "0\t(JP, #1,  ,  )\n...", "semantic_errors": [], "seconds": 0.0004}
+# Nothing is written to files. The parse tree is only built when it is asked
+# for. Connections to the socket are served on threads of their own, and a
+# socket another server still answers on is never taken over.
+
+ARTIFACTS = ('code', 'syntax_errors', 'semantic_errors', 'parse_tree')
+DEFAULT_ARTIFACTS = ('code', 'syntax_errors', 'semantic_errors')
+
+
+class RequestError(Exception):
+    pass
+
+
+def compile_request(request):
+    """Compiles the source of a decoded request and returns the response."""
+    if not isinstance(request, dict):
+        raise RequestError('a request is a JSON object')
+    source = request.get('source')
+    if not isinstance(source, str):
+        raise RequestError('"source" must be the program text')
+    artifacts = request.get('artifacts', DEFAULT_ARTIFACTS)
+    if isinstance(artifacts, str) or not all(artifact in ARTIFACTS for artifact in artifacts):
+        raise RequestError(f'"artifacts" must be a list of {", ".join(ARTIFACTS)}')
+    optimization_level = request.get('optimization_level', 0)
+    if type(optimization_level) != int:
+        raise RequestError('"optimization_level" must be an integer')
+    start = time.perf_counter()
+    parser = Parser(source=source, build_tree='parse_tree' in artifacts, optimization_level=optimization_level)
+    parser.compile()
+    compilation = parser.compilation
+    response = {'id': request.get('id'), 'status': compilation.status}
+    if 'code' in artifacts:
+        response['code'] = compilation.code_text()
+    if 'syntax_errors' in artifacts:
+        response['syntax_errors'] = compilation.syntax_errors
+    if 'semantic_errors' in artifacts:
+        response['semantic_errors'] = compilation.semantic_errors
+    if 'parse_tree' in artifacts:
+        response['parse_tree'] = compilation.parse_tree_text()
+    response['seconds'] = time.perf_counter() - start
+    return response
+
+
+def request_id(request):
+    return request.get('id') if isinstance(request, dict) else None
+
+
+def respond(line):
+    """The JSON response line to a JSON request line."""
+    request = None
+    try:
+        request = json.loads(line)
+        response = compile_request(request)
+    except (ValueError, RequestError) as error:
+        response = {'id': request_id(request), 'status': FAILED, 'error': f'invalid request: {error}'}
+    except Exception as error:
+        # json.loads itself can fail this way, with RecursionError on deeply nested input
+        response = {'id': request_id(request), 'status': FAILED, 'error': f'{type(error).__name__}: {error}'}
+    return json.dumps(response) + '\n'
+
+
+def serve(requests, responses):
+    """Answers every request line read from ``requests`` until it ends; blank lines are skipped."""
+    get_compiled_dfa()
+    for line in iter(requests.readline, ''):
+        if line.strip():
+            responses.write(respond(line))
+            responses.flush()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        serve(io.TextIOWrapper(self.rfile, encoding='utf-8'),
+              io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True))
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def remove_stale_socket(path):
+    """
+    Removes the socket at ``path`` when it was left behind by a server that
+    was killed, which refuses connections. Raises OSError with EADDRINUSE when
+    anything else may still be using it.
+    """
+    if not (os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode)):
+        return
+    with socket.socket(socket.AF_UNIX) as connection:
+        try:
+            connection.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+        except FileNotFoundError:
+            return
+        except OSError:
+            pass
+    raise OSError(errno.EADDRINUSE, os.strerror(errno.EADDRINUSE), path)
+
+
+def serve_socket(path):
+    """Answers requests on the UNIX socket at ``path`` until interrupted."""
+    get_compiled_dfa()
+    remove_stale_socket(path)
+    # binding fails on a path in use, which is then left alone
+    server = CompileServer(path, RequestHandler)
+    try:
+        with server:
+            server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
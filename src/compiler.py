@@ -1,10 +1,96 @@
-from scanner.dfa import DFA
+import argparse
+import errno
+import sys
+
 from parser.parser import Parser
+from batch_compiler import INPUT_NAME, FAILED, collect_inputs, compile_all, report
+from compile_cache import DEFAULT_DIRECTORY, DEFAULT_MAX_BYTES, CompileCache
+from compile_server import serve, serve_socket
+from interpreter.translator import TranslatedProgram
+from interpreter.virtual_machine import VirtualMachine
 
 # Mohammad  Moshtaghi   99109047
 # Mahdi     Alizadeh    99101932
 
-# if __name__ == '__main__':
-DFA()
-parser = Parser()
-parser.parse()
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description='Compiles input.txt into three-address code in output.txt, or '
+                                                    'many inputs in parallel, each into its own directory.')
+    arguments.add_argument('inputs', nargs='*',
+                           help='source files, or directories searched for them, to compile on a pool of worker '
+                                'processes; without any, input.txt is compiled into the working directory')
+    arguments.add_argument('-O', dest='optimization_level', type=int, nargs='?', const=1, default=0,
+                           help='optimization level: 0 only folds constant expressions and branches and recycles '
+                                'temporaries, which every level does, 1 also runs the peephole pass, 2 also removes '
+                                'unreachable code and functions never called')
+    arguments.add_argument('--run', nargs='?', const='vm', choices=('vm', 'translated'),
+                           help='run the generated code as the tester would, on the built-in virtual machine or '
+                                'translated into Python functions')
+    arguments.add_argument('-o', '--output-dir', default='build',
+                           help='directory the inputs\' output directories are made in (default: build)')
+    arguments.add_argument('-j', '--jobs', type=int,
+                           help='worker processes compiling the inputs (default: one per CPU)')
+    arguments.add_argument('--pattern', default=INPUT_NAME,
+                           help=f'name of the source files searched for in directories (default: {INPUT_NAME})')
+    arguments.add_argument('--serve', action='store_true',
+                           help='stay loaded and compile the sources of JSON requests read a line at a time from '
+                                'stdin, answering each on a line of stdout')
+    arguments.add_argument('--socket', metavar='PATH',
+                           help='with --serve, take requests on connections to a UNIX socket at PATH instead')
+    arguments.add_argument('--cache', nargs='?', const=DEFAULT_DIRECTORY, metavar='DIR',
+                           help=f'take the outputs of a source compiled before, unchanged and with the same options '
+                                f'and compiler, from the cache in DIR (default: {DEFAULT_DIRECTORY}), and keep new '
+                                f'ones there')
+    arguments.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES >> 20, metavar='MB',
+                           help='size the least recently used cache entries are removed above '
+                                f'(default: {DEFAULT_MAX_BYTES >> 20})')
+    arguments.add_argument('--cache-stats', action='store_true',
+                           help='print the size and hit and miss counts of the cache and exit')
+    options = arguments.parse_args(argv)
+    if options.cache_stats:
+        cache = CompileCache(options.cache or DEFAULT_DIRECTORY)
+        statistics, entries = cache.statistics(), cache.entries()
+        lookups = statistics['hits'] + statistics['misses']
+        print(f'{cache.directory}: {len(entries)} entries, {sum(size for _, size, _ in entries) / 1024:,.1f} KB')
+        print(', '.join(f'{count} {statistic}' for statistic, count in statistics.items()) +
+              (f', hit rate {statistics["hits"] / lookups:.1%}' if lookups else ''))
+        return 0
+    if options.serve:
+        if options.inputs or options.run:
+            arguments.error('--serve takes its sources from requests')
+        if options.socket:
+            try:
+                serve_socket(options.socket)
+            except OSError as error:
+                if error.errno != errno.EADDRINUSE:
+                    raise
+                arguments.exit(1, f'{arguments.prog}: error: {options.socket}: address in use\n')
+        else:
+            serve(sys.stdin, sys.stdout)
+        return 0
+    if options.socket:
+        arguments.error('--socket needs --serve')
+    cache_size = options.cache_size << 20
+    if not options.inputs:
+        machine_class = TranslatedProgram if options.run == 'translated' else VirtualMachine
+        if options.cache:
+            CompileCache(options.cache, cache_size).compile(INPUT_NAME, optimization_level=options.optimization_level,
+                                                            echo=True)
+            if options.run:
+                machine_class.from_file('output.txt').run()
+            return 0
+        parser = Parser(optimization_level=options.optimization_level)
+        parser.parse()
+        if options.run:
+            machine_class.from_program_block(parser.code_generator.program_block).run()
+        return 0
+    if options.run:
+        arguments.error('--run needs a single program, compiled from input.txt')
+    inputs = collect_inputs(options.inputs, options.output_dir, options.pattern)
+    results = report(compile_all(inputs, options.jobs, options.optimization_level, cache_directory=options.cache,
+                                 cache_size=cache_size), sys.stdout)
+    return 1 if any(result.status == FAILED for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,429 @@
+import sys
+from functools import lru_cache
+
+from code_generator.arithmetic import OPERATIONS, WORD_MAX, WORD_MIN, divide, word
+from code_generator.operand import DIRECT, IMMEDIATE, INDIRECT
+from interpreter.virtual_machine import (ADD, ASSIGN, DIV, EQ, FAR, INVALID, JP, JPF, LT, MEMORY_LIMIT, MULT, OPCODES,
+                                         PRINT, SUB, UNSET, InvalidCommandError, MemoryAccessError, VirtualMachine)
+
+# Runs a program the way VirtualMachine does, but first translates it into
+# Python functions of straight-line code over the memory list, one for each
+# basic block. The function of a block goes on through the blocks control
+# falls or jumps to, and loops when it comes back to the block it started at,
+# so a loop runs inside one function call.
+# - Words a function reads or writes are kept in locals, x<address>, and only
+#   stored when it returns or an indirect operand could see them.
+# - A word is only checked for being set when it may not be on some path to
+#   the block: the words set at the start of each block are found over the
+#   jumps and fall-throughs between blocks.
+# An indirect jump to line t returns t + len(code), which enters t through a
+# function that assumes nothing is set. The translation of a program is
+# compiled once and cached by its code.
+# Run from `src`:  python -m interpreter.translator [output.txt]
+
+JUMPS = (JP, JPF, INVALID)
+# what every function sees, in the order translations take them
+NAMES = ('memory', 'far_get', 'load', 'pointer', 'store', 'write', 'divide', 'word',
+         'MemoryAccessError', 'InvalidCommandError')
+WRAPPED = {ADD: '+', SUB: '-', MULT: '*'}
+COMPARISONS = {LT: '<', EQ: '=='}
+# what a function returns to stop the program
+STOP = -1
+# the most blocks one function goes through
+TRACE_LIMIT = 8
+
+
+def leaders(code):
+    """
+    Returns the lines a block starts on: line 0, jump targets, lines after a
+    jump, and return points, the immediates assigned to words that are jumped
+    through.
+    """
+    end = len(code)
+    starts = {0}
+    jumped_through = set()
+    for line, (opcode, a_mode, a, b_mode, b, _, _) in enumerate(code):
+        if opcode in JUMPS:
+            starts.add(line + 1)
+        if opcode == JP:
+            (jumped_through if a_mode == INDIRECT else starts).add(a)
+        elif opcode == JPF:
+            (jumped_through if b_mode == INDIRECT else starts).add(b)
+    for opcode, a_mode, a, b_mode, b, _, _ in code:
+        if opcode == ASSIGN and a_mode == IMMEDIATE and b_mode == DIRECT and b in jumped_through:
+            starts.add(a)
+    return sorted(start for start in starts if 0 <= start < end)
+
+
+def block_end(code, line, stops):
+    """Returns the line after the block that runs line, which ends at a jump or before a line in ``stops``."""
+    while code[line][0] not in JUMPS and line + 1 < len(code) and line + 1 not in stops:
+        line += 1
+    return line + 1
+
+
+def successors(code, line):
+    """Returns the lines control can pass to, other than through an indirect jump, from a block ending at line."""
+    opcode, a_mode, a, b_mode, b, _, _ = code[line - 1]
+    if opcode == JP:
+        lines = [a] if a_mode != INDIRECT else []
+    elif opcode == JPF:
+        lines = [b, line] if b_mode != INDIRECT else [line]
+    elif opcode == INVALID:
+        lines = []
+    else:
+        lines = [line]
+    return [target for target in lines if 0 <= target < len(code)]
+
+
+def next_block(code, line):
+    """Returns where control goes on from a block ending at line, if it falls through or jumps to a known line."""
+    opcode, a_mode, a, b_mode, b, _, _ = code[line - 1]
+    if opcode == JP:
+        target = a if a_mode != INDIRECT else None
+    elif opcode == JPF and a_mode == IMMEDIATE and a == 0:
+        target = b if b_mode != INDIRECT else None
+    elif opcode == INVALID:
+        target = None
+    else:
+        target = line
+    return target if target is not None and 0 <= target < len(code) else None
+
+
+def direct_operands(code, start, end):
+    """
+    Returns the direct addresses lines start to end read, write or read a
+    pointer from, and those they write.
+    """
+    accessed, written = set(), set()
+    for opcode, a_mode, a, b_mode, b, c_mode, c in code[start:end]:
+        if opcode == JP or opcode == INVALID:
+            continue
+        operands, destination = [(a_mode, a)], None
+        if opcode == ASSIGN:
+            destination = b_mode, b
+        elif opcode != JPF and opcode != PRINT:
+            operands.append((b_mode, b))
+            destination = c_mode, c
+        accessed.update(number for operand_mode, number in operands
+                        if operand_mode == DIRECT or operand_mode == INDIRECT and 0 <= number < MEMORY_LIMIT)
+        if destination is not None and destination[0] == DIRECT:
+            accessed.add(destination[1])
+            written.add(destination[1])
+    return accessed, written
+
+
+def written_on_entry(code, starts):
+    """
+    Returns the direct addresses set on every path into each block, running
+    from line 0 over jumps and fall-throughs.
+    """
+    stops = frozenset(starts)
+    generated, predecessors = {}, {start: [] for start in starts}
+    for start in starts:
+        end = block_end(code, start, stops)
+        # a block that reads a word and goes on has found it set
+        generated[start] = direct_operands(code, start, end)[0]
+        for target in successors(code, end):
+            predecessors[target].append(start)
+    # None stands for every address, until a path to the block is found
+    entry = {start: None if predecessors[start] else set() for start in starts}
+    entry[0] = set()
+    changed = True
+    while changed:
+        changed = False
+        for start in starts:
+            if start == 0 or not predecessors[start]:
+                continue
+            sets = [entry[block] | generated[block] for block in predecessors[start] if entry[block] is not None]
+            if sets:
+                written = set.intersection(*sets)
+                if written != entry[start]:
+                    entry[start], changed = written, True
+    return entry
+
+
+class FunctionWriter:
+    """
+    Writes the body of the function for a run of blocks. ``cached`` holds the
+    direct addresses whose word is in its local, ``dirty`` those whose local
+    has not been stored yet and ``written`` those known to be set. Other
+    values go in locals t0, t1, ...
+    """
+
+    def __init__(self, end, written=()):
+        self.end = end
+        self.lines = []
+        self.cached = set()
+        self.dirty = set()
+        self.written = set(written)
+        self.temporaries = 0
+        self.indent = 2
+
+    def temporary(self):
+        self.temporaries += 1
+        return f't{self.temporaries - 1}'
+
+    def emit(self, text, indent=0):
+        self.lines.append('    ' * (self.indent + indent) + text)
+
+    def flush(self, indent=0, keep=frozenset()):
+        for number in sorted(self.dirty - keep):
+            self.emit(f'memory[{number}] = x{number}', indent)
+
+    def leave(self, operand_mode, number, indent=0):
+        """Emits the stores and the return of a jump to an operand."""
+        if operand_mode != INDIRECT:
+            self.flush(indent)
+            self.emit(f'return {number if 0 <= number < self.end else STOP}', indent)
+            return
+        target = f'x{number}' if number in self.cached else self.temporary()
+        if number not in self.cached:
+            self.emit(f'{target} = pointer({number})', indent)
+        self.flush(indent)
+        self.emit(f'return {target} + {self.end} if 0 <= {target} < {self.end} else {STOP}', indent)
+
+    def read(self, operand_mode, number, line):
+        """Emits what reading an operand takes and returns the expression for its word."""
+        if operand_mode == IMMEDIATE:
+            return repr(number)
+        if operand_mode == DIRECT:
+            name = f'x{number}'
+            if number not in self.cached:
+                self.emit(f'{name} = memory[{number}]')
+                if number not in self.written:
+                    self.emit(f'if {name} == {UNSET}: raise MemoryAccessError({line})')
+                self.cached.add(number)
+                self.written.add(number)
+            return name
+        result = self.temporary()
+        if operand_mode == FAR:
+            self.emit(f'{result} = load({number}, {line})')
+            return result
+        if 0 <= number < MEMORY_LIMIT:
+            pointer = self.read(DIRECT, number, line)
+        else:
+            pointer = self.temporary()
+            self.emit(f'{pointer} = load({number}, {line})')
+        # the word pointed to may be one not stored yet
+        self.flush()
+        self.dirty.clear()
+        self.emit(f'{result} = memory[{pointer}] if 0 <= {pointer} < len(memory) else far_get({pointer}, {UNSET})')
+        self.emit(f'if {result} == {UNSET}: raise MemoryAccessError({line})')
+        return result
+
+    def write(self, operand_mode, number, result, wrap=False):
+        """Emits writing an expression, wrapped to a word if ``wrap``, to an operand."""
+        name = f'x{number}' if operand_mode == DIRECT else self.temporary()
+        if result != name:
+            self.emit(f'{name} = {result}')
+        if wrap:
+            self.emit(f'if not {WORD_MIN} <= {name} <= {WORD_MAX}: {name} = word({name})')
+        if operand_mode == DIRECT:
+            self.cached.add(number)
+            self.dirty.add(number)
+            self.written.add(number)
+        elif operand_mode == FAR:
+            self.emit(f'store({number}, {name})')
+        else:
+            pointer = f'x{number}' if number in self.cached else self.temporary()
+            if number not in self.cached:
+                self.emit(f'{pointer} = pointer({number})')
+            self.flush()
+            self.emit(f'if 0 <= {pointer} < len(memory): memory[{pointer}] = {name}')
+            self.emit(f'else: store(0 if {pointer} == {UNSET} else {pointer}, {name})')
+            # the word written may be any of the cached ones
+            self.cached.clear()
+            self.dirty.clear()
+
+    def instruction(self, line, opcode, a_mode, a, b_mode, b, c_mode, c):
+        if opcode == INVALID:
+            self.emit(f'raise InvalidCommandError({line})')
+        elif opcode == JP:
+            self.leave(a_mode, a)
+        elif opcode == PRINT:
+            if a_mode == IMMEDIATE or a_mode == DIRECT and a in self.cached:
+                self.emit(f"write(f'PRINT    {{{self.read(a_mode, a, line)}}}\\n')")
+            else:
+                # the tester writes the prefix before it reads the word
+                self.emit("write('PRINT    ')")
+                self.emit(f"write(f'{{{self.read(a_mode, a, line)}}}\\n')")
+        elif opcode == JPF:
+            condition = self.read(a_mode, a, line)
+            if a_mode != IMMEDIATE:
+                self.emit(f'if {condition} == 0:')
+                self.leave(b_mode, b, 1)
+            elif a == 0:
+                self.leave(b_mode, b)
+        elif opcode == ASSIGN:
+            self.write(b_mode, b, self.read(a_mode, a, line))
+        else:
+            first, second = self.read(a_mode, a, line), self.read(b_mode, b, line)
+            if a_mode == IMMEDIATE and b_mode == IMMEDIATE:
+                self.write(c_mode, c, repr(OPERATIONS[OPCODES[opcode]](a, b)))
+            elif opcode in COMPARISONS:
+                self.write(c_mode, c, f'1 if {first} {COMPARISONS[opcode]} {second} else 0')
+            elif opcode == DIV:
+                self.write(c_mode, c, f'divide({first}, {second})')
+            else:
+                self.write(c_mode, c, f'{first} {WRAPPED[opcode]} {second}', wrap=True)
+
+
+def trace(code, start, stops):
+    """
+    Returns the blocks, as (start, end) pairs, that the function for the
+    block at ``start`` goes through, and whether it loops back to it.
+    """
+    blocks = []
+    line = start
+    while True:
+        end = block_end(code, line, stops)
+        blocks.append((line, end))
+        line = next_block(code, end)
+        if line == start:
+            return blocks, True
+        if line is None or len(blocks) == TRACE_LIMIT or any(line == block for block, _ in blocks):
+            return blocks, False
+
+
+def leaves(instruction):
+    """Whether an instruction always jumps or stops."""
+    opcode, a_mode, a = instruction[:3]
+    return opcode == JP or opcode == INVALID or opcode == JPF and a_mode == IMMEDIATE and a == 0
+
+
+def translate_function(code, start, stops, written=()):
+    """Returns the lines of the function for the block at ``start``."""
+    writer = FunctionWriter(len(code), written)
+    blocks, loops = trace(code, start, stops)
+    loaded, kept = [], frozenset()
+    if loops:
+        accessed, assigned = set(), set()
+        for first, end in blocks:
+            block_accessed, block_assigned = direct_operands(code, first, end)
+            accessed |= block_accessed
+            assigned |= block_assigned
+        # words kept in locals from one time round the loop to the next
+        loaded = sorted(accessed & writer.written)
+        for number in loaded:
+            writer.emit(f'x{number} = memory[{number}]')
+        writer.emit('while True:')
+        writer.indent += 1
+        writer.cached.update(loaded)
+        kept = frozenset(loaded) & assigned
+        writer.dirty.update(kept)
+    for first, end in blocks:
+        writer.emit(f'executed += {end - first}')
+        following = next_block(code, end)
+        for line in range(first, end):
+            # the jump the function goes on through is left out
+            if line < end - 1 or following is None or not leaves(code[line]):
+                writer.instruction(line, *code[line])
+    following = next_block(code, blocks[-1][1])
+    if loops:
+        for number in sorted(set(loaded) - writer.cached):
+            writer.emit(f'x{number} = memory[{number}]')
+        writer.flush(keep=kept)
+    elif following is not None:
+        writer.leave(DIRECT, following)
+    elif not leaves(code[blocks[-1][1] - 1]):
+        writer.leave(DIRECT, blocks[-1][1])
+    return [f'    def block_{start}():', '        global executed'] + writer.lines
+
+
+def translate(code, functions, stops):
+    """
+    Returns the source of a function that takes NAMES and returns a tuple of
+    (start, function) for each (start, written on entry) in ``functions``.
+    A function returns the line to go on from.
+    """
+    source = [f'def program({", ".join(NAMES)}):']
+    for start, written in functions:
+        source += translate_function(code, start, stops, written or ())
+    source.append(f'    return ({", ".join(f"({start}, block_{start})" for start, _ in functions)},)')
+    return '\n'.join(source) + '\n'
+
+
+@lru_cache(maxsize=64)
+def compile_program(code):
+    """Returns the compiled translation of a program, its block starts and those that assume nothing is set."""
+    starts = leaders(code)
+    entry = written_on_entry(code, starts)
+    source = translate(code, [(start, entry[start]) for start in starts], frozenset(starts))
+    return compile(source, '<translated program>', 'exec'), frozenset(starts), \
+        frozenset(start for start in starts if not entry[start])
+
+
+class TranslatedProgram(VirtualMachine):
+    """
+    A VirtualMachine whose run calls the translation of each block. Memory is
+    a list rather than an array, which Python indexes faster. Lines entered
+    through an indirect jump are translated when first reached, unless the
+    block starting there already assumes nothing is set.
+    """
+
+    def __init__(self, instructions):
+        super().__init__(instructions)
+        self.code = tuple(self.code)
+        self.memory = self.memory.tolist()
+
+    def functions(self, write, namespace):
+        """
+        Returns the function for the block at each line and at each line
+        entered through an indirect jump, and a function to translate more.
+        Their count of instructions run is ``executed`` in ``namespace``.
+        """
+        arguments = (self.memory, self.far.get, self.load, self.pointer, self.store, write, divide, word,
+                     MemoryAccessError, InvalidCommandError)
+        end = len(self.code)
+        functions = [None] * (2 * end)
+
+        def define(code_object, offset=0):
+            exec(code_object, namespace)
+            for start, function in namespace['program'](*arguments):
+                functions[start + offset] = function
+
+        def enter(pc):
+            if functions[pc - end] is None or pc - end not in unchecked:
+                define(compile(translate(self.code, [(pc - end, ())], starts), '<translated block>', 'exec'), end)
+            else:
+                functions[pc] = functions[pc - end]
+            return functions[pc]
+
+        starts = unchecked = frozenset()
+        if end:
+            code_object, starts, unchecked = compile_program(self.code)
+            define(code_object)
+        return functions, enter, starts
+
+    def run(self, out=sys.stdout):
+        """
+        Runs the program from line 0 until control leaves it, writing what
+        the tester would to ``out``. Returns the number of instructions run.
+        """
+        write = out.write
+        namespace = {'executed': 0}
+        functions, enter, starts = self.functions(write, namespace)
+        pc = 0 if self.code else STOP
+        try:
+            while pc >= 0:
+                pc = (functions[pc] or enter(pc))()
+        except (MemoryAccessError, InvalidCommandError) as error:
+            # a block is counted as run when it is entered, up to the line that failed
+            line = error.args[0]
+            self.executed = namespace['executed'] - (block_end(self.code, line, starts) - line - 1)
+            write('ERROR : Invalid access to memory\n' if isinstance(error, MemoryAccessError)
+                  else 'ERROR : Invalid Command\n')
+            return self.executed
+        self.executed = namespace['executed']
+        write(f'Total memory used: {self.memory_used()}\n')
+        return self.executed
+
+
+def main():
+    file_name = sys.argv[1] if len(sys.argv) > 1 else 'output.txt'
+    TranslatedProgram.from_file(file_name).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import re
+import sys
+from array import array
+
+from code_generator.arithmetic import WORD_MAX, WORD_MIN, divide, word
+from code_generator.operand import DIRECT, IMMEDIATE, INDIRECT, UNUSED, format_operand, mode, value
+
+# Runs the three-address code of a ProgramBlock, or of an output.txt, the way
+# the bundled tester does: lines are taken in order whatever their numbers,
+# memory is 32-bit words that must be written before they are read, and the
+# output is the PRINT lines followed by the number of words written, or an
+# error line where an unwritten word is read or a line that is not an
+# instruction is reached.
+# Run from `src`:  python -m interpreter.virtual_machine [output.txt]
+
+OPCODES = ('ASSIGN', 'ADD', 'SUB', 'MULT', 'DIV', 'LT', 'EQ', 'JP', 'JPF', 'PRINT')
+ASSIGN, ADD, SUB, MULT, DIV, LT, EQ, JP, JPF, PRINT = range(len(OPCODES))
+# what a line of output.txt that does not parse, or has an unknown opcode, runs as
+INVALID = len(OPCODES)
+# addresses outside [0, MEMORY_LIMIT) live in a dict rather than the memory array,
+# and a direct operand with such an address is decoded as FAR
+MEMORY_LIMIT = 1 << 22
+FAR = 4
+# the operand each opcode writes; the tester writes to `#n` as it would to `n`
+DESTINATIONS = {ASSIGN: 1, ADD: 2, SUB: 2, MULT: 2, DIV: 2, LT: 2, EQ: 2}
+# an unwritten word, out of the range of any value written
+UNSET = -(1 << 63)
+LINE = re.compile(r'\s*\d+\s*\(\s*(\w+)\s*,([^,]*),([^,]*),([^)\n]*)')
+NUMBER = re.compile(r'\s*[+-]?\d*')
+
+
+class MemoryAccessError(Exception):
+    pass
+
+
+class InvalidCommandError(Exception):
+    pass
+
+
+def parse_operand(text):
+    text = text.strip()
+    if not text:
+        return UNUSED
+    operand_mode = {'#': IMMEDIATE, '@': INDIRECT}.get(text[0], DIRECT)
+    # like atoi, the tester reads what is not a number, such as None, as 0
+    digits = NUMBER.match(text[1:] if operand_mode != DIRECT else text).group()
+    return int(digits if digits.lstrip('+-') else 0) << 2 | operand_mode
+
+
+class VirtualMachine:
+    """
+    Executes pre-decoded instructions: each line becomes a tuple of an opcode
+    number and the mode and value of its three operands. Immediates are
+    clamped to a word as the tester reads them.
+    """
+
+    def __init__(self, instructions):
+        instructions = [self.decode(*instruction) for instruction in instructions]
+        addresses = [address for _, *operands in instructions for operand_mode, address in zip(operands[::2], operands[1::2])
+                     if operand_mode in (DIRECT, INDIRECT) and 0 <= address < MEMORY_LIMIT]
+        self.memory = array('q', [UNSET]) * (max(addresses, default=-1) + 1)
+        self.far = {}
+        self.executed = 0
+        # modes sit at the odd positions, each followed by its number
+        self.code = [tuple(FAR if index % 2 and field == DIRECT and not 0 <= instruction[index + 1] < MEMORY_LIMIT
+                           else field for index, field in enumerate(instruction)) for instruction in instructions]
+
+    @classmethod
+    def from_program_block(cls, program_block):
+        # unfilled lines are skipped, as they are left out of output.txt
+        columns = program_block.opcodes, program_block.operands_1, program_block.operands_2, program_block.operands_3
+        return cls(instruction for instruction in zip(*columns) if instruction[0] is not None)
+
+    @classmethod
+    def from_file(cls, file_name='output.txt'):
+        instructions = []
+        with open(file_name) as file:
+            for line in file:
+                match = LINE.match(line)
+                if match:
+                    opcode, *operands = match.groups()
+                    if opcode in OPCODES:
+                        instructions.append((opcode, *map(parse_operand, operands)))
+                        continue
+                # blank lines are skipped, anything else still takes a line
+                if line.strip():
+                    instructions.append((None, UNUSED, UNUSED, UNUSED))
+        return cls(instructions)
+
+    @staticmethod
+    def decode(opcode, *operands):
+        if opcode is None:
+            return INVALID, UNUSED, 0, UNUSED, 0, UNUSED, 0
+        if opcode not in OPCODES:
+            raise ValueError(f'Unknown opcode {opcode!r}.')
+        decoded = [OPCODES.index(opcode)]
+        destination = DESTINATIONS.get(decoded[0])
+        for field, operand in enumerate(operands):
+            if type(operand) is not int:
+                raise ValueError(f'Operand {format_operand(operand)!r} of {opcode} is not encoded.')
+            operand_mode, number = mode(operand), value(operand)
+            if operand_mode == IMMEDIATE and field == destination:
+                operand_mode = DIRECT
+            elif operand_mode == IMMEDIATE:
+                number = min(max(number, WORD_MIN), WORD_MAX)
+            decoded += (operand_mode, number)
+        return tuple(decoded)
+
+    def load(self, address, line=None):
+        if 0 <= address < len(self.memory):
+            number = self.memory[address]
+        else:
+            number = self.far.get(address, UNSET)
+        if number == UNSET:
+            raise MemoryAccessError(line)
+        return number
+
+    def pointer(self, address):
+        # the tester reads a jump target or a destination through an unwritten word as 0
+        number = self.memory[address] if 0 <= address < len(self.memory) else self.far.get(address, UNSET)
+        return 0 if number == UNSET else number
+
+    def store(self, address, number):
+        memory = self.memory
+        if 0 <= address < MEMORY_LIMIT:
+            if address >= len(memory):
+                memory.extend(array('q', [UNSET]) * (max(address + 1, 2 * len(memory)) - len(memory)))
+            memory[address] = number
+        else:
+            self.far[address] = number
+
+    def run(self, out=sys.stdout):
+        """
+        Runs the program from line 0 until control leaves it, writing what
+        the tester would to ``out``. Returns the number of instructions run.
+        """
+        code, load, pointer, store = self.code, self.load, self.pointer, self.store
+        memory = self.memory
+        end = len(code)
+        write = out.write
+        pc = executed = 0
+        try:
+            while 0 <= pc < end:
+                opcode, a_mode, a, b_mode, b, c_mode, c = code[pc]
+                executed += 1
+                pc += 1
+                if opcode == PRINT:
+                    write('PRINT    ')
+                elif opcode == JP:
+                    if a_mode == INDIRECT:
+                        pc = pointer(a)
+                    else:
+                        pc = a
+                    continue
+                elif opcode == INVALID:
+                    raise InvalidCommandError()
+
+                # the first operand is read by everything left
+                if a_mode == DIRECT:
+                    a = memory[a]
+                    if a == UNSET:
+                        raise MemoryAccessError()
+                elif a_mode != IMMEDIATE:
+                    a = load(load(a)) if a_mode == INDIRECT else load(a)
+
+                if opcode == ASSIGN:
+                    result = a
+                    c_mode, c = b_mode, b
+                elif opcode == JPF:
+                    if a == 0:
+                        pc = b if b_mode != INDIRECT else pointer(b)
+                    continue
+                elif opcode == PRINT:
+                    write(f'{a}\n')
+                    continue
+                else:
+                    if b_mode == DIRECT:
+                        b = memory[b]
+                        if b == UNSET:
+                            raise MemoryAccessError()
+                    elif b_mode != IMMEDIATE:
+                        b = load(load(b)) if b_mode == INDIRECT else load(b)
+                    if opcode == ADD:
+                        result = a + b
+                    elif opcode == SUB:
+                        result = a - b
+                    elif opcode == MULT:
+                        result = a * b
+                    elif opcode == LT:
+                        result = int(a < b)
+                    elif opcode == EQ:
+                        result = int(a == b)
+                    else:
+                        result = divide(a, b)
+                    if not WORD_MIN <= result <= WORD_MAX:
+                        result = word(result)
+
+                if c_mode == DIRECT:
+                    memory[c] = result
+                else:
+                    store(pointer(c) if c_mode == INDIRECT else c, result)
+        except MemoryAccessError:
+            write('ERROR : Invalid access to memory\n')
+            self.executed = executed
+            return executed
+        except InvalidCommandError:
+            write('ERROR : Invalid Command\n')
+            self.executed = executed
+            return executed
+        self.executed = executed
+        write(f'Total memory used: {self.memory_used()}\n')
+        return executed
+
+    def memory_used(self):
+        return len(self.memory) - self.memory.count(UNSET) + len(self.far)
+
+
+def main():
+    file_name = sys.argv[1] if len(sys.argv) > 1 else 'output.txt'
+    VirtualMachine.from_file(file_name).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+from functools import partial
+
+from code_generator.code_gen import CodeGenerator
+from scanner.symbol_table import SymbolTable
+from writer.code_generator_writer import CodeGeneratorWriter
+from writer.parse_tree_writer import ParseTreeWriter
+from writer.syntax_error_writer import SyntaxErrorWriter
+
+CORRECT_PROGRAM = 'The input program is semantically correct.'
+
+OK = 'ok'
+SYNTAX_ERRORS = 'syntax errors'
+SEMANTIC_ERRORS = 'semantic errors'
+# a compile that raised instead of reporting errors
+FAILED = 'failed'
+STATUSES = (OK, SYNTAX_ERRORS, SEMANTIC_ERRORS, FAILED)
+
+
+class Compilation:
+    """
+    Everything one compile of one source owns and changes: the symbol table
+    its identifiers are interned in, the code generator with its data block,
+    program block and temporaries, the parse tree and the errors found. The
+    scanner DFA and the parse table are built once per process and only read,
+    so compilations can run one after another in a warm process, or side by
+    side in threads, without seeing each other.
+
+    Nothing is written until ``write`` is called.
+    """
+
+    def __init__(self, input_file=None, source=None, optimization_level=0):
+        self.input_file = input_file
+        self.source = source
+        self.optimization_level = optimization_level
+        self.symbol_table = SymbolTable()
+        self.code_generator = CodeGenerator()
+        self.tree = None
+        self.root = None
+        self.syntax_errors = []
+        self.semantic_errors = []
+        # the generated code, or None until it is generated and when error recovery gives up
+        self.program_block = None
+
+    @property
+    def status(self):
+        if self.syntax_errors:
+            return SYNTAX_ERRORS
+        return SEMANTIC_ERRORS if self.semantic_errors else OK
+
+    def finish(self, root):
+        """
+        Completes the tree under ``root`` and the program the semantic
+        actions generated, with constant expressions and branches already
+        folded: optimizes it at ``optimization_level`` and recycles its
+        temporaries, which is done at every level.
+        """
+        self.root = root
+        if self.tree is not None:
+            self.tree.add_end(root)
+        self.code_generator.optimize(self.optimization_level)
+        self.code_generator.recycle_temporaries()
+        self.program_block = self.code_generator.program_block
+        return self.program_block
+
+    def code_text(self):
+        """The text of output.txt, or None when no code was generated."""
+        return None if self.program_block is None else '\n'.join(self.program_block.lines())
+
+    def parse_tree_text(self):
+        """The text of parse_tree.txt, or None without a tree."""
+        return None if self.tree is None or self.program_block is None else '\n'.join(self.tree.lines(self.root))
+
+    def write(self, output_dir='.', echo=None):
+        """
+        Writes the output files to ``output_dir``, and the program also to
+        ``echo`` if given. When error recovery gave up only the syntax errors
+        are written, and the other files are left empty.
+        """
+        output = partial(os.path.join, output_dir)
+        parse_tree_writer = ParseTreeWriter(output('parse_tree.txt')) if self.tree is not None else None
+        syntax_error_writer = SyntaxErrorWriter(output('syntax_errors.txt'))
+        code_generator_writer = CodeGeneratorWriter(output('output.txt'))
+        semantic_error_writer = SyntaxErrorWriter(output('semantic_errors.txt'))
+        syntax_error_writer.write(self.syntax_errors)
+        if self.program_block is None:
+            for writer in (parse_tree_writer, code_generator_writer, semantic_error_writer):
+                if writer is not None:
+                    writer.close_file()
+            return
+        if parse_tree_writer is not None:
+            parse_tree_writer.write(self.tree.lines(self.root))
+        code_generator_writer.write(self.program_block, echo=echo)
+        if echo is not None:
+            echo.write('\n')
+        semantic_error_writer.write(self.semantic_errors if len(self.semantic_errors) > 0 else [CORRECT_PROGRAM])
@@ -1,134 +1,435 @@
-import re
+import argparse
 import json
 import os
+import re
+import sys
 
+# Builds table.json straight from grammar.y (or the grammar.txt notation):
+# LR(0) states numbered the way bison numbers them, LALR(1) lookaheads by
+# DeRemer & Pennello's relations, and FIRST/FOLLOW as integer bitsets over
+# the terminals. Run from anywhere:
+#   python parse_table_generator.py [grammar.y|grammar.txt] [-o table.json]
 
-# you can uncomment this once you have
-# made sure bison 3.8.2 is installed.
-# os.system('bison grammar.y --report=all')
-# os.system('rm grammar.tab.c')
-# print(os.listdir('./src/parser/grammar/'))
-
-def correct_form(token):
-    token = re.sub('[\'"]', '', token)
-    if token == '$end':
-        return '$'
-    return token
-
-
-f = open("grammar.output", "r")
-content = f.read()
-content = content.replace('ε', 'epsilon')
-f.close()
-x = content.split('\n\n\n')
-
-table = {'terminals': [], 'non_terminals': [], 'first': {}, 'follow': {}, 'grammar': {}, 'parse_table': {}}
-
-# extract grammar rules
-for rule in x[0].split('\n\n')[1:]:
-    rule_number = None
-    non_terminal = None
-    flag = False
-    s = []
-    for t in rule.split():
-        if t.isnumeric():
-            rule_number = int(t)
-            flag = True
-        elif flag and not non_terminal:
-            non_terminal = correct_form(t.replace(':', ''))
-        elif t == '|':
-            table['grammar'][rule_number - 1] = [non_terminal, '->'] + s
-            s = []
-        else:
-            s.append(correct_form(t))
-    table['grammar'][rule_number] = [non_terminal, '->'] + s
-
-# extract terminals
-for terminal in x[1].split('\n')[2:]:
-    print("" + str(terminal.split()) + "")
-    t = correct_form(terminal.split()[0])
-    if t != 'error':  # bison adds an error terminal to the grammar
-        table['terminals'].append(t)
-
-# extract non terminals
-for non_terminal in x[2].split('\n')[2:]:
-    nt = correct_form(non_terminal.split()[0])
-    if nt != 'on':
-        table['non_terminals'].append(nt)
-
-
-# create first and follow set
-# bison does not show which non-terminal to reduce at
-# so we need the follow set of the non-terminals
-
-def union(x1, x2):
-    n = len(x1)
-    x1 |= x2
-    return len(x1) != n
-
-
-first = {i: set() for i in table['non_terminals']}
-first.update((i, {i}) for i in table['terminals'])
-follow = {i: set() for i in table['non_terminals']}
-follow['program'] = set('$')
-epsilon = set()
-while True:
-    updated = False
-
-    for rule in table['grammar'].values():
-        nt, expression = rule[0], rule[2:]
-
-        # first
-        for symbol in expression:
-            if symbol == 'epsilon':
-                updated |= union(epsilon, {nt})
-                break
-            updated |= union(first[nt], first[symbol])
-            if symbol not in epsilon:
-                break
+GRAMMAR_DIR = os.path.dirname(os.path.abspath(__file__))
+END = '$'
+ACCEPT = '$accept'
+EPSILON = 'epsilon'
+
+Y_TOKEN = re.compile(r"\s+|/\*.*?\*/|//[^\n]*|(%%|%\w+|'(?:\\.|[^'\\])+'|\"[^\"]*\"|[A-Za-z_][\w.]*|[:|;]|<[^>]*>)",
+                     re.DOTALL)
+
+
+class GrammarError(Exception):
+    pass
+
+
+class Grammar:
+    """
+    Symbols are numbered terminals first, in table.json order ('$' is 0),
+    then non-terminals starting with '$accept'. Rule 0 is `$accept -> start $`.
+    ``order`` ranks the symbols the way bison numbers them internally, which
+    fixes the order states are created in.
+    """
+
+    def __init__(self, terminals, non_terminals, rules, order):
+        self.terminals = terminals
+        self.non_terminals = non_terminals
+        self.symbols = terminals + non_terminals
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.terminal_count = len(terminals)
+        self.rules = [(self.index[lhs], tuple(self.index[symbol] for symbol in rhs)) for lhs, rhs in rules]
+        self.rank = [0] * len(self.symbols)
+        for position, symbol in enumerate(order):
+            self.rank[self.index[symbol]] = position
+
+    def is_terminal(self, symbol: int) -> bool:
+        return symbol < self.terminal_count
+
+    @staticmethod
+    def from_file(path):
+        with open(path, 'r') as f:
+            text = f.read()
+        if path.endswith('.y'):
+            return Grammar.from_bison(text)
+        return Grammar.from_text(text)
+
+    @staticmethod
+    def from_bison(text):
+        declared, start, sections = [], None, [[]]
+        for match in Y_TOKEN.finditer(text):
+            token = match.group(1)
+            if token == '%%':
+                sections.append([])
+            elif token is not None and not token.startswith('<'):
+                sections[-1].append(token)
+        if len(sections) < 2:
+            raise GrammarError('grammar.y has no %% rules section')
+
+        directive = None
+        for token in sections[0]:
+            if token.startswith('%'):
+                directive = token
+            elif directive == '%token':
+                declared.append(token)
+            elif directive == '%start':
+                start = token
+
+        rules, lhs, rhs, expect_lhs = [], None, [], True
+        for token in sections[1]:
+            if expect_lhs:
+                lhs, expect_lhs = token, False
+            elif token == ':':
+                rhs = []
+            elif token in ('|', ';'):
+                rules.append((lhs, rhs))
+                rhs, expect_lhs = [], token == ';'
+            elif token != '%empty':
+                rhs.append(token.strip('\'"') if token[0] in '\'"' else token)
+        if not expect_lhs:
+            raise GrammarError(f'rule for {lhs} is not terminated with ;')
 
-        # follow
-        aux = follow[nt]
-        for symbol in reversed(expression):
-            if symbol == 'epsilon':
+        char_literals = {token.strip("'") for token in sections[1] if token.startswith("'")}
+        order = Grammar.terminal_order(rules, declared)
+        position = {symbol: i for i, symbol in enumerate(order)}
+
+        def token_number(symbol):
+            # bison numbers character literals by their code, the rest from 258 on
+            quoted = len(symbol) == 1 and symbol in char_literals
+            return (0, ord(symbol)) if quoted else (1, position[symbol])
+
+        terminals = [END] + sorted(order[1:], key=token_number)
+        return Grammar.augment(terminals, order, rules, start)
+
+    @staticmethod
+    def from_text(text):
+        rules = []
+        for line in text.splitlines():
+            match = re.match(r'\s*\d+\.\s*(\S+)\s*->(.*)', line)
+            if match is None:
+                continue
+            for alternative in match.group(2).split('|'):
+                rules.append((match.group(1), [symbol for symbol in alternative.split() if symbol != 'Epsilon']))
+        order = Grammar.terminal_order(rules, [])
+        return Grammar.augment(list(order), order, rules, None)
+
+    @staticmethod
+    def terminal_order(rules, declared):
+        non_terminals = {lhs for lhs, _ in rules}
+        order = {END: None}
+        for symbol in declared + [symbol for _, rhs in rules for symbol in rhs]:
+            if symbol not in non_terminals:
+                order.setdefault(symbol)
+        return list(order)
+
+    @staticmethod
+    def augment(terminals, terminal_order, rules, start):
+        if not rules:
+            raise GrammarError('grammar has no rules')
+        non_terminals = list(dict.fromkeys([ACCEPT] + [lhs for lhs, _ in rules]))
+        start = start or rules[0][0]
+        if start not in non_terminals:
+            raise GrammarError(f'start symbol {start} has no rules')
+        return Grammar(terminals, non_terminals, [(ACCEPT, [start, END])] + rules, terminal_order + non_terminals)
+
+
+def bits(bitset):
+    """Indices of the set bits, lowest first."""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+def propagate(values, dependents, symbols):
+    """Worklist closure: values[b] |= values[a] for every b in dependents[a]."""
+    pending, queued = list(symbols), set(symbols)
+    while pending:
+        symbol = pending.pop()
+        queued.discard(symbol)
+        for dependent in dependents[symbol]:
+            merged = values[dependent] | values[symbol]
+            if merged != values[dependent]:
+                values[dependent] = merged
+                if dependent not in queued:
+                    queued.add(dependent)
+                    pending.append(dependent)
+
+
+def nullable_symbols(grammar):
+    nullable = [False] * len(grammar.symbols)
+    remaining = [len(rhs) for _, rhs in grammar.rules]
+    occurrences = [[] for _ in grammar.symbols]
+    pending = []
+    for rule, (lhs, rhs) in enumerate(grammar.rules):
+        for symbol in rhs:
+            occurrences[symbol].append(rule)
+        if not rhs and not nullable[lhs]:
+            nullable[lhs] = True
+            pending.append(lhs)
+    while pending:
+        for rule in occurrences[pending.pop()]:
+            remaining[rule] -= 1
+            lhs = grammar.rules[rule][0]
+            if remaining[rule] == 0 and not nullable[lhs]:
+                nullable[lhs] = True
+                pending.append(lhs)
+    return nullable
+
+
+def first_sets(grammar, nullable):
+    first = [1 << symbol if grammar.is_terminal(symbol) else 0 for symbol in range(len(grammar.symbols))]
+    dependents = [[] for _ in grammar.symbols]
+    for lhs, rhs in grammar.rules:
+        for symbol in rhs:
+            if grammar.is_terminal(symbol):
+                first[lhs] |= first[symbol]
+            else:
+                dependents[symbol].append(lhs)
+            if not nullable[symbol]:
                 break
-            if symbol in follow:
-                updated |= union(follow[symbol], aux)
-            if symbol in epsilon:
-                aux = aux.union(first[symbol])
+    propagate(first, dependents, range(len(grammar.symbols)))
+    return first
+
+
+def follow_sets(grammar, nullable, first):
+    follow = [0] * len(grammar.symbols)
+    dependents = [[] for _ in grammar.symbols]
+    for lhs, rhs in grammar.rules:
+        trailer, trailer_nullable = 0, True
+        for symbol in reversed(rhs):
+            if not grammar.is_terminal(symbol):
+                follow[symbol] |= trailer
+                if trailer_nullable:
+                    dependents[lhs].append(symbol)
+            if nullable[symbol]:
+                trailer |= first[symbol]
             else:
-                aux = first[symbol]
-
-    if not updated:
-        break
-
-table['first'] = first
-table['follow'] = follow
-
-# create the parse table
-for state, content in enumerate(x[3:]):
-    table['parse_table'][state] = {}
-    if '$default  accept' in content:
-        table['parse_table'][state]['$'] = 'accept'
-        continue
-    shifts = re.findall(r"(\S*)\s*shift, and go to state (\d+)", content)
-    gotos = re.findall(r"  (\S*)\s*go to state (\d+)", content)
-    reduces = re.findall(r"reduce using rule (\d+) \S*", content)
-    for terminal, dst in shifts:
-        table['parse_table'][state][correct_form(terminal)] = f'shift_{dst}'
-    for non_terminal, dst in gotos:
-        table['parse_table'][state][correct_form(non_terminal)] = f'goto_{dst}'
-    for reduce_rule in reduces:
-        nt = table['grammar'][int(reduce_rule)][0]
-        for symbol in table['follow'][nt]:
-            table['parse_table'][state][correct_form(symbol)] = f'reduce_{reduce_rule}'
-
-# create a json file containing the information
-# set are not json serializable, so we convert them to lists
-for t in table['non_terminals'] + table['terminals']:
-    table['first'][t] = list(table['first'][t])
-    if t in table['follow']:
-        table['follow'][t] = list(table['follow'][t])
-json_object = json.dumps(table, indent=4)
-with open("table.json", "w") as outfile:
-    outfile.write(json_object)
+                trailer, trailer_nullable = first[symbol], False
+    propagate(follow, dependents, range(len(grammar.symbols)))
+    return follow
+
+
+class Automaton:
+    """LR(0) states with LALR(1) lookaheads for their reductions."""
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.nullable = nullable_symbols(grammar)
+        self.first = first_sets(grammar, self.nullable)
+        self.follow = follow_sets(grammar, self.nullable, self.first)
+
+        # items are numbered rule by rule; item_symbol is the symbol after the dot or -1
+        self.rule_item, self.item_rule, self.item_symbol = [], [], []
+        for rule, (_, rhs) in enumerate(grammar.rules):
+            self.rule_item.append(len(self.item_rule))
+            for symbol in rhs + (-1,):
+                self.item_rule.append(rule)
+                self.item_symbol.append(symbol)
+        self.derives = self.derived_items()
+
+        self.kernels, self.transitions = [], []
+        self.build_states()
+        self.lookaheads = self.lalr_lookaheads()
+
+    def derived_items(self):
+        """For each non-terminal, the initial items of every rule it derives leftmost."""
+        grammar = self.grammar
+        rules_of = {}
+        for rule, (lhs, _) in enumerate(grammar.rules):
+            rules_of.setdefault(lhs, []).append(rule)
+        derives = {}
+        for non_terminal in rules_of:
+            seen, pending, items = {non_terminal}, [non_terminal], []
+            while pending:
+                for rule in rules_of[pending.pop()]:
+                    items.append(self.rule_item[rule])
+                    rhs = grammar.rules[rule][1]
+                    if rhs and not grammar.is_terminal(rhs[0]) and rhs[0] not in seen:
+                        seen.add(rhs[0])
+                        pending.append(rhs[0])
+            derives[non_terminal] = items
+        return derives
+
+    def closure(self, kernel):
+        items = set(kernel)
+        for item in kernel:
+            symbol = self.item_symbol[item]
+            if symbol >= 0 and not self.grammar.is_terminal(symbol):
+                items.update(self.derives[symbol])
+        return sorted(items)
+
+    def build_states(self):
+        state_of = {}
+
+        def state(kernel):
+            if kernel not in state_of:
+                state_of[kernel] = len(self.kernels)
+                self.kernels.append(kernel)
+            return state_of[kernel]
+
+        state((self.rule_item[0],))
+        current = 0
+        while current < len(self.kernels):
+            successors = {}
+            for item in self.closure(self.kernels[current]):
+                symbol = self.item_symbol[item]
+                if symbol >= 0:
+                    successors.setdefault(symbol, []).append(item + 1)
+            self.transitions.append({symbol: state(tuple(successors[symbol]))
+                                     for symbol in sorted(successors, key=self.grammar.rank.__getitem__)})
+            current += 1
+
+    def reductions(self, state):
+        """The rules completed in a state, lowest rule first."""
+        return [self.item_rule[item] for item in self.closure(self.kernels[state]) if self.item_symbol[item] < 0]
+
+    def lalr_lookaheads(self):
+        grammar, transitions = self.grammar, self.transitions
+        goto_index = {}
+        for state, row in enumerate(transitions):
+            for symbol in row:
+                if not grammar.is_terminal(symbol):
+                    goto_index[state, symbol] = len(goto_index)
+
+        direct_reads = [0] * len(goto_index)
+        reads = [[] for _ in goto_index]
+        includes = [[] for _ in goto_index]
+        lookback = {}
+        rules_of = {}
+        for rule, (lhs, _) in enumerate(grammar.rules):
+            rules_of.setdefault(lhs, []).append(rule)
+
+        for (state, non_terminal), i in goto_index.items():
+            target = transitions[state][non_terminal]
+            for symbol in transitions[target]:
+                if grammar.is_terminal(symbol):
+                    direct_reads[i] |= 1 << symbol
+                elif self.nullable[symbol]:
+                    reads[i].append(goto_index[target, symbol])
+            for rule in rules_of[non_terminal]:
+                rhs, current = grammar.rules[rule][1], state
+                for position, symbol in enumerate(rhs):
+                    if not grammar.is_terminal(symbol) and all(self.nullable[rest] for rest in rhs[position + 1:]):
+                        includes[goto_index[current, symbol]].append(i)
+                    current = transitions[current][symbol]
+                lookback.setdefault((current, rule), []).append(i)
+
+        follow = digraph(includes, digraph(reads, direct_reads))
+        lookaheads = {}
+        for key, gotos in lookback.items():
+            lookahead = 0
+            for i in gotos:
+                lookahead |= follow[i]
+            lookaheads[key] = lookahead
+        return lookaheads
+
+
+def digraph(edges, base):
+    """DeRemer & Pennello's digraph: result[x] = base[x] | result[y] for every edge x -> y, via Tarjan's SCCs."""
+    result, depth, stack = list(base), [0] * len(edges), []
+    infinity = len(edges) + 1
+    for root in range(len(edges)):
+        if depth[root]:
+            continue
+        stack.append(root)
+        depth[root] = len(stack)
+        work = [[root, 0, len(stack)]]
+        while work:
+            frame = work[-1]
+            x, position = frame[0], frame[1]
+            if position < len(edges[x]):
+                frame[1] += 1
+                y = edges[x][position]
+                if depth[y] == 0:
+                    stack.append(y)
+                    depth[y] = len(stack)
+                    work.append([y, 0, len(stack)])
+                    continue
+                depth[x] = min(depth[x], depth[y])
+                result[x] |= result[y]
+                continue
+            work.pop()
+            if depth[x] == frame[2]:
+                while True:
+                    top = stack.pop()
+                    depth[top] = infinity
+                    result[top] = result[x]
+                    if top == x:
+                        break
+            if work:
+                parent = work[-1][0]
+                depth[parent] = min(depth[parent], depth[x])
+                result[parent] |= result[x]
+    return result
+
+
+def build_table(grammar, lalr_only=False, log=sys.stderr):
+    """
+    The table.json dictionary. Reductions go on their LALR(1) lookaheads,
+    conflicts resolved as bison does (shift over reduce, then the lower
+    rule). Unless ``lalr_only``, the cells still empty after that also
+    reduce on the FOLLOW set of the rule, which is what the bison-based
+    generator emitted and what the error recovery messages are tuned to.
+    """
+    automaton = Automaton(grammar)
+    symbols, follow = grammar.symbols, automaton.follow
+    accept_item = automaton.rule_item[1] - 1
+    conflicts = 0
+
+    parse_table = {}
+    for state, row in enumerate(automaton.transitions):
+        if accept_item in automaton.kernels[state]:
+            parse_table[state] = {END: 'accept'}
+            continue
+        actions = {}
+        for symbol, target in row.items():
+            actions[symbols[symbol]] = f'shift_{target}' if grammar.is_terminal(symbol) else f'goto_{target}'
+        reductions = automaton.reductions(state)
+        for rule in reductions:
+            for terminal in bits(automaton.lookaheads.get((state, rule), 0)):
+                current = actions.get(symbols[terminal])
+                if current is None:
+                    actions[symbols[terminal]] = f'reduce_{rule}'
+                    continue
+                conflicts += 1
+                kind = 'shift' if current.startswith('shift') else 'reduce'
+                print(f'state {state}: {kind}/reduce conflict on {symbols[terminal]!r}, rule {rule} not used',
+                      file=log)
+        if not lalr_only:
+            for rule in reductions:
+                for terminal in bits(follow[grammar.rules[rule][0]]):
+                    actions.setdefault(symbols[terminal], f'reduce_{rule}')
+        parse_table[state] = actions
+
+    def names(bitset):
+        return [symbols[terminal] for terminal in bits(bitset)]
+
+    non_terminals = range(grammar.terminal_count, len(symbols))
+    first = {symbols[symbol]: names(automaton.first[symbol]) for symbol in non_terminals}
+    first.update((terminal, [terminal]) for terminal in grammar.terminals)
+    grammar_rules = {rule: [symbols[lhs], '->'] + ([symbols[symbol] for symbol in rhs] or [EPSILON])
+                     for rule, (lhs, rhs) in enumerate(grammar.rules)}
+    table = {'terminals': grammar.terminals, 'non_terminals': grammar.non_terminals, 'first': first,
+             'follow': {symbols[symbol]: names(follow[symbol]) for symbol in non_terminals},
+             'grammar': grammar_rules, 'parse_table': parse_table}
+    return table, conflicts
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description='Generate the LALR(1) parse table for the parser.')
+    arguments.add_argument('grammar', nargs='?', default=os.path.join(GRAMMAR_DIR, 'grammar.y'),
+                           help='grammar.y, or a grammar in the numbered grammar.txt notation')
+    arguments.add_argument('-o', '--output', default=os.path.join(GRAMMAR_DIR, 'table.json'))
+    arguments.add_argument('--lalr', action='store_true',
+                           help='reduce only on LALR(1) lookaheads instead of filling FOLLOW sets')
+    options = arguments.parse_args(argv)
+
+    table, conflicts = build_table(Grammar.from_file(options.grammar), options.lalr)
+    with open(options.output, 'w') as outfile:
+        outfile.write(json.dumps(table, indent=4))
+    print(f'{len(table["parse_table"])} states, {len(table["grammar"])} rules, {conflicts} conflicts')
+    return 1 if conflicts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import marshal
+import os
+from array import array
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grammar')
+TABLE_PATH = os.path.join(GRAMMAR_DIR, 'table.json')
+GRAMMAR_PATH = os.path.join(GRAMMAR_DIR, 'grammar.y')
+CACHE_PATH = os.path.join(GRAMMAR_DIR, 'table.cache')
+CACHE_VERSION = 2
+
+# Actions are encoded as integers: 0 is an error, a shift to state s is s + 1
+# and a reduce by rule r is -(r + 1). Rule 0 is `$accept -> program $`, which
+# is never reduced, so its code stands for accept.
+ERROR = 0
+ACCEPT = -1
+NO_GOTO = -1
+
+
+def encode_action(action: str) -> int:
+    kind, _, value = action.partition('_')
+    if kind == 'shift':
+        return int(value) + 1
+    if kind == 'reduce':
+        return -(int(value) + 1)
+    if kind == 'accept':
+        return ACCEPT
+    raise ValueError(f'unknown action {action}')
+
+
+class ParseTable:
+    """
+    Integer form of ``table.json``. ``actions`` holds one row per state
+    indexed by terminal number and ``gotos`` one row per state indexed by
+    non-terminal number; both are flattened into 16-bit arrays.
+    """
+
+    def __init__(self, terminals, non_terminals, rule_lhs, rule_rhs, actions, gotos, first, follow,
+                 state_gotos=None, recovery=None):
+        self.terminals = terminals
+        self.non_terminals = non_terminals
+        self.terminal_index = {terminal: i for i, terminal in enumerate(terminals)}
+        self.non_terminal_index = {non_terminal: i for i, non_terminal in enumerate(non_terminals)}
+        self.rule_lhs = rule_lhs
+        self.rule_rhs = rule_rhs
+        self.rule_length = [len(rhs) for rhs in rule_rhs]
+        self.actions = actions
+        self.gotos = gotos
+        self.first = first
+        self.follow = follow
+        self.state_count = len(actions) // len(terminals)
+        # panic-mode recovery tables: the non-terminals each state has a goto on, alphabetically,
+        # and for each state which of those the parser resumes with after a given terminal
+        if state_gotos is None or recovery is None:
+            state_gotos, recovery = self.recovery_tables()
+        self.state_gotos = state_gotos
+        self.recovery = recovery
+        self.goto_states = frozenset(state for state, names in enumerate(state_gotos) if names)
+
+    @staticmethod
+    def from_json(path=TABLE_PATH):
+        import json  # only needed when the cache is rebuilt
+        with open(path, 'r') as f:
+            grammar = json.load(f)
+        terminals, non_terminals = grammar['terminals'], grammar['non_terminals']
+        terminal_index = {terminal: i for i, terminal in enumerate(terminals)}
+        non_terminal_index = {non_terminal: i for i, non_terminal in enumerate(non_terminals)}
+
+        rule_count = max(int(number) for number in grammar['grammar']) + 1
+        rule_lhs, rule_rhs = [NO_GOTO] * rule_count, [[] for _ in range(rule_count)]
+        for number, rule in grammar['grammar'].items():
+            rule_lhs[int(number)] = non_terminal_index[rule[0]]
+            rule_rhs[int(number)] = [symbol for symbol in rule[2:] if symbol != 'epsilon']
+
+        state_count = max(int(state) for state in grammar['parse_table']) + 1
+        actions = array('h', [ERROR]) * (state_count * len(terminals))
+        gotos = array('h', [NO_GOTO]) * (state_count * len(non_terminals))
+        for state, row in grammar['parse_table'].items():
+            for symbol, action in row.items():
+                if action.startswith('goto'):
+                    gotos[int(state) * len(non_terminals) + non_terminal_index[symbol]] = int(action[5:])
+                else:
+                    actions[int(state) * len(terminals) + terminal_index[symbol]] = encode_action(action)
+
+        return ParseTable(terminals, non_terminals, rule_lhs, rule_rhs, actions, gotos,
+                          grammar['first'], grammar['follow'])
+
+    def recovery_tables(self):
+        follow_sets = {name: frozenset(follow) for name, follow in self.follow.items()}
+        non_terminal_count = len(self.non_terminals)
+        state_gotos, recovery = [], []
+        for state in range(self.state_count):
+            row = self.gotos[state * non_terminal_count:(state + 1) * non_terminal_count]
+            names = sorted(self.non_terminals[i] for i, target in enumerate(row) if target >= 0)
+            resume = {}
+            for name in names:
+                for terminal in follow_sets.get(name, ()):
+                    resume.setdefault(terminal, name)
+            state_gotos.append(tuple(names))
+            recovery.append(resume)
+        return state_gotos, recovery
+
+    def action(self, state: int, terminal: int) -> int:
+        return self.actions[state * len(self.terminals) + terminal]
+
+    def goto(self, state: int, non_terminal: int) -> int:
+        return self.gotos[state * len(self.non_terminals) + non_terminal]
+
+    def dumps(self, fingerprint) -> bytes:
+        return marshal.dumps((CACHE_VERSION, fingerprint, self.terminals, self.non_terminals, self.rule_lhs,
+                              self.rule_rhs, self.actions.tobytes(), self.gotos.tobytes(), self.first, self.follow,
+                              self.state_gotos, self.recovery))
+
+    @staticmethod
+    def loads(data: bytes, fingerprint):
+        """Returns the cached table, or None when it is stale or unreadable."""
+        try:
+            (version, cached_fingerprint, terminals, non_terminals, rule_lhs, rule_rhs, actions, gotos, first,
+             follow, state_gotos, recovery) = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+        if version != CACHE_VERSION or cached_fingerprint != fingerprint:
+            return None
+        actions_array, gotos_array = array('h'), array('h')
+        actions_array.frombytes(actions)
+        gotos_array.frombytes(gotos)
+        return ParseTable(terminals, non_terminals, rule_lhs, rule_rhs, actions_array, gotos_array, first, follow,
+                          state_gotos, recovery)
+
+
+def source_fingerprint(paths=(TABLE_PATH, GRAMMAR_PATH)):
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append((os.path.basename(path), None, None))
+    return tuple(fingerprint)
+
+
+def write_cache(table: ParseTable, fingerprint, cache_path=CACHE_PATH):
+    # written next to the target and renamed, so readers never see half a file
+    import tempfile
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), prefix='.table.', suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(table.dumps(fingerprint))
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def load_parse_table(table_path=TABLE_PATH, cache_path=CACHE_PATH) -> ParseTable:
+    """Loads the binary cache, rebuilding it from table.json when a source changed."""
+    fingerprint = source_fingerprint((table_path, GRAMMAR_PATH))
+    try:
+        with open(cache_path, 'rb') as f:
+            table = ParseTable.loads(f.read(), fingerprint)
+        if table is not None:
+            return table
+    except OSError:
+        pass
+    table = ParseTable.from_json(table_path)
+    write_cache(table, fingerprint, cache_path)
+    return table
@@ -1,174 +1,223 @@
 from scanner.config import *
 from scanner.scanner import Scanner
-from anytree import Node, RenderTree
-from writer.syntax_error_writer import SyntaxErrorWriter
-from writer.parse_tree_writer import ParseTreeWriter
-from code_generator.code_gen import CodeGenerator
-from writer.code_generator_writer import CodeGeneratorWriter
-import json
+from scanner.tokens import TokenKind, EOF_LEXEME
+from parser.compilation import Compilation
+from parser.parse_table import load_parse_table, ERROR, ACCEPT
+from parser.syntax_tree import SyntaxTree
+from functools import partial
+import sys
 
 
-with open('parser/grammar/table.json', 'r') as f:
-    grammar = json.load(f)
-    f.close()
+parse_table = load_parse_table()
 
 semantic_actions = ["PID", "PNUM", "PTYPE", "FUNC", "VAR_DEC", "ARRAY_DEC", "BREAK_JP", "SAVE", "JPF", "JPF_SAVE", "JP",
                     "WHILE", "LABEL_WHILE", "LABEL_SWITCH", "ASSIGN", "ARRAY_CELL", "RELOP", "ADDOP", "MULTOP"]
 
+# rules whose semantic action takes the lexeme of the lookahead token
+LEXEME_RULES = (68, 69, 70, 71, 81, 83)
+# `param -> type_specifier PID_DEC ID [ ]` declares an array parameter
+ARRAY_PARAM_RULE = 16
 
-class Parser:
+# the terminal of each token kind; keywords and symbols are looked up by lexeme
+KIND_TERMINALS = {kind: parse_table.terminal_index.get(kind.name) for kind in TokenKind}
+KIND_TERMINALS[TokenKind.EOF] = parse_table.terminal_index[EOF_LEXEME]
+KIND_TERMINALS[TokenKind.KEYWORD] = KIND_TERMINALS[TokenKind.SYMBOL] = None
 
-    def __init__(self):
-        self.scanner = Scanner("input.txt")
-        self.terminal = grammar['terminals']
-        self.non_terminal = grammar['non_terminals']
-        self.first = grammar['first']
-        self.follow = grammar['follow']
-        self.grammar = grammar['grammar']
-        self.parse_table = grammar['parse_table']
-        self.stack = ['0']
-        self.gotos = self.goto_states()
-        self.errors = []
-        self.semantic_errors = []
-        self.syntax_error_writer = SyntaxErrorWriter('syntax_errors.txt')
-        self.semantic_error_writer = SyntaxErrorWriter('semantic_errors.txt')
-        self.parse_tree_writer = ParseTreeWriter('parse_tree.txt')
-        self.code_generator_writer = CodeGeneratorWriter('output.txt')
-        self.code_generator = CodeGenerator()
 
-    def get_next_token(self):
-        current_token = self.scanner.get_next_token()
+class Parser:
 
-        while current_token and (current_token[0] == WHITESPACE or current_token[0] == COMMENT):
-            current_token = self.scanner.get_next_token()
+    def __init__(self, input_file="input.txt", build_tree=True, optimization_level=0, output_dir='.', source=None,
+                 compilation=None, tokens=None):
+        """
+        Parses ``input_file``, or ``source`` text when given, into a new
+        ``Compilation`` that holds all the state of the run; or parses
+        ``tokens`` already scanned, an iterator that answers EOF from their
+        end on, going on with ``compilation``.
+        """
+        self.compilation = compilation or Compilation(input_file, source, optimization_level)
+        if tokens is None:
+            self.scanner = Scanner(input_file, symbol_table=self.compilation.symbol_table, text=source)
+            self.token_stream = self.scanner.tokens()
+        else:
+            self.scanner = None
+            self.token_stream = tokens
+        self.parse_table = parse_table
+        self.terminal = parse_table.terminals
+        self.non_terminal = parse_table.non_terminals
+        self.first = parse_table.first
+        self.follow = parse_table.follow
+        self.states = [0]
+        # tree node ids, or without a tree the shifted tokens and reduced non-terminal numbers
+        self.values = []
+        self.tree = self.compilation.tree = SyntaxTree(parse_table.non_terminals) if build_tree else None
+        self.kind_terminals = KIND_TERMINALS
+        self.reduction_count = 0
+        self.errors = self.compilation.syntax_errors
+        # state stacks seen when EOF itself was illegal; meeting one again means recovery is looping
+        self.eof_error_stacks = set()
+        self.semantic_errors = self.compilation.semantic_errors
+        self.output_dir = output_dir
+        self.code_generator = self.compilation.code_generator
+        self.optimization_level = optimization_level
+        self.thunks, self.takes_lexeme = self.bind_semantic_actions()
+
+    def bind_semantic_actions(self):
+        thunks = [None] * len(self.parse_table.rule_lhs)
+        takes_lexeme = [False] * len(self.parse_table.rule_lhs)
+        for rule, function in self.code_generator.function_dict.items():
+            if rule in LEXEME_RULES:
+                takes_lexeme[rule] = True
+                thunks[rule] = function
+            elif rule == ARRAY_PARAM_RULE:
+                thunks[rule] = partial(function, 'array')
+            else:
+                thunks[rule] = function
+        return thunks, takes_lexeme
 
-        return current_token
+    def get_next_token(self):
+        token = next(self.token_stream, None)
+        if token is None:
+            # past the end the scanner keeps answering with EOF
+            self.token_stream = self.scanner.tokens()
+            token = next(self.token_stream)
+        return token
+
+    def terminal_of(self, token) -> int:
+        terminal = self.kind_terminals[token.kind]
+        if terminal is None:
+            terminal = self.parse_table.terminal_index.get(token.lexeme, -1)
+        return terminal
+
+    def compile(self):
+        """
+        Compiles the source in memory and returns the program block, or None
+        when error recovery runs into EOF.
+        """
+        root = self.drive()
+        if root is None:
+            return None
+        return self.compilation.finish(root)
+
+    def parse(self, echo=True):
+        program_block = self.compile()
+        # the program is echoed on stdout as it is written
+        self.compilation.write(self.output_dir, sys.stdout if echo else None)
+        return program_block
+
+    def drive(self):
+        """
+        Runs the LR automaton over the token stream and returns the root of
+        the parse tree, or None when error recovery runs into EOF.
+        """
+        table = self.parse_table
+        actions, gotos = table.actions, table.gotos
+        terminal_count, non_terminal_count = len(table.terminals), len(table.non_terminals)
+        rule_lhs, rule_length = table.rule_lhs, table.rule_length
+        thunks, takes_lexeme = self.thunks, self.takes_lexeme
+        states, values = self.states, self.values
+        semantic_errors = self.semantic_errors
+        tree = self.tree
+        reductions = 0
+        root = None
 
-    def parse(self):
         current_token = self.get_next_token()
+        terminal = self.terminal_of(current_token)
         while True:
-            last_index = self.stack[-1]
-            try:
-                next_move = self.parse_table[last_index][Parser.get_token_value(current_token)].split('_')
-            except Exception:
-                self.errors.append(f"#{current_token[2]} : syntax error , illegal {Parser.get_token_value(current_token)}")
-                current_token = self.get_next_token()
-                while self.stack[-1] not in self.gotos:
-                    self.stack.pop()
-                    removed = self.stack.pop()
-                    if removed.name in self.non_terminal:
-                        self.errors.append(f"syntax error , discarded {removed.name} from stack")
-                    else:
-                        self.errors.append(f"syntax error , discarded ({removed.name[0]}, {removed.name[1]}) from stack")
-                while not self.is_in_follows(self.stack[-1], Parser.get_token_value(current_token)):
-                    if Parser.get_token_value(current_token) == '$':
-                        self.errors.append(f"#{current_token[2]} : syntax error , Unexpected EOF")
-                        self.syntax_error_writer.write(self.errors)
-                        return
-                    self.errors.append(f"#{current_token[2]} : syntax error , discarded {current_token[1]} from input")
-                    current_token = self.get_next_token()
-                next_non_terminal = self.is_in_follows(self.stack[-1], Parser.get_token_value(current_token))
-                next_state = self.parse_table[self.stack[-1]][next_non_terminal].split('_')[1]
-                self.errors.append(f"#{current_token[2]} : syntax error , missing {next_non_terminal}")
-                self.stack.append(Node(next_non_terminal))
-                self.stack.append(next_state)
-
-                continue
-            if next_move[0] == "accept":
-                Node('$', left_rule_node)
-                self.parse_tree_writer.write(Parser.format_tree(left_rule_node))
-                self.syntax_error_writer.write(self.errors)
-                self.code_generator_writer.write(self.code_generator.program_block)
-                print(self.code_generator.program_block)
-                # print("*" * 50)
-                # print(self.code_generator.data_block)
-                # print("*" * 50)
-                # print(''.join(error + "\n" for error in self.semantic_errors))
-                self.semantic_error_writer.write(self.semantic_errors if len(self.semantic_errors) > 0 else ['The input program is semantically correct.'])
-                return
-            elif next_move[0] == 'shift':
-                if current_token:
-                    node = Node((current_token[0], current_token[1]))
-                else:
-                    node = Node(current_token)
-                self.stack.append(node)
-                self.stack.append(next_move[1])
+            action = actions[states[-1] * terminal_count + terminal] if terminal >= 0 else ERROR
+            if action > 0:
+                values.append(current_token if tree is None else tree.add_token(current_token))
+                states.append(action - 1)
                 current_token = self.get_next_token()
-            elif next_move[0] == 'reduce':
-                rule = self.grammar[next_move[1]]
-                function = self.code_generator.function_dict.get(int(next_move[1]))
-                if function:
+                terminal = self.terminal_of(current_token)
+            elif action < ACCEPT:
+                rule = -action - 1
+                thunk = thunks[rule]
+                if thunk is not None:
                     try:
-                        if int(next_move[1]) in [68, 69, 70, 71, 81, 83]:
-                            function(current_token[1])
-                        elif int(next_move[1]) in [16]:
-                            function('array')
+                        if takes_lexeme[rule]:
+                            thunk(current_token.lexeme)
                         else:
-                            function()
+                            thunk()
                     except Exception as exp:
-                        self.semantic_errors.append(f'#{current_token[2]} : Semantic Error! {exp}')
-                left_rule, right_rule = rule[0], rule[2:]
-                left_rule_node = Node(left_rule)
-                if right_rule != ['epsilon']:
-                    start_reduce_index = len(self.stack) - 2 * len(right_rule)
-                    for i in range(2 * len(right_rule)):
-                        item = self.stack.pop(start_reduce_index)
-                        if i % 2 == 0:
-                            item.parent = left_rule_node
+                        semantic_errors.append(f'#{current_token.line} : Semantic Error! {exp}')
+                length = rule_length[rule]
+                if tree is None:
+                    root = rule_lhs[rule]
+                elif length:
+                    root = tree.add_non_terminal(rule_lhs[rule], values[-length:])
                 else:
-                    Node('epsilon', left_rule_node)
-                next_move = self.parse_table[self.stack[-1]][left_rule].split('_')
-                self.stack.append(left_rule_node)
-                if next_move[0] != 'goto':
+                    root = tree.add_non_terminal(rule_lhs[rule], (tree.epsilon,))
+                if length:
+                    del values[-length:]
+                    del states[-length:]
+                next_state = gotos[states[-1] * non_terminal_count + rule_lhs[rule]]
+                if next_state < 0:
                     raise Exception("goto error")
-                self.stack.append(next_move[1])
-
-    def goto_states(self) -> list:
-        result = []
-
-        for state in self.parse_table.keys():
-            row = self.parse_table[state]
-            for word in row.values():
-                if word.startswith('goto'):
-                    result.append(state)
-                    break
-
-        return result
-
-    def get_gotos_alphabetically(self, state: str):
-        result = []
-        state_row = self.parse_table[state]
-        for word in state_row.keys():
-            if state_row[word].startswith('goto'):
-                result.append(word)
-        result.sort()
-        return result
-
-    def is_in_follows(self, state: str, token):
-        gotos = self.get_gotos_alphabetically(state)
-        for goto in gotos:
-            if token in self.follow[goto]:
-                return goto
+                values.append(root)
+                states.append(next_state)
+                reductions += 1
+            elif action == ACCEPT:
+                self.reduction_count += reductions
+                return root
+            else:
+                current_token = self.recover(current_token)
+                if current_token is None:
+                    self.reduction_count += reductions
+                    return None
+                terminal = self.terminal_of(current_token)
+
+    def recover(self, current_token):
+        """Panic-mode recovery; returns the token to resume with, or None at EOF."""
+        table = self.parse_table
+        self.errors.append(f"#{current_token.line} : syntax error , illegal {Parser.get_token_value(current_token)}")
+        if current_token.kind == TokenKind.EOF:
+            stack = tuple(self.states)
+            if stack in self.eof_error_stacks:
+                self.errors.append(f"#{current_token.line} : syntax error , Unexpected EOF")
+                return None
+            self.eof_error_stacks.add(stack)
+        current_token = self.get_next_token()
+        while self.states[-1] not in table.goto_states:
+            self.states.pop()
+            removed = self.stack_symbol(self.values.pop())
+            if removed in table.non_terminal_index:
+                self.errors.append(f"syntax error , discarded {removed} from stack")
+            else:
+                self.errors.append(f"syntax error , discarded ({removed[0]}, {removed[1]}) from stack")
+        resume = table.recovery[self.states[-1]]
+        next_non_terminal = resume.get(Parser.get_token_value(current_token))
+        while next_non_terminal is None:
+            if Parser.get_token_value(current_token) == '$':
+                self.errors.append(f"#{current_token.line} : syntax error , Unexpected EOF")
+                return None
+            self.errors.append(f"#{current_token.line} : syntax error , discarded {current_token.lexeme} from input")
+            current_token = self.get_next_token()
+            next_non_terminal = resume.get(Parser.get_token_value(current_token))
+        next_state = table.goto(self.states[-1], table.non_terminal_index[next_non_terminal])
+        self.errors.append(f"#{current_token.line} : syntax error , missing {next_non_terminal}")
+        missing = table.non_terminal_index[next_non_terminal]
+        self.values.append(missing if self.tree is None else self.tree.add_non_terminal(missing, ()))
+        self.states.append(next_state)
+        return current_token
 
-        return None
+    def stack_symbol(self, value):
+        """The name of a value stack entry: a non-terminal name or a (type, lexeme) tuple."""
+        if self.tree is not None:
+            return self.tree.symbol(value)
+        if type(value) == int:
+            return self.non_terminal[value]
+        return value.kind.name, value.lexeme
 
-    @staticmethod
-    def format_tree(root: Node):
-        result = ''
-        for pre, fill, node in RenderTree(root):
-            result += '%s%s' % (pre, Parser.format_node_name(node)) + '\n'
-        return result
+    def is_in_follows(self, state: int, token):
+        return self.parse_table.recovery[state].get(token)
 
-    @staticmethod
-    def format_node_name(node):
-        if type(node.name) == tuple:
-            return f'({node.name[0]}, {node.name[1]})'
-        return node.name
+    def format_tree(self, root: int):
+        return '\n'.join(self.tree.lines(root))
 
     @staticmethod
     def get_token_value(token):
-        if token[0] == EOF:
-            return '$'
-        if token[0] == KEYWORD or token[0] == SYMBOL:
-            return token[1]
-        return token[0]
+        if token.kind == TokenKind.EOF:
+            return EOF_LEXEME
+        if token.kind == TokenKind.KEYWORD or token.kind == TokenKind.SYMBOL:
+            return token.lexeme
+        return token.kind.name
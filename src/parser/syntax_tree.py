@@ -0,0 +1,93 @@
+from array import array
+
+NON_TERMINAL = 0
+TOKEN = 1
+EPSILON = 2
+END = 3
+
+VERTICAL = '│   '
+EMPTY = '    '
+BRANCH = '├── '
+LAST_BRANCH = '└── '
+
+
+class SyntaxTree:
+    """
+    Concrete syntax tree kept in parallel arrays. Node ``i`` has kind
+    ``kinds[i]`` and value ``values[i]``, which is a non-terminal number for
+    NON_TERMINAL nodes and an index into ``tokens`` for TOKEN nodes. Its
+    children are ``children[child_start[i]:child_start[i] + child_count[i]]``.
+    """
+
+    def __init__(self, non_terminals: list):
+        self.non_terminals = non_terminals
+        self.kinds = array('b')
+        self.values = array('i')
+        self.child_start = array('i')
+        self.child_count = array('i')
+        self.children = array('i')
+        self.tokens = []
+        # every epsilon production shares the same leaf
+        self.epsilon = self.add_node(EPSILON, 0)
+
+    def add_node(self, kind: int, value: int) -> int:
+        self.kinds.append(kind)
+        self.values.append(value)
+        self.child_start.append(len(self.children))
+        self.child_count.append(0)
+        return len(self.kinds) - 1
+
+    def add_token(self, token) -> int:
+        self.tokens.append(token)
+        return self.add_node(TOKEN, len(self.tokens) - 1)
+
+    def add_non_terminal(self, non_terminal: int, children) -> int:
+        node = self.add_node(NON_TERMINAL, non_terminal)
+        self.children.extend(children)
+        self.child_count[node] = len(children)
+        return node
+
+    def add_end(self, root: int):
+        """Appends the ``$`` leaf to ``root``, whose children must be the last ones added."""
+        if self.child_start[root] + self.child_count[root] != len(self.children):
+            raise ValueError('the end marker can only follow the last reduced node')
+        self.children.append(self.add_node(END, 0))
+        self.child_count[root] += 1
+
+    def symbol(self, node: int):
+        """The symbol of a node: a non-terminal name, a (type, lexeme) tuple, `epsilon` or `$`."""
+        kind = self.kinds[node]
+        if kind == NON_TERMINAL:
+            return self.non_terminals[self.values[node]]
+        if kind == TOKEN:
+            token = self.tokens[self.values[node]]
+            return token.kind.name, token.lexeme
+        return 'epsilon' if kind == EPSILON else '$'
+
+    def name(self, node: int) -> str:
+        symbol = self.symbol(node)
+        if type(symbol) == tuple:
+            return f'({symbol[0]}, {symbol[1]})'
+        return symbol
+
+    def lines(self, root: int):
+        """Yields the rendered lines of the tree under ``root`` depth first, without recursion."""
+        children, child_start, child_count = self.children, self.child_start, self.child_count
+        stack = [(root, '', None)]
+        while stack:
+            node, indent, is_last = stack.pop()
+            if is_last is None:
+                yield self.name(node)
+                child_indent = ''
+            elif is_last:
+                yield indent + LAST_BRANCH + self.name(node)
+                child_indent = indent + EMPTY
+            else:
+                yield indent + BRANCH + self.name(node)
+                child_indent = indent + VERTICAL
+            start, count = child_start[node], child_count[node]
+            if count:
+                last = start + count - 1
+                stack.append((children[last], child_indent, True))
+                for i in range(last - 1, start - 1, -1):
+                    stack.append((children[i], child_indent, False))
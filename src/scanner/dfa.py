@@ -1,41 +1,47 @@
+import re
+import threading
+from functools import partial
+
 from scanner.config import *
-from scanner.state import State, states
+from scanner.state import State
 
 
 class DFA:
     def __init__(self):
-        state_0 = State(ID=0, is_final_state=False, is_star_state=False, state_type=START)
-        eof_state = State(ID=-5, is_final_state=False, is_star_state=False, state_type=EOF)
-        invalid_input_error_state = State(-1, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Invalid input")
-        unmatched_comment_error_state = State(-2, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Unmatched comment")
-        unclosed_comment_error_state = State(-3, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Unclosed comment")
-        invalid_number_error_state = State(-4, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Invalid number")
+        self.states = {}
+        state = partial(State, graph=self.states)
+        state_0 = state(ID=0, is_final_state=False, is_star_state=False, state_type=START)
+        eof_state = state(ID=-5, is_final_state=False, is_star_state=False, state_type=EOF)
+        invalid_input_error_state = state(-1, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Invalid input")
+        unmatched_comment_error_state = state(-2, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Unmatched comment")
+        unclosed_comment_error_state = state(-3, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Unclosed comment")
+        invalid_number_error_state = state(-4, is_final_state=False, is_star_state=False, state_type=ERROR, error_message="Invalid number")
 
         # Number states
-        state_1 = State(1, is_final_state=False, is_star_state=False, state_type=NUMBER)
-        state_2 = State(2, is_final_state=True, is_star_state=True, state_type=NUMBER)
+        state_1 = state(1, is_final_state=False, is_star_state=False, state_type=NUMBER)
+        state_2 = state(2, is_final_state=True, is_star_state=True, state_type=NUMBER)
 
         # ID states
-        state_3 = State(3, is_final_state=False, is_star_state=False, state_type=ID)
-        state_4 = State(4, is_final_state=True, is_star_state=True, state_type=ID)
+        state_3 = state(3, is_final_state=False, is_star_state=False, state_type=ID)
+        state_4 = state(4, is_final_state=True, is_star_state=True, state_type=ID)
 
         # Symbol states
-        state_5 = State(5, is_final_state=True, is_star_state=False, state_type=SYMBOL)
-        state_6 = State(6, is_final_state=False, is_star_state=False, state_type=SYMBOL)
-        state_7 = State(7, is_final_state=True, is_star_state=False, state_type=SYMBOL)
-        state_8 = State(8, is_final_state=False, is_star_state=False, state_type=SYMBOL)
-        state_9 = State(9, is_final_state=True, is_star_state=True, state_type=SYMBOL)
-        state_16 = State(16, is_final_state=False, is_star_state=False, state_type=SYMBOL)
+        state_5 = state(5, is_final_state=True, is_star_state=False, state_type=SYMBOL)
+        state_6 = state(6, is_final_state=False, is_star_state=False, state_type=SYMBOL)
+        state_7 = state(7, is_final_state=True, is_star_state=False, state_type=SYMBOL)
+        state_8 = state(8, is_final_state=False, is_star_state=False, state_type=SYMBOL)
+        state_9 = state(9, is_final_state=True, is_star_state=True, state_type=SYMBOL)
+        state_16 = state(16, is_final_state=False, is_star_state=False, state_type=SYMBOL)
 
         # Comment states
-        state_10 = State(10, is_final_state=False, is_star_state=False, state_type=COMMENT)
-        state_11 = State(11, is_final_state=False, is_star_state=False, state_type=COMMENT)
-        state_12 = State(12, is_final_state=True, is_star_state=False, state_type=COMMENT)
-        state_13 = State(13, is_final_state=False, is_star_state=False, state_type=COMMENT)
-        state_14 = State(14, is_final_state=True, is_star_state=False, state_type=COMMENT)
+        state_10 = state(10, is_final_state=False, is_star_state=False, state_type=COMMENT)
+        state_11 = state(11, is_final_state=False, is_star_state=False, state_type=COMMENT)
+        state_12 = state(12, is_final_state=True, is_star_state=False, state_type=COMMENT)
+        state_13 = state(13, is_final_state=False, is_star_state=False, state_type=COMMENT)
+        state_14 = state(14, is_final_state=True, is_star_state=False, state_type=COMMENT)
 
         # Whitespace state
-        state_15 = State(15, is_final_state=True, is_star_state=False, state_type=WHITESPACE)
+        state_15 = state(15, is_final_state=True, is_star_state=False, state_type=WHITESPACE)
 
         # Start -> Start (by empty String)
         state_0.add_transition(state_0, [""])
@@ -77,17 +83,111 @@ class DFA:
         state_13.add_transition(state_14, new_line)
         state_10.add_transition(unclosed_comment_error_state, [''])
 
-        DFA.set_invalid_input_state_transition(invalid_input_error_state, [state_13, state_10])
-        DFA.add_eof_transition(eof_state, [state_10])
+        DFA.set_invalid_input_state_transition(self.states, invalid_input_error_state, [state_13, state_10])
+        DFA.add_eof_transition(self.states, eof_state, [state_10])
 
     @staticmethod
-    def set_invalid_input_state_transition(error_state, exceptions):
-        for state in states.values():
+    def set_invalid_input_state_transition(graph, error_state, exceptions):
+        for state in graph.values():
             if not state.is_final_state and state not in exceptions:
                 state.add_transition(error_state, invalid_chars)
 
     @staticmethod
-    def add_eof_transition(eof_state, exceptions):
-        for state in states.values():
+    def add_eof_transition(graph, eof_state, exceptions):
+        for state in graph.values():
             if state not in exceptions:
                 state.add_transition(eof_state, [''])
+
+
+class CompiledDFA:
+    """
+    Flat integer form of the ``State`` graph built by ``DFA``.
+
+    Characters are folded into classes that share the same column of
+    destinations, and every state owns one row of ``transitions`` indexed by
+    class. States are plain integers; non-negative ids keep the numbers used
+    in ``DFA`` and the negative ones (errors and EOF) are appended after them.
+    A missing transition goes back to ``START_STATE``, as ``Scanner.next_state``
+    does on the object graph.
+    """
+
+    START_STATE = 0
+
+    def __init__(self, graph: dict):
+        ids = sorted(i for i in graph if i >= 0) + sorted((i for i in graph if i < 0), reverse=True)
+        self.state_ids = ids
+        index = {state_id: i for i, state_id in enumerate(ids)}
+        self.state_index = index
+        ordered = [graph[state_id] for state_id in ids]
+
+        self.is_final = [state.is_final_state for state in ordered]
+        self.is_star = [state.is_star_state for state in ordered]
+        self.is_error = [state.type == ERROR for state in ordered]
+        self.types = [state.type for state in ordered]
+        self.error_messages = [state.error_message for state in ordered]
+
+        # characters with identical columns share a class; anything outside
+        # the 256 characters of the graph is scanned as an invalid character
+        columns = {}
+        self.char_class = {}
+        for character in [chr(i) for i in range(256)] + ['']:
+            column = tuple(index[state.transitions[character].id] if character in state.transitions
+                           else self.START_STATE for state in ordered)
+            self.char_class[character] = columns.setdefault(column, len(columns))
+        self.invalid_class = self.char_class[invalid_chars[0]]
+        self.class_count = len(columns)
+
+        self.transitions = [0] * (len(ordered) * self.class_count)
+        for column, char_class in columns.items():
+            for state, destination in enumerate(column):
+                self.transitions[state * self.class_count + char_class] = destination
+
+        # a state that loops on a set of characters can consume the whole run
+        # of them at once; the run stops exactly where the table walk would
+        # leave the state, so the result of the walk does not change
+        self.runs = [self.compile_run(state) for state in range(len(ordered))]
+        self.whitespace_run = re.compile(self.character_set(whitespace) + '+')
+        self.byte_runs = [re.compile(run.pattern.encode('latin-1')) if run else None for run in self.runs]
+        self.byte_whitespace_run = re.compile(self.whitespace_run.pattern.encode('latin-1'))
+        self.eof_state = self.types.index(EOF)
+
+        # a binary reader yields bytes as integers, which share the class of
+        # the Latin-1 character with the same code
+        for i in range(256):
+            self.char_class[i] = self.char_class[chr(i)]
+
+    def compile_run(self, state: int):
+        if state == self.START_STATE or self.is_error[state] or self.is_final[state]:
+            return None
+        row = self.transitions[state * self.class_count:(state + 1) * self.class_count]
+        looping = [chr(i) for i in range(256) if row[self.char_class[chr(i)]] == state]
+        if not looping:
+            return None
+        if row[self.invalid_class] == state:
+            others = [chr(i) for i in range(256) if chr(i) not in looping]
+            return re.compile(self.character_set(others, negate=True) + '+')
+        return re.compile(self.character_set(looping) + '+')
+
+    @staticmethod
+    def character_set(characters: list, negate=False) -> str:
+        return '[' + ('^' if negate else '') + ''.join(re.escape(character) for character in characters) + ']'
+
+    def get_class(self, character: str) -> int:
+        return self.char_class.get(character, self.invalid_class)
+
+    def next_state(self, state: int, character: str) -> int:
+        return self.transitions[state * self.class_count + self.char_class.get(character, self.invalid_class)]
+
+
+# built once per process and only read afterwards, so every scanner in every thread shares it
+compiled_dfa = None
+compiled_dfa_lock = threading.Lock()
+
+
+def get_compiled_dfa() -> CompiledDFA:
+    global compiled_dfa
+    if compiled_dfa is None:
+        with compiled_dfa_lock:
+            if compiled_dfa is None:
+                compiled_dfa = CompiledDFA(DFA().states)
+    return compiled_dfa
@@ -1,36 +1,96 @@
+import mmap
+import os
+import re
+from bisect import bisect_right
+
+
 class Reader:
+    """
+    Holds the whole input in one buffer and resolves positions to lines
+    through the offsets at which lines start.
+
+    In binary mode the file is memory-mapped and ``buffer`` is a memoryview
+    over the map, indexed by byte; lexemes are decoded as Latin-1 and line
+    endings are left untranslated. A source given as ``text`` is read from
+    memory instead of a file.
+    """
 
-    def __init__(self, filename):
+    def __init__(self, filename=None, binary=False, text=None):
         self.filename = filename
+        self.binary = binary
+        self.text = text
         self.file = None
+        self.map = None
+        self.buffer = ''
         self.open_file()
-        self.current_line = ""
-        self.current_line_number = 0
-        self.index = 0
-        self.read_line()
+        self.position = 0
+        self.eof_reached = False
+        self.line_starts = self.index_lines()
+        # the line found by the last lookup, as [start, end) offsets
+        self.line = 1
+        self.line_start = 0
+        self.line_end = self.line_starts[1] if len(self.line_starts) > 1 else len(self.buffer)
+        ends_with_new_line = len(self.buffer) > 0 and self.buffer[-1] in ('\n', 10)
+        self.eof_line_number = len(self.line_starts) + (0 if ends_with_new_line or not self.buffer else 1)
 
     def open_file(self):
-        self.file = open(self.filename, 'r')
+        if self.text is not None:
+            self.buffer = memoryview(self.text.encode('latin-1')) if self.binary else self.text
+        elif self.binary:
+            self.file = open(self.filename, 'rb')
+            if os.fstat(self.file.fileno()).st_size > 0:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.buffer = memoryview(self.map)
+            else:
+                self.buffer = memoryview(b'')
+        else:
+            self.file = open(self.filename, 'r')
+            self.buffer = self.file.read()
+            self.file.close()
 
-    def read_line(self):
-        self.current_line = self.file.readline()
-        self.current_line_number += 1
-        self.index = 0
+    def index_lines(self):
+        new_line = re.compile(b'\n' if self.binary else '\n')
+        return [0] + [match.end() for match in new_line.finditer(self.buffer)]
 
     def read_char(self):
-        if self.current_line == '':
-            self.file.close()
+        if self.position >= len(self.buffer):
+            self.eof_reached = True
             return ''
-        elif self.index >= len(self.current_line):
-            self.read_line()
-            return self.read_char()
-        else:
-            result = self.current_line[self.index]
-            self.index += 1
-            return result
+        result = self.buffer[self.position]
+        self.position += 1
+        return chr(result) if self.binary else result
+
+    def lexeme(self, start, end):
+        if self.binary:
+            return self.buffer[start:end].tobytes().decode('latin-1')
+        return self.buffer[start:end]
+
+    def line_number(self, position):
+        if self.line_start <= position < self.line_end:
+            return self.line
+        if position >= len(self.buffer):
+            return self.eof_line_number
+        self.line = bisect_right(self.line_starts, position)
+        self.line_start = self.line_starts[self.line - 1]
+        self.line_end = self.line_starts[self.line] if self.line < len(self.line_starts) else len(self.buffer)
+        return self.line
+
+    def new_line_count(self, start, end):
+        return bisect_right(self.line_starts, end) - bisect_right(self.line_starts, start)
+
+    @property
+    def current_line_number(self):
+        if self.eof_reached:
+            return self.eof_line_number
+        return self.line_number(max(self.position - 1, 0))
 
     def get_current_line_number(self):
         return self.current_line_number
 
     def close_file(self):
-        self.file.close()
+        if self.map is not None:
+            self.buffer.release()
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
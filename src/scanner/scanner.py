@@ -1,59 +1,121 @@
 from scanner.reader import Reader
-from scanner.state import states
-from scanner.state import State
-from scanner.symbol_table import symbol_table
+from scanner.dfa import get_compiled_dfa
+from scanner.symbol_table import SymbolTable
+from scanner.tokens import Token, TokenKind, EOF_LEXEME
 from scanner.config import *
 
 
 class Scanner:
 
-    def __init__(self, input_file):
-        self.reader = Reader(input_file)
-        self.start_state = states[0]
-        self.current_char = ''
+    def __init__(self, input_file=None, binary=False, symbol_table=None, text=None):
+        self.reader = Reader(input_file, binary, text)
+        self.symbol_table = SymbolTable() if symbol_table is None else symbol_table
+        self.dfa = get_compiled_dfa()
+        self.start_state = self.dfa.START_STATE
         self.lexical_errors = {}
+        runs = self.dfa.byte_runs if binary else self.dfa.runs
+        self.whitespace_run = self.dfa.byte_whitespace_run if binary else self.dfa.whitespace_run
+        self.tables = (self.dfa.transitions, self.dfa.class_count, self.dfa.char_class, self.dfa.invalid_class,
+                       self.dfa.is_final, self.dfa.is_star, self.dfa.is_error, self.dfa.eof_state, runs)
+        self.kinds = [TokenKind.__members__.get(state_type) for state_type in self.dfa.types]
+        self.text = None if binary else self.reader.buffer
+        self.stream = None
+        self.stream_trivia = False
 
-    def get_next_token(self):
-        current_state = self.start_state
-        token_name = ""
+    def tokens(self, trivia=False):
+        """
+        Yields ``Token`` records from the current position up to and including
+        the EOF token. Whitespace and comments are skipped unless ``trivia``.
+        """
+        (transitions, class_count, char_class, invalid_class, is_final, is_star, is_error, eof_state,
+         runs) = self.tables
+        kinds, reader = self.kinds, self.reader
+        symbol_table = self.symbol_table
+        add_lexeme, symbol_lexemes, keyword_count = symbol_table.add_lexeme, symbol_table.lexemes, symbol_table.keyword_count
+        buffer, text = reader.buffer, self.text
+        length = len(buffer)
+        whitespace_run = None if trivia else self.whitespace_run
+        start_state = self.start_state
+        position = reader.position
 
         while True:
-            if current_state.id == 0 or (not current_state.is_star_state and not current_state.is_final_state):
-                self.current_char = self.reader.read_char()
-                current_state = self.next_state(current_state)
-                if current_state.type == ERROR:
-                    error = (token_name + self.current_char, current_state.error_message)
-                    error_line = self.find_start_line(self.reader.current_line_number, error[0])
-                    if error_line not in self.lexical_errors:
-                        self.lexical_errors[error_line] = [error]
-                    else:
-                        self.lexical_errors[error_line].append(error)
-                    token_name = ""
+            current_state = start_state
+            token_start = position
+            while True:
+                run = runs[current_state] or (current_state == start_state and whitespace_run)
+                if run:
+                    match = run.match(buffer, position)
+                    if match is not None:
+                        position = match.end()
+                        if run is whitespace_run:
+                            token_start = position
+                if position < length:
+                    current_char = buffer[position]
+                    position += 1
+                else:
+                    current_char = ''
+                    reader.eof_reached = True
+                current_state = transitions[current_state * class_count + char_class.get(current_char, invalid_class)]
+                if is_error[current_state]:
+                    self.add_lexical_error(token_start, position, current_char == '', current_state)
+                    token_start = position
                     continue
-                if not self.current_char:
-                    return EOF, '$', self.reader.current_line_number
-                if current_state == self.start_state:
-                    self.reader.index -= 1
-                    token_name = ""
+                if current_state == eof_state:
+                    reader.position = position
+                    yield Token(TokenKind.EOF, EOF_LEXEME, reader.eof_line_number, position, position)
+                    return
+                if current_state == start_state:
+                    position -= 1
+                    token_start = position
                     continue
-                if current_state.is_star_state:
-                    self.reader.index -= 1
-                    if current_state.type == ID:
-                        symbol_table.add_lexeme(token_name)
-                    if token_name in keywords:
-                        return KEYWORD, token_name, self.reader.current_line_number
-                    return current_state.type, token_name, self.reader.current_line_number
-                elif current_state.is_final_state:
-                    token_name += self.current_char
-                    return current_state.type, token_name, self.reader.current_line_number
-                token_name += self.current_char
-
-    def next_state(self, current_state: State) -> State:
-        next_state = current_state.get_dest_state_by_character(self.current_char)
-        if next_state:
-            return next_state
-        return self.start_state
+                if is_star[current_state]:
+                    position -= 1
+                    line_position = position
+                    break
+                if is_final[current_state]:
+                    if not trivia and (kinds[current_state] == TokenKind.COMMENT or
+                                       kinds[current_state] == TokenKind.WHITESPACE):
+                        current_state = start_state
+                        token_start = position
+                        continue
+                    line_position = position - 1
+                    break
+
+            kind = kinds[current_state]
+            token_name = text[token_start:position] if text is not None else reader.lexeme(token_start, position)
+            if reader.line_start <= line_position < reader.line_end:
+                line = reader.line
+            else:
+                line = reader.line_number(line_position)
+            reader.position = position
+            if kind == TokenKind.ID:
+                symbol = add_lexeme(token_name)
+                if symbol < keyword_count:
+                    kind = TokenKind.KEYWORD
+                yield Token(kind, symbol_lexemes[symbol], line, token_start, position, symbol)
+            else:
+                yield Token(kind, token_name, line, token_start, position)
+
+    def get_next_token(self, skip_trivia=False):
+        """Returns the next token as a ``(type, lexeme, line)`` tuple."""
+        if self.stream is None or self.stream_trivia == skip_trivia:
+            self.stream = self.tokens(trivia=not skip_trivia)
+            self.stream_trivia = not skip_trivia
+        token = next(self.stream, None)
+        if token is None:
+            self.stream = None
+            return self.get_next_token(skip_trivia)
+        return token.kind.name, token.lexeme, token.line
+
+    def add_lexical_error(self, start, end, at_eof, state):
+        error = (self.reader.lexeme(start, end), self.dfa.error_messages[state])
+        current_line = self.reader.eof_line_number if at_eof else self.reader.line_number(end - 1)
+        error_line = self.find_start_line(current_line, self.reader.new_line_count(start, end))
+        if error_line not in self.lexical_errors:
+            self.lexical_errors[error_line] = [error]
+        else:
+            self.lexical_errors[error_line].append(error)
 
     @staticmethod
-    def find_start_line(current_line, message):
-        return current_line - message.count('\n')
+    def find_start_line(current_line, new_line_count):
+        return current_line - new_line_count
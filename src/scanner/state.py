@@ -1,20 +1,15 @@
-states = {}
-
-
 class State:
-    def __init__(self, ID, is_final_state, is_star_state, state_type, error_message=""):
+    def __init__(self, ID, is_final_state, is_star_state, state_type, error_message="", graph=None):
         self.id = ID
         self.is_final_state = is_final_state
         self.is_star_state = is_star_state
         self.type = state_type
         self.transitions = {}
-        states[ID] = self
+        # the states of one DFA are kept in its graph, by id
+        if graph is not None:
+            graph[ID] = self
         self.error_message = error_message
 
-    @staticmethod
-    def get_state_by_id(ID):
-        return states[ID]
-
     def add_transition(self, dest_state, characters):
         for character in characters:
             self.transitions[character] = dest_state
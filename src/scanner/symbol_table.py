@@ -1,15 +1,41 @@
+import sys
+
 from scanner.config import *
 
 
 class SymbolTable:
+    """
+    Interns lexemes in insertion order and gives each one a stable integer id.
+    Keywords are added first, so an id below ``keyword_count`` is a keyword.
+    """
 
     def __init__(self):
-        self.lexemes = keywords.copy()
+        self.ids = {}
+        self.lexemes = []
+        for keyword in keywords:
+            self.add_lexeme(keyword)
+        self.keyword_count = len(self.lexemes)
 
-    def add_lexeme(self, lexeme):
-        if lexeme not in self.lexemes:
+    def add_lexeme(self, lexeme) -> int:
+        symbol_id = self.ids.get(lexeme)
+        if symbol_id is None:
+            lexeme = sys.intern(lexeme)
+            symbol_id = self.ids[lexeme] = len(self.lexemes)
             self.lexemes.append(lexeme)
+        return symbol_id
+
+    def get_id(self, lexeme):
+        return self.ids.get(lexeme)
+
+    def get_lexeme(self, symbol_id: int) -> str:
+        return self.lexemes[symbol_id]
 
+    def is_keyword(self, lexeme) -> bool:
+        symbol_id = self.ids.get(lexeme)
+        return symbol_id is not None and symbol_id < self.keyword_count
 
-symbol_table = SymbolTable()
+    def __iter__(self):
+        return iter(self.lexemes)
 
+    def __len__(self):
+        return len(self.lexemes)
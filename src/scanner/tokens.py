@@ -0,0 +1,18 @@
+from collections import namedtuple
+from enum import IntEnum
+
+
+class TokenKind(IntEnum):
+    NUM = 1
+    ID = 2
+    KEYWORD = 3
+    SYMBOL = 4
+    COMMENT = 5
+    WHITESPACE = 6
+    EOF = 7
+
+
+# `start` and `end` are offsets of the lexeme in the reader's buffer, and
+# `symbol` is the symbol table id of an ID or KEYWORD lexeme
+Token = namedtuple('Token', ['kind', 'lexeme', 'line', 'start', 'end', 'symbol'], defaults=[None])
+EOF_LEXEME = '$'
@@ -1,4 +1,4 @@
-from writer.writer import Writer
+from writer.writer import Writer, stream_lines
 
 
 class CodeGeneratorWriter(Writer):
@@ -6,11 +6,6 @@ class CodeGeneratorWriter(Writer):
     def __init__(self, file_name):
         super(CodeGeneratorWriter, self).__init__(file_name)
 
-    def write(self, program_block):
-        result = str(program_block)
-        self.file.write(result)
+    def write(self, program_block, chunk_size=1024, echo=None):
+        stream_lines(self.file, program_block.lines(), chunk_size, echo)
         self.close_file()
-
-
-
-
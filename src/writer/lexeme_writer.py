@@ -7,8 +7,6 @@ class LexemeWriter(Writer):
         super(LexemeWriter, self).__init__(file_name)
 
     def write(self, symbols):
-        result = ''
-        for s in symbols:
-            result += f'{symbols.index(s) + 1}.\t{s}\n'
-        self.file.write(result)
+        for index, symbol in enumerate(symbols, 1):
+            self.file.write(f'{index}.\t{symbol}\n')
         self.close_file()
@@ -1,4 +1,4 @@
-from writer.writer import Writer
+from writer.writer import Writer, stream_lines
 
 
 class ParseTreeWriter(Writer):
@@ -6,10 +6,7 @@ class ParseTreeWriter(Writer):
     def __init__(self, file_name):
         super(ParseTreeWriter, self).__init__(file_name)
 
-    def write(self, parse_tree):
-        self.file.write(parse_tree[:-1])
+    def write(self, lines, chunk_size=1024):
+        """Streams rendered tree lines to the file in chunks; no newline follows the last line."""
+        stream_lines(self.file, lines, chunk_size)
         self.close_file()
-
-
-
-
@@ -1,4 +1,5 @@
 from writer.writer import Writer
+from scanner.tokens import TokenKind
 
 
 class TokenWriter(Writer):
@@ -7,14 +8,16 @@ class TokenWriter(Writer):
         super(TokenWriter, self).__init__(file_name)
 
     def write(self, tokens):
-        result = ''
-        for i in tokens.keys():
-            result += f'{i}.\t'
-            for token in tokens[i]:
-                result += f'({token[0]}, {token[1]}) '
-            result += '\n'
-        self.file.write(result)
+        """Writes a stream of ``Token`` records line by line as they arrive."""
+        line, result = None, ''
+        for token in tokens:
+            if token.kind == TokenKind.EOF:
+                break
+            if token.line != line:
+                if result:
+                    self.file.write(f'{line}.\t{result}\n')
+                line, result = token.line, ''
+            result += f'({token.kind.name}, {token.lexeme}) '
+        if result:
+            self.file.write(f'{line}.\t{result}\n')
         self.close_file()
-
-
-
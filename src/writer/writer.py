@@ -1,3 +1,24 @@
+from itertools import islice
+
+
+def stream_lines(file, lines, chunk_size=1024, echo=None):
+    """
+    Writes lines in chunks of ``chunk_size``, with no newline after the last
+    one, and the same text to ``echo`` if given.
+    """
+    lines = iter(lines)
+    separator = ''
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            break
+        text = separator + '\n'.join(chunk)
+        file.write(text)
+        if echo is not None:
+            echo.write(text)
+        separator = '\n'
+
+
 class Writer:
 
     def __init__(self, file_name):
@@ -13,4 +34,3 @@ class Writer:
 
     def write(self, data):
         raise NotImplementedError()
-
@@ -0,0 +1,24 @@
+import unittest
+from code_generator.arithmetic import fold
+from code_generator.operand import direct, immediate
+
+
+class ArithmeticTest(unittest.TestCase):
+
+    def test_folds_like_the_tester(self):
+        self.assertEqual(immediate(-3), fold('DIV', immediate(-7), immediate(2)))
+        self.assertEqual(immediate(-3), fold('DIV', immediate(7), immediate(-2)))
+        self.assertEqual(immediate(1410065408), fold('MULT', immediate(100000), immediate(100000)))
+        self.assertEqual(immediate(-2147483648), fold('ADD', immediate(2147483647), immediate(1)))
+        self.assertEqual(immediate(1), fold('LT', immediate(-1), immediate(0)))
+        self.assertEqual(immediate(0), fold('EQ', immediate(3), immediate(4)))
+
+    def test_leaves_what_has_to_run(self):
+        self.assertIsNone(fold('ADD', direct(2000), immediate(1)))
+        self.assertIsNone(fold('DIV', immediate(1), immediate(0)))
+        self.assertIsNone(fold('ADD', immediate(99999999999), immediate(1)))
+        self.assertIsNone(fold(None, immediate(1), immediate(1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
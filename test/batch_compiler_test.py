@@ -0,0 +1,57 @@
+import io
+import os
+import tempfile
+import unittest
+from batch_compiler import OK, SEMANTIC_ERRORS, SYNTAX_ERRORS, collect_inputs, compile_all, report
+
+PROGRAMS = {
+    'ok': 'void main(void) { int a; a = 2; output(a * 3); }',
+    'semantic': 'void main(void) { b = 1; }',
+    'syntax': 'void main(void) { int a; a = ; }',
+}
+
+
+class BatchCompilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.sources = os.path.join(self.root, 'sources')
+        for name, text in PROGRAMS.items():
+            os.makedirs(os.path.join(self.sources, name))
+            with open(os.path.join(self.sources, name, 'input.txt'), 'w') as file:
+                file.write(text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self, *path):
+        with open(os.path.join(*path)) as file:
+            return file.read()
+
+    def test_every_input_gets_its_own_output_directory(self):
+        build = os.path.join(self.root, 'build')
+        extra = os.path.join(self.root, 'extra.c')
+        with open(extra, 'w') as file:
+            file.write(PROGRAMS['ok'])
+        inputs = collect_inputs([self.sources, extra, os.path.join(self.sources, 'ok', 'input.txt')], build)
+        self.assertEqual([os.path.relpath(output_dir, build) for _, output_dir in inputs],
+                         [os.path.join('sources', name) for name in sorted(PROGRAMS)] + ['extra'])
+
+    def test_reports_the_status_of_each_input_in_order(self):
+        build = os.path.join(self.root, 'build')
+        out = io.StringIO()
+        results = report(compile_all(collect_inputs([self.sources], build), jobs=2), out)
+        self.assertEqual([result.status for result in results], [OK, SEMANTIC_ERRORS, SYNTAX_ERRORS])
+        self.assertGreater(results[0].instructions, 0)
+        self.assertIn('3 inputs', out.getvalue())
+        self.assertEqual(self.read(build, 'ok', 'semantic_errors.txt'), 'The input program is semantically correct.')
+        self.assertIn("'b' is not defined", self.read(build, 'semantic', 'semantic_errors.txt'))
+
+    def test_workers_write_what_a_single_process_writes(self):
+        single, pooled = os.path.join(self.root, 'single'), os.path.join(self.root, 'pooled')
+        list(compile_all(collect_inputs([self.sources], single), jobs=1))
+        list(compile_all(collect_inputs([self.sources], pooled), jobs=2))
+        for name in PROGRAMS:
+            for output in ('output.txt', 'syntax_errors.txt', 'semantic_errors.txt', 'parse_tree.txt'):
+                self.assertEqual(self.read(single, name, output), self.read(pooled, name, output))
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from parser.parser import Parser
+
+PROGRAMS = [
+    'void main(void) { int a; a = 2; output(a * 3); }',
+    'int f(int x) { return x + 1; }\nvoid main(void) { int b; b = f(4); output(b); }',
+    'void main(void) { int i; i = 0; while (i < 3) { output(i); i = i + 1; } }',
+    'void main(void) { c = 1; }',
+    'void main(void) { int a; a = ; }',
+]
+
+
+def compile_source(source):
+    parser = Parser(source=source, build_tree=False)
+    program_block = parser.compile()
+    compilation = parser.compilation
+    return (None if program_block is None else str(program_block), compilation.syntax_errors,
+            compilation.semantic_errors, len(compilation.symbol_table))
+
+
+class CompilationTest(unittest.TestCase):
+
+    def test_compiles_source_text_without_writing_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                code, syntax_errors, semantic_errors, _ = compile_source(PROGRAMS[0])
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(os.listdir(directory), [])
+        self.assertIn('PRINT', code)
+        self.assertEqual((syntax_errors, semantic_errors), ([], []))
+
+    def test_compilations_do_not_share_state(self):
+        first = compile_source(PROGRAMS[1])
+        for source in PROGRAMS:
+            compile_source(source)
+        self.assertEqual(compile_source(PROGRAMS[1]), first)
+
+    def test_threads_compile_what_one_thread_compiles(self):
+        expected = [compile_source(source) for source in PROGRAMS]
+        with ThreadPoolExecutor(4) as pool:
+            for _ in range(5):
+                self.assertEqual(list(pool.map(compile_source, PROGRAMS * 4)), expected * 4)
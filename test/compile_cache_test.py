@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from compile_cache import OUTPUT_FILES, CompileCache
+
+SOURCE = 'void main(void) { int a; a = 2; output(a * 3); }'
+
+
+class CompileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.cache = CompileCache(os.path.join(self.root, 'cache'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def source(self, name, text=SOURCE):
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def outputs(self, output_dir):
+        files = {}
+        for name in OUTPUT_FILES:
+            with open(os.path.join(output_dir, name)) as file:
+                files[name] = file.read()
+        return files
+
+    def compile(self, input_file, name, cache=None, **options):
+        output_dir = os.path.join(self.root, name)
+        os.makedirs(output_dir, exist_ok=True)
+        entry, cached = (cache or self.cache).compile(input_file, output_dir, **options)
+        return self.outputs(output_dir), cached
+
+    def test_a_hit_writes_what_the_compile_wrote(self):
+        input_file = self.source('input.txt')
+        compiled, cached = self.compile(input_file, 'first')
+        self.assertFalse(cached)
+        served, cached = self.compile(input_file, 'second')
+        self.assertTrue(cached)
+        self.assertEqual(served, compiled)
+        self.assertEqual(self.cache.statistics(), {'hits': 1, 'misses': 1, 'stores': 1, 'evictions': 0})
+
+    def test_the_source_and_the_options_are_part_of_the_key(self):
+        input_file = self.source('input.txt')
+        self.compile(input_file, 'plain')
+        self.assertFalse(self.compile(input_file, 'optimized', optimization_level=2)[1])
+        self.assertFalse(self.compile(self.source('edited.txt', SOURCE + ' '), 'edited')[1])
+        self.assertTrue(self.compile(input_file, 'again', optimization_level=2)[1])
+
+    def test_evicts_the_least_recently_used_entries(self):
+        inputs = [self.source(f'{number}.txt', SOURCE.replace('2', str(number))) for number in range(3)]
+        for number, input_file in enumerate(inputs):
+            self.compile(input_file, str(number))
+        entry_size = max(size for _, size, _ in self.cache.entries())
+        # entries are told apart by their modification times
+        for number, (_, _, path) in enumerate(sorted(self.cache.entries())):
+            os.utime(path, ns=(number * 10 ** 9, number * 10 ** 9))
+        self.compile(inputs[0], 'touched')
+        small = CompileCache(self.cache.directory, max_bytes=int(entry_size * 2.5))
+        self.compile(self.source('3.txt', SOURCE.replace('2', '3')), '3', small)
+        self.assertEqual(small.counts['evictions'], 2)
+        self.assertTrue(self.compile(inputs[0], 'kept')[1])
+        self.assertFalse(self.compile(inputs[1], 'evicted')[1])
@@ -0,0 +1,92 @@
+import errno
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from compile_server import CompileServer, RequestHandler, remove_stale_socket, respond, serve, serve_socket
+
+SOURCE = 'void main(void) { int a; a = 2; output(a * 3); }'
+
+
+class CompileServerTest(unittest.TestCase):
+
+    def request(self, **request):
+        return json.loads(respond(json.dumps(request)))
+
+    def test_returns_the_artifacts_asked_for(self):
+        response = self.request(id=7, source=SOURCE, artifacts=['code', 'semantic_errors'])
+        self.assertEqual(response['id'], 7)
+        self.assertEqual(response['status'], 'ok')
+        self.assertIn('(PRINT, ', response['code'])
+        self.assertEqual(response['semantic_errors'], [])
+        self.assertNotIn('syntax_errors', response)
+        self.assertNotIn('parse_tree', response)
+
+    def test_reports_errors_in_the_source(self):
+        response = self.request(source='void main(void) { b = 1; }')
+        self.assertEqual(response['status'], 'semantic errors')
+        self.assertEqual(response['semantic_errors'], ["#1 : Semantic Error! 'b' is not defined."])
+        response = self.request(source='void main(void) { int a; a = ; }', artifacts=['code', 'syntax_errors'])
+        self.assertEqual(response['status'], 'syntax errors')
+        self.assertTrue(response['syntax_errors'])
+
+    def test_invalid_requests_fail_without_stopping_the_server(self):
+        requests = io.StringIO('not json\n\n' + '[' * 100000 + ']' * 100000 + '\n' +
+                               json.dumps({'id': 1, 'source': SOURCE, 'artifacts': ['bytes']}) + '\n' +
+                               json.dumps({'id': 2, 'source': SOURCE}) + '\n')
+        responses = io.StringIO()
+        serve(requests, responses)
+        lines = [json.loads(line) for line in responses.getvalue().splitlines()]
+        self.assertEqual([(line['id'], line['status']) for line in lines],
+                         [(None, 'failed'), (None, 'failed'), (1, 'failed'), (2, 'ok')])
+
+    def test_a_second_server_leaves_a_running_one_alone(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'compiler.sock')
+            server = CompileServer(path, RequestHandler)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                with self.assertRaises(OSError) as raised:
+                    serve_socket(path)
+                self.assertEqual(raised.exception.errno, errno.EADDRINUSE)
+                with socket.socket(socket.AF_UNIX) as connection:
+                    connection.connect(path)
+                    stream = connection.makefile('rw')
+                    stream.write(json.dumps({'id': 1, 'source': SOURCE}) + '\n')
+                    stream.flush()
+                    self.assertEqual(json.loads(stream.readline())['status'], 'ok')
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
+
+    def test_removes_a_socket_left_behind(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'compiler.sock')
+            with socket.socket(socket.AF_UNIX) as left_behind:
+                left_behind.bind(path)
+            remove_stale_socket(path)
+            self.assertFalse(os.path.exists(path))
+
+    def test_serves_connections_to_a_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'compiler.sock')
+            server = CompileServer(path, RequestHandler)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                with socket.socket(socket.AF_UNIX) as connection:
+                    connection.connect(path)
+                    stream = connection.makefile('rw')
+                    for number in range(3):
+                        stream.write(json.dumps({'id': number, 'source': SOURCE}) + '\n')
+                        stream.flush()
+                        self.assertEqual(json.loads(stream.readline())['id'], number)
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
@@ -0,0 +1,64 @@
+import unittest
+from code_generator.control_flow import ControlFlowGraph, eliminate_dead_code
+from code_generator.operand import NO_OPERAND, direct, immediate, indirect
+from code_generator.program_block import ProgramBlock, Instruction
+
+RETURN_VALUE, RETURN_ADDRESS = 3002, 3003
+
+
+class ControlFlowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.program_block = ProgramBlock()
+
+    def add(self, *instructions):
+        for opcode, *operands in instructions:
+            operands += [NO_OPERAND] * (3 - len(operands))
+            self.program_block.add_instruction(Instruction(opcode, *operands))
+
+    def add_program(self):
+        # a function called from main, one never called, and dead code after a return and a jump
+        self.add(('JP', immediate(8)),
+                 ('ASSIGN', immediate(1), direct(RETURN_VALUE)),
+                 ('JP', indirect(RETURN_ADDRESS)),
+                 ('PRINT', immediate(99)),
+                 ('PRINT', direct(2000)),
+                 ('JP', indirect(3005)),
+                 ('ASSIGN', immediate(0), direct(2000)),
+                 ('JP', indirect(3005)),
+                 ('ASSIGN', immediate(11), direct(RETURN_ADDRESS)),
+                 ('JP', immediate(1)),
+                 ('PRINT', immediate(7)),
+                 ('PRINT', direct(RETURN_VALUE)),
+                 ('JP', direct(14)),
+                 ('PRINT', immediate(8)),
+                 ('PRINT', immediate(9)))
+
+    def test_blocks_and_return_edges(self):
+        self.add_program()
+        graph = ControlFlowGraph(self.program_block, {RETURN_ADDRESS, 3005})
+        self.assertEqual([0, 1, 3, 6, 8, 10, 11, 13, 14], graph.starts)
+        self.assertEqual([graph.block_of[8]], graph.successors[graph.block_of[0]])
+        self.assertEqual([graph.block_of[11]], graph.successors[graph.block_of[1]])
+        self.assertEqual({graph.block_of[line] for line in (0, 1, 8, 11, 14)}, graph.reachable())
+
+    def test_removes_unreachable_blocks_and_remaps(self):
+        self.add_program()
+        self.assertEqual(7, eliminate_dead_code(self.program_block, {RETURN_ADDRESS, 3005}))
+        self.assertEqual(['0\t(JP, #3,  ,  )',
+                          '1\t(ASSIGN, #1, 3002,  )',
+                          '2\t(JP, @3003,  ,  )',
+                          '3\t(ASSIGN, #5, 3003,  )',
+                          '4\t(JP, #1,  ,  )',
+                          '5\t(PRINT, 3002,  ,  )',
+                          '6\t(JP, 7,  ,  )',
+                          '7\t(PRINT, #9,  ,  )'], list(self.program_block.lines()))
+
+    def test_unknown_indirect_jump_keeps_everything(self):
+        self.add(('JP', indirect(2000)),
+                 ('PRINT', immediate(1)))
+        self.assertEqual(0, eliminate_dead_code(self.program_block))
+
+
+if __name__ == '__main__':
+    unittest.main()
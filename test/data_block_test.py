@@ -0,0 +1,52 @@
+import unittest
+from code_generator.data_block import DataBlock
+
+
+class DataBlockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_block = DataBlock()
+
+    def test_earliest_visible_row_wins(self):
+        data_block = self.data_block
+        first_global = data_block.create_data('a', 'int')
+        function = data_block.create_data('f', 'int')
+        data_block.add_virtual_row()
+        data_block.set_function(function)
+        data_block.create_data('a', 'int')
+        local = data_block.create_data('b', 'int')
+        self.assertIs(first_global, data_block.get_data('a')[0])
+        self.assertIs(local, data_block.get_data('b')[0])
+        self.assertIs(function, data_block.get_data('f')[0])
+        data_block.end_scope()
+        self.assertEqual("'b' is not defined.", data_block.get_data('b')[1])
+        later_global = data_block.create_data('b', 'int')
+        self.assertIs(later_global, data_block.get_data('b')[0])
+
+    def test_address_index(self):
+        data_block = self.data_block
+        array = data_block.create_data('arr', 'int')
+        data_block.increase_index(10)
+        after = data_block.create_data('x', 'int')
+        self.assertIs(array, data_block.get_data_from_address(array.address))
+        self.assertIs(after, data_block.get_data_from_address(array.address + 44))
+        self.assertIsNone(data_block.get_data_from_address(array.address + 8))
+
+    def test_rolls_back_to_a_snapshot_without_changing_its_rows(self):
+        data_block = self.data_block
+        data_block.history, data_block.functions = [], []
+        function = data_block.create_data('f', 'int')
+        snapshot = data_block.snapshot()
+        data_block.set_function(data_block.get_data_to_change(function.address))
+        data_block.add_virtual_row()
+        data_block.create_data('a', 'int')
+        self.assertIsNone(function.keyword)
+        rolled_back = data_block.rolled_back(snapshot)
+        self.assertIs(function, rolled_back.get_data('f')[0])
+        self.assertEqual("'a' is not defined.", rolled_back.get_data('a')[1])
+        self.assertEqual((data_block.scope_stack[:1], {}), (rolled_back.scope_stack, rolled_back.function_index))
+        self.assertEqual('func', data_block.get_data('f')[0].keyword)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from scanner.dfa import DFA, CompiledDFA, get_compiled_dfa
+
+
+class CompiledDFATest(unittest.TestCase):
+
+    def setUp(self):
+        self.states = DFA().states
+        self.dfa = CompiledDFA(self.states)
+
+    def test_transitions_match_graph(self):
+        for state_id, state in self.states.items():
+            for i in list(range(256)) + [None]:
+                character = '' if i is None else chr(i)
+                expected = state.transitions.get(character, self.states[0]).id
+                actual = self.dfa.next_state(self.dfa.state_index[state_id], character)
+                self.assertEqual(expected, self.dfa.state_ids[actual])
+
+    def test_flags(self):
+        for state_id, state in self.states.items():
+            index = self.dfa.state_index[state_id]
+            self.assertEqual(state.is_final_state, self.dfa.is_final[index])
+            self.assertEqual(state.is_star_state, self.dfa.is_star[index])
+            self.assertEqual(state.error_message, self.dfa.error_messages[index])
+
+    def test_each_dfa_builds_its_own_graph(self):
+        self.assertIsNot(DFA().states[0], self.states[0])
+        self.assertIs(get_compiled_dfa(), get_compiled_dfa())
+
+    def test_characters_outside_table_are_invalid(self):
+        self.assertEqual(self.dfa.get_class('Ā'), self.dfa.get_class('!'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import glob
+import os
+import unittest
+from parser.incremental import IncrementalCompiler
+from parser.parser import Parser
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE = 'int f(int x) { return x + 1; }\nvoid main(void) { int b; b = f(4); output(b); }\n'
+
+
+def compile_source(source, optimization_level=0):
+    parser = Parser(source=source, build_tree=False, optimization_level=optimization_level)
+    parser.compile()
+    return result(parser.compilation)
+
+
+def result(compilation):
+    return compilation.code_text(), compilation.syntax_errors, compilation.semantic_errors
+
+
+class IncrementalCompilerTest(unittest.TestCase):
+
+    def edits(self, compiler, edits, optimization_level=0):
+        for start, end, text in edits:
+            start, end = start % (len(compiler.source) + 1), end % (len(compiler.source) + 1)
+            compilation = compiler.edit(start, end, text)
+            self.assertEqual(result(compilation), compile_source(compiler.source, optimization_level),
+                             (start, end, text))
+
+    def test_edits_compile_to_what_the_edited_source_compiles_to(self):
+        compiler = IncrementalCompiler(SOURCE * 3, interval=4)
+        self.edits(compiler, [(50, 51, '7'), (20, 20, 'a = '), (20, 24, ''), (0, 0, '/* '), (70, 70, ' */'),
+                              (0, 3, ''), (-1, -1, '@'), (90, 90, 'int x;\n'), (10, 10, '\n\n'), (-20, -5, '')])
+
+    def test_compiles_the_test_programs_after_edits(self):
+        for path in sorted(glob.glob(os.path.join(TEST_DIR, '*', 'T*', 'input.txt'))):
+            with open(path) as file:
+                source = file.read()
+            for optimization_level in (0, 2):
+                compiler = IncrementalCompiler(source * 2, optimization_level, interval=16)
+                middle = len(source)
+                self.edits(compiler, [(middle, middle + 1, ''), (middle, middle, source[0]),
+                                      (middle // 2, middle // 2, ' x'), (-1, -1, '}')], optimization_level)
+
+    def test_an_edit_is_scanned_and_parsed_from_near_it(self):
+        source = SOURCE * 40
+        compiler = IncrementalCompiler(source, interval=16)
+        position = source.index('x + 1', len(source) // 2) + len('x + ')
+        edited = compiler.tokens.first_from(position, 'end')
+        compiler.edit(position, position + 1, '2')
+        self.assertEqual(compiler.scanned, 2)
+        self.assertLessEqual(edited - 16, compiler.resumed_at)
+        self.assertLessEqual(compiler.converged_at, edited + 32)
+        self.assertEqual(result(compiler.compilation), compile_source(compiler.source))
+        compiler.edit(0, 0, '/* a\n comment */\n')
+        self.assertLessEqual(compiler.converged_at, 32)
+        self.assertEqual(result(compiler.compilation), compile_source(compiler.source))
+
+    def test_an_edit_that_moves_the_code_after_it_is_parsed_to_the_end(self):
+        source = SOURCE * 40
+        compiler = IncrementalCompiler(source, interval=16)
+        position = source.index('int b;', len(source) // 2) + len('int b;')
+        compiler.edit(position, position, ' int c;')
+        self.assertIsNone(compiler.converged_at)
+        self.assertEqual(result(compiler.compilation), compile_source(compiler.source))
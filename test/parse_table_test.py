@@ -0,0 +1,43 @@
+import json
+import unittest
+from parser.grammar.parse_table_generator import Grammar, build_table, GRAMMAR_DIR
+from parser.parse_table import ParseTable, TABLE_PATH
+
+
+class ParseTableTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = ParseTable.from_json(TABLE_PATH)
+
+    def test_recovery_matches_follow_scan(self):
+        table = self.table
+        for state in range(table.state_count):
+            names = sorted(name for i, name in enumerate(table.non_terminals) if table.goto(state, i) >= 0)
+            self.assertEqual(tuple(names), table.state_gotos[state])
+            self.assertEqual(bool(names), state in table.goto_states)
+            for terminal in table.terminals:
+                expected = next((name for name in names if terminal in table.follow[name]), None)
+                self.assertEqual(expected, table.recovery[state].get(terminal))
+
+    def test_cache_round_trip(self):
+        table = ParseTable.loads(self.table.dumps(()), ())
+        self.assertEqual(self.table.recovery, table.recovery)
+        self.assertEqual(self.table.goto_states, table.goto_states)
+        self.assertIsNone(ParseTable.loads(self.table.dumps(()), ('stale',)))
+
+    def test_generator_reproduces_table(self):
+        with open(TABLE_PATH, 'r') as f:
+            expected = json.load(f)
+        table, conflicts = build_table(Grammar.from_file(f'{GRAMMAR_DIR}/grammar.y'))
+        table = json.loads(json.dumps(table))
+        self.assertEqual(0, conflicts)
+        for key in ('terminals', 'non_terminals', 'grammar', 'parse_table'):
+            self.assertEqual(expected[key], table[key])
+        for key in ('first', 'follow'):
+            self.assertEqual({symbol: set(terminals) for symbol, terminals in expected[key].items()},
+                             {symbol: set(terminals) for symbol, terminals in table[key].items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
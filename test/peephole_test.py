@@ -0,0 +1,76 @@
+import unittest
+from code_generator import peephole
+from code_generator.operand import NO_OPERAND, direct, immediate, indirect, value
+from code_generator.program_block import ProgramBlock, Instruction
+from code_generator.temporaries_block import TemporariesBlock
+
+
+class PeepholeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporaries = TemporariesBlock()
+        self.t = [direct(self.temporaries.get_temp()) for _ in range(8)]
+        self.program_block = ProgramBlock()
+
+    def add(self, *instructions):
+        for opcode, *operands in instructions:
+            operands += [NO_OPERAND] * (3 - len(operands))
+            self.program_block.add_instruction(Instruction(opcode, *operands))
+
+    def test_folds_copies_and_threads_jumps(self):
+        t = self.t
+        self.add(('JP', immediate(1)),
+                 ('ASSIGN', immediate(0), direct(2000)),
+                 ('ASSIGN', immediate(15), t[0]),
+                 ('ASSIGN', immediate(10), t[1]),
+                 ('LT', direct(2000), t[1], t[2]),
+                 ('JPF', t[2], immediate(12)),
+                 ('ASSIGN', immediate(1), t[3]),
+                 ('ADD', direct(2000), t[3], t[4]),
+                 ('ASSIGN', t[4], direct(2000)),
+                 ('ASSIGN', direct(2000), direct(2000)),
+                 ('JP', direct(11)),
+                 ('JP', direct(4)),
+                 ('PRINT', direct(2000)))
+        self.assertEqual(4, peephole.optimize(self.program_block, self.temporaries))
+        # the loop header starts a basic block, so #10 is not folded into the comparison
+        self.assertEqual(['0\t(JP, #1,  ,  )',
+                          '1\t(ASSIGN, #0, 2000,  )',
+                          '2\t(ASSIGN, #10, 3003,  )',
+                          '3\t(LT, 2000, 3003, 3004)',
+                          '4\t(JPF, 3004, #8,  )',
+                          '5\t(ADD, 2000, #1, 2000)',
+                          '6\t(JP, 3,  ,  )',
+                          '7\t(JP, 3,  ,  )',
+                          '8\t(PRINT, 2000,  ,  )'], list(self.program_block.lines()))
+        self.assertEqual(9, self.program_block.last_index)
+
+    def test_keeps_values_from_other_blocks_and_remaps_return_addresses(self):
+        t = self.t
+        self.add(('JP', immediate(5)),
+                 ('ASSIGN', immediate(7), t[0]),
+                 ('ASSIGN', t[0], t[6]),
+                 ('ASSIGN', immediate(1), t[1]),
+                 ('JP', indirect(value(t[7]))),
+                 ('ASSIGN', immediate(2), t[2]),
+                 ('ASSIGN', immediate(8), t[7]),
+                 ('JP', immediate(1)),
+                 ('ASSIGN', t[6], t[3]),
+                 ('ADD', t[3], t[2], t[4]),
+                 ('PRINT', t[4]))
+        pinned = {value(t[6]), value(t[7])}
+        self.assertEqual(2, peephole.optimize(self.program_block, self.temporaries, pinned, {value(t[7])}))
+        # #2 is set before the call and read after it returns, in another basic block
+        self.assertEqual(['0\t(JP, #3,  ,  )',
+                          '1\t(ASSIGN, #7, 3008,  )',
+                          '2\t(JP, @3009,  ,  )',
+                          '3\t(ASSIGN, #2, 3004,  )',
+                          '4\t(ASSIGN, #6, 3009,  )',
+                          '5\t(JP, #1,  ,  )',
+                          '6\t(ASSIGN, 3008, 3005,  )',
+                          '7\t(ADD, 3005, 3004, 3006)',
+                          '8\t(PRINT, 3006,  ,  )'], list(self.program_block.lines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from code_generator.operand import NO_OPERAND, direct, immediate, indirect, format_operand
+from code_generator.program_block import ProgramBlock, Instruction
+
+
+class ProgramBlockTest(unittest.TestCase):
+
+    def test_grows_past_old_limit_and_backpatches(self):
+        program_block = ProgramBlock()
+        program_block.increase_index()
+        for i in range(2500):
+            program_block.add_instruction(Instruction('ASSIGN', immediate(i), direct(2000), NO_OPERAND))
+        program_block.set_instruction(0, Instruction('JP', immediate(2), NO_OPERAND, NO_OPERAND))
+        for _ in range(100):
+            program_block.increase_index()
+        program_block.set_instruction(2600, Instruction('PRINT', direct(2000), NO_OPERAND, NO_OPERAND))
+        lines = list(program_block.lines())
+        self.assertEqual(2502, len(lines))
+        self.assertEqual('0\t(JP, #2,  ,  )', lines[0])
+        self.assertEqual('2500\t(ASSIGN, #2499, 2000,  )', lines[-2])
+        self.assertEqual('2600\t(PRINT, 2000,  ,  )', lines[-1])
+        self.assertEqual('\n'.join(lines), str(program_block))
+        self.assertIsNone(program_block.get_instruction(2550))
+
+    def test_refuses_to_backpatch_lines_never_reserved(self):
+        program_block = ProgramBlock()
+        program_block.increase_index()
+        program_block.add_instruction(Instruction('ASSIGN', immediate(1), direct(2000), NO_OPERAND))
+        for line in (2, 3025, -1):
+            with self.assertRaises(IndexError):
+                program_block.set_instruction(line, Instruction('JP', immediate(0), NO_OPERAND, NO_OPERAND))
+        self.assertEqual(['1\t(ASSIGN, #1, 2000,  )'], list(program_block.lines()))
+
+    def test_rolls_back_to_a_snapshot(self):
+        program_block = ProgramBlock()
+        program_block.history = []
+        program_block.increase_index()
+        program_block.add_instruction(Instruction('ASSIGN', immediate(1), direct(2000), NO_OPERAND))
+        program_block.increase_index()
+        snapshot = program_block.snapshot()
+        program_block.set_instruction(2, Instruction('JP', direct(4), NO_OPERAND, NO_OPERAND))
+        program_block.add_instruction(Instruction('PRINT', direct(2000), NO_OPERAND, NO_OPERAND))
+        program_block.set_instruction(0, Instruction('JP', immediate(1), NO_OPERAND, NO_OPERAND))
+        rolled_back = program_block.rolled_back(snapshot)
+        self.assertEqual(['1\t(ASSIGN, #1, 2000,  )'], list(rolled_back.lines()))
+        self.assertEqual(3, rolled_back.last_index)
+        self.assertEqual(4, len(list(program_block.lines())))
+
+    def test_operand_text(self):
+        self.assertEqual(['3004', '#-7', '@3008', ' ', 'None'],
+                         [format_operand(operand) for operand in (direct(3004), immediate(-7), indirect(3008),
+                                                                  NO_OPERAND, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,3 +28,20 @@ class ReaderTest(unittest.TestCase):
         reader.read_char()
         self.assertEqual(2, reader.get_current_line_number())
         close_files(reader)
+
+    def test_line_number_of_position(self):
+        reader = Reader('scanner/resource/reader_test.txt')
+        self.assertEqual([0, 4], reader.line_starts)
+        self.assertEqual(1, reader.line_number(3))
+        self.assertEqual(2, reader.line_number(4))
+        self.assertEqual(3, reader.line_number(5))
+        self.assertEqual(1, reader.new_line_count(0, 5))
+        close_files(reader)
+
+    def test_binary_buffer(self):
+        reader = Reader('scanner/resource/reader_test.txt', binary=True)
+        self.assertEqual(ord('s'), reader.buffer[0])
+        self.assertEqual('s', reader.read_char())
+        self.assertEqual('a\nb', reader.lexeme(2, 5))
+        self.assertEqual(2, reader.line_number(4))
+        close_files(reader)
@@ -0,0 +1,52 @@
+import glob
+import unittest
+from scanner.config import *
+from scanner.scanner import Scanner
+from scanner.tokens import TokenKind
+
+
+def scan(scanner: Scanner, **kwargs):
+    tokens = []
+    while True:
+        token = scanner.get_next_token(**kwargs)
+        tokens.append(token)
+        if token[0] == EOF:
+            return tokens
+
+
+def stepping_scanner(path):
+    scanner = Scanner(path)
+    scanner.tables = scanner.tables[:-1] + ([None] * len(scanner.dfa.runs),)
+    return scanner
+
+
+class ScannerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.paths = sorted(glob.glob('scanner/resource/input*.txt'))
+
+    def test_runs_match_stepping(self):
+        for path in self.paths:
+            fast, slow = Scanner(path), stepping_scanner(path)
+            self.assertEqual(scan(slow), scan(fast), path)
+            self.assertEqual(slow.lexical_errors, fast.lexical_errors, path)
+
+    def test_skip_trivia(self):
+        for path in self.paths:
+            full, skipping = Scanner(path), Scanner(path)
+            expected = [token for token in scan(full) if token[0] not in (WHITESPACE, COMMENT)]
+            self.assertEqual(expected, scan(skipping, skip_trivia=True), path)
+            self.assertEqual(full.lexical_errors, skipping.lexical_errors, path)
+
+    def test_token_stream(self):
+        for path in self.paths:
+            scanner = Scanner(path)
+            tokens = list(Scanner(path).tokens(trivia=True))
+            self.assertEqual(scan(scanner), [(token.kind.name, token.lexeme, token.line) for token in tokens], path)
+            for token in tokens[:-1]:
+                self.assertEqual(token.lexeme, scanner.reader.buffer[token.start:token.end])
+            self.assertEqual(TokenKind.EOF, tokens[-1].kind)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+import unittest
+from parser.syntax_tree import SyntaxTree, TOKEN
+from scanner.tokens import Token, TokenKind
+
+
+class SyntaxTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = SyntaxTree(['program', 'list', 'item'])
+
+    def test_lines(self):
+        tree = self.tree
+        first = tree.add_token(Token(TokenKind.ID, 'a', 1, 0, 1))
+        second = tree.add_non_terminal(2, (tree.epsilon,))
+        items = tree.add_non_terminal(1, (first, second))
+        root = tree.add_non_terminal(0, (items,))
+        tree.add_end(root)
+        self.assertEqual(['program',
+                          '├── list',
+                          '│   ├── (ID, a)',
+                          '│   └── item',
+                          '│       └── epsilon',
+                          '└── $'], list(tree.lines(root)))
+        self.assertEqual(TOKEN, tree.kinds[first])
+
+    def test_deep_nesting(self):
+        tree = self.tree
+        node = tree.add_non_terminal(2, (tree.epsilon,))
+        depth = sys.getrecursionlimit() + 500
+        for _ in range(depth):
+            node = tree.add_non_terminal(1, (node,))
+        lines = list(tree.lines(node))
+        self.assertEqual(depth + 2, len(lines))
+        self.assertEqual('    ' * depth + '└── epsilon', lines[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
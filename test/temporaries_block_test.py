@@ -0,0 +1,57 @@
+import unittest
+from code_generator.operand import NO_OPERAND, direct, immediate, indirect
+from code_generator.program_block import ProgramBlock, Instruction
+from code_generator.temporaries_block import TemporariesBlock
+
+
+def build(*instructions):
+    program_block = ProgramBlock()
+    for instruction in instructions:
+        program_block.add_instruction(instruction)
+    return program_block
+
+
+class TemporariesBlockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporaries = TemporariesBlock()
+        self.t = [self.temporaries.get_temp() for _ in range(6)]
+
+    def test_straight_line_temps_share_addresses(self):
+        t = self.t
+        program_block = build(Instruction('ASSIGN', immediate(1), direct(t[0]), NO_OPERAND),
+                              Instruction('ASSIGN', immediate(2), direct(t[1]), NO_OPERAND),
+                              Instruction('ADD', direct(t[0]), direct(t[1]), direct(t[2])),
+                              Instruction('MULT', direct(t[2]), immediate(4), direct(t[3])),
+                              Instruction('ADD', immediate(2004), direct(t[3]), direct(t[3])),
+                              Instruction('ASSIGN', direct(2000), indirect(t[3]), NO_OPERAND))
+        self.assertEqual((6, 2), self.temporaries.recycle(program_block))
+        self.assertEqual(['(ADD, 3002, 3003, 3002)', '(MULT, 3002, #4, 3002)', '(ADD, #2004, 3002, 3002)',
+                          '(ASSIGN, 2000, @3002,  )'], [line.split('\t')[1] for line in program_block.lines()][2:])
+
+    def test_loops_calls_and_pinned_temps_keep_their_values(self):
+        t = self.t
+        program_block = build(Instruction('ASSIGN', immediate(10), direct(t[0]), NO_OPERAND),
+                              Instruction('LT', direct(2000), direct(t[0]), direct(t[1])),
+                              Instruction('JPF', direct(t[1]), immediate(6), NO_OPERAND),
+                              Instruction('ASSIGN', immediate(1), direct(t[2]), NO_OPERAND),
+                              Instruction('ADD', direct(2000), direct(t[2]), direct(2000)),
+                              Instruction('JP', direct(1), NO_OPERAND, NO_OPERAND),
+                              Instruction('ASSIGN', immediate(5), direct(t[3]), NO_OPERAND),
+                              Instruction('JP', immediate(0), NO_OPERAND, NO_OPERAND),
+                              Instruction('PRINT', direct(t[3]), NO_OPERAND, NO_OPERAND),
+                              Instruction('ASSIGN', immediate(7), direct(t[4]), NO_OPERAND),
+                              Instruction('PRINT', direct(t[4]), NO_OPERAND, NO_OPERAND))
+        before, after = self.temporaries.recycle(program_block, pinned={t[4]})
+        operands = program_block.operands_1 + program_block.operands_2 + program_block.operands_3
+        destinations = program_block.operands_2
+        # the loop bound is read on every iteration, so it outlives the loop body
+        self.assertNotEqual(destinations[0], destinations[3])
+        # a temporary live across a call, and a pinned one, get addresses nobody else uses
+        self.assertEqual(2, operands.count(destinations[6]))
+        self.assertEqual(2, operands.count(destinations[9]))
+        self.assertEqual((6, 4), (before, after))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import unittest
+from code_generator.operand import NO_OPERAND, direct, immediate, indirect
+from code_generator.program_block import ProgramBlock, Instruction
+from interpreter.translator import TranslatedProgram, compile_program, leaders, written_on_entry
+from interpreter.virtual_machine import VirtualMachine
+
+RETURN_VALUE, RETURN_ADDRESS = 3002, 3003
+
+
+class TranslatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.program_block = ProgramBlock()
+
+    def add(self, *instructions):
+        for opcode, *operands in instructions:
+            operands += [NO_OPERAND] * (3 - len(operands))
+            self.program_block.add_instruction(Instruction(opcode, *operands))
+
+    def assertRunsLikeTheVirtualMachine(self, expected_output):
+        outputs = []
+        for machine_class in (VirtualMachine, TranslatedProgram):
+            out = io.StringIO()
+            executed = machine_class.from_program_block(self.program_block).run(out)
+            outputs.append((executed, out.getvalue()))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(expected_output, outputs[1][1])
+
+    def add_program(self):
+        # main calls a function that sums i * i over an array, in a loop, then prints the sum
+        self.add(('JP', immediate(10)),
+                 ('ASSIGN', immediate(0), direct(108)),
+                 ('ASSIGN', immediate(0), direct(RETURN_VALUE)),
+                 ('LT', direct(108), immediate(4), direct(112)),
+                 ('JPF', direct(112), immediate(9)),
+                 ('MULT', direct(108), direct(108), indirect(104)),
+                 ('ADD', direct(RETURN_VALUE), indirect(104), direct(RETURN_VALUE)),
+                 ('ADD', direct(108), immediate(1), direct(108)),
+                 ('JP', immediate(3)),
+                 ('JP', indirect(RETURN_ADDRESS)),
+                 ('ASSIGN', immediate(200), direct(104)),
+                 ('ASSIGN', immediate(13), direct(RETURN_ADDRESS)),
+                 ('JP', immediate(1)),
+                 ('PRINT', direct(RETURN_VALUE)))
+
+    def test_runs_loops_and_calls(self):
+        self.add_program()
+        self.assertRunsLikeTheVirtualMachine('PRINT    14\nTotal memory used: 6\n')
+
+    def test_finds_words_set_on_every_path(self):
+        self.add_program()
+        code = VirtualMachine.from_program_block(self.program_block).code
+        starts = leaders(code)
+        self.assertEqual([0, 1, 3, 5, 9, 10, 13], starts)
+        entry = written_on_entry(code, starts)
+        self.assertEqual({104, 108, RETURN_VALUE, RETURN_ADDRESS}, entry[3])
+        self.assertEqual(set(), entry[13])
+
+    def test_stops_where_the_virtual_machine_does(self):
+        self.add(('ASSIGN', immediate(1), direct(100)),
+                 ('PRINT', direct(100)),
+                 ('ADD', direct(100), direct(104), direct(108)),
+                 ('PRINT', immediate(2)))
+        self.assertRunsLikeTheVirtualMachine('PRINT    1\nERROR : Invalid access to memory\n')
+
+    def test_indirect_jump_into_a_block(self):
+        # the jump through 100 lands on line 4, in the block from line 2, on a path where 104 is not set
+        self.add(('ADD', immediate(3), immediate(1), direct(100)),
+                 ('JP', indirect(100)),
+                 ('ASSIGN', immediate(5), direct(104)),
+                 ('PRINT', direct(104)),
+                 ('PRINT', direct(104)))
+        self.assertRunsLikeTheVirtualMachine('PRINT    ERROR : Invalid access to memory\n')
+
+    def test_translation_is_cached(self):
+        self.add_program()
+        compile_program.cache_clear()
+        for _ in range(2):
+            TranslatedProgram.from_program_block(self.program_block).run(io.StringIO())
+        self.assertEqual(1, compile_program.cache_info().hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import os
+import tempfile
+import unittest
+from code_generator.operand import NO_OPERAND, direct, immediate, indirect
+from code_generator.program_block import ProgramBlock, Instruction
+from interpreter.virtual_machine import VirtualMachine
+
+
+class VirtualMachineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.program_block = ProgramBlock()
+
+    def add(self, *instructions):
+        for opcode, *operands in instructions:
+            operands += [NO_OPERAND] * (3 - len(operands))
+            self.program_block.add_instruction(Instruction(opcode, *operands))
+
+    def run_program(self, machine):
+        out = io.StringIO()
+        executed = machine.run(out)
+        return executed, out.getvalue()
+
+    def run_file(self, text):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'output.txt')
+            with open(file_name, 'w') as file:
+                file.write(text)
+            return self.run_program(VirtualMachine.from_file(file_name))
+
+    def test_runs_a_loop_like_the_tester(self):
+        # prints 3 * i for i in 0..2 through an array cell reached indirectly
+        self.add(('ASSIGN', immediate(0), direct(100)),
+                 ('ASSIGN', immediate(200), direct(104)),
+                 ('LT', direct(100), immediate(3), direct(108)),
+                 ('JPF', direct(108), immediate(9)),
+                 ('MULT', direct(100), immediate(3), indirect(104)),
+                 ('PRINT', indirect(104)),
+                 ('ADD', direct(100), immediate(1), direct(100)),
+                 ('JP', immediate(2)),
+                 ('PRINT', immediate(99)),
+                 ('DIV', immediate(-7), immediate(2), direct(112)),
+                 ('PRINT', direct(112)))
+        executed, output = self.run_program(VirtualMachine.from_program_block(self.program_block))
+        self.assertEqual(24, executed)
+        self.assertEqual('PRINT    0\nPRINT    3\nPRINT    6\nPRINT    -3\nTotal memory used: 5\n', output)
+
+    def test_wraps_and_divides_by_zero_like_the_tester(self):
+        self.add(('ADD', immediate(2147483647), immediate(1), direct(100)),
+                 ('PRINT', direct(100)),
+                 ('DIV', immediate(7), immediate(0), direct(104)),
+                 ('PRINT', direct(104)))
+        _, output = self.run_program(VirtualMachine.from_program_block(self.program_block))
+        self.assertEqual('PRINT    -2147483648\nPRINT    -2147483648\nTotal memory used: 2\n', output)
+
+    def test_reading_an_unwritten_word_stops(self):
+        self.add(('PRINT', immediate(1)),
+                 ('PRINT', direct(100)),
+                 ('PRINT', immediate(2)))
+        executed, output = self.run_program(VirtualMachine.from_program_block(self.program_block))
+        self.assertEqual(2, executed)
+        self.assertEqual('PRINT    1\nPRINT    ERROR : Invalid access to memory\n', output)
+
+    def test_reads_output_txt(self):
+        executed, output = self.run_file('0\t(JP, 2,  ,  )\r\n'
+                                         '1\t(PRINT, #1, , )\r\n'
+                                         '\r\n'
+                                         '2\t(ASSIGN, #5, 100, )\r\n'
+                                         '3\t(PRINT, 100, ,)\r\n')
+        self.assertEqual(3, executed)
+        self.assertEqual('PRINT    5\nTotal memory used: 1\n', output)
+
+    def test_a_line_that_is_not_an_instruction_is_an_invalid_command(self):
+        _, output = self.run_file('0\t(PRINT, #1, , )\n'
+                                  'The code has not been generated.\n'
+                                  '2\t(PRINT, #2, , )\n')
+        self.assertEqual('PRINT    1\nERROR : Invalid Command\n', output)
+
+
+if __name__ == '__main__':
+    unittest.main()